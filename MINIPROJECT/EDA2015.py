@@ -1,56 +1,293 @@
+import argparse
+import base64
+import html
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-def perform_eda(data):
+from dataset_io import DEFAULT_BATCH_SIZE, iter_dataset
+from schema import TARGET_COLUMN
+
+# Columns with at most this many distinct integer values are plotted as category counts
+MAX_CATEGORIES = 64
+
+# Non-integer values are counted at this many decimals (BMI is recorded to two)
+COUNT_DECIMALS = 2
+
+# Bins of the histogram drawn for continuous columns
+HISTOGRAM_BINS = 30
+
+
+class EDAStats:
+    """
+    Statistics of a dataset accumulated one chunk at a time.
+
+    Per column it keeps the count, missing values, min/max, mean and variance
+    (merged across chunks) and value counts, which also give the quantiles and
+    histograms. The correlation matrix comes from a running X^T X of the rows
+    without missing values, shifted by the first chunk's mean so the sums stay
+    well conditioned.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.rows = 0
+        self.head = None
+
+    def _start(self, chunk, values):
+        k = values.shape[1]
+        self.columns = list(chunk.columns)
+        self.head = chunk.head()
+        self.count, self.missing = np.zeros(k), np.zeros(k)
+        self.mean, self.m2 = np.zeros(k), np.zeros(k)
+        self.low, self.high = np.full(k, np.inf), np.full(k, -np.inf)
+        self.value_counts = [pd.Series(dtype=np.float64) for _ in range(k)]
+        self.integer = np.ones(k, dtype=bool)
+        self.shift = np.zeros(k)
+        if len(values):
+            with np.errstate(invalid='ignore'):
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0))
+        self.cross, self.sums = np.zeros((k, k)), np.zeros(k)
+        self.complete_rows = 0
+
+    def update(self, chunk):
+        """Add one DataFrame chunk (non-numeric columns are ignored)."""
+        chunk = chunk.select_dtypes('number')
+        values = chunk.to_numpy(dtype=np.float64)
+        if self.columns is None:
+            self._start(chunk, values)
+        self.rows += len(values)
+
+        # Mean and variance, merged with the running ones (Chan et al.)
+        valid = ~np.isnan(values)
+        n = valid.sum(axis=0)
+        total = self.count + n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, np.nansum(values, axis=0) / n, 0.0)
+            m2 = np.nansum((values - mean) ** 2, axis=0)
+            delta = mean - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * n / total, 0.0)
+            self.m2 = self.m2 + m2 + np.where(total > 0, delta ** 2 * self.count * n / total, 0.0)
+        self.count = total
+        self.missing += len(values) - n
+        if len(values):
+            self.low = np.fmin(self.low, np.nanmin(values, axis=0, initial=np.inf))
+            self.high = np.fmax(self.high, np.nanmax(values, axis=0, initial=-np.inf))
+
+        # Value counts (non-integer values rounded so the number of distinct keys stays bounded)
+        for j in range(values.shape[1]):
+            column = values[valid[:, j], j]
+            if self.integer[j] and not np.array_equal(column, np.round(column)):
+                self.integer[j] = False
+            keys, counts = np.unique(np.round(column, COUNT_DECIMALS), return_counts=True)
+            self.value_counts[j] = self.value_counts[j].add(pd.Series(counts, index=keys), fill_value=0)
+
+        # Cross products of the complete rows, for the correlation matrix
+        complete = values[valid.all(axis=1)] - self.shift
+        self.cross += complete.T @ complete
+        self.sums += complete.sum(axis=0)
+        self.complete_rows += len(complete)
+
+    def quantiles(self, j, qs=(0.25, 0.5, 0.75)):
+        counts = self.value_counts[j].sort_index()
+        if counts.empty:
+            return [np.nan] * len(qs)
+        cumulative = counts.to_numpy().cumsum()
+        return [counts.index[np.searchsorted(cumulative, q * cumulative[-1])] for q in qs]
+
+    def describe(self):
+        """The rows of DataFrame.describe() (plus missing values), from the running statistics."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        quantiles = np.array([self.quantiles(j) for j in range(len(self.columns))], dtype=np.float64).T
+        return pd.DataFrame({
+            'count': self.count, 'missing': self.missing, 'mean': self.mean, 'std': std, 'min': self.low,
+            '25%': quantiles[0], '50%': quantiles[1], '75%': quantiles[2], 'max': self.high,
+        }, index=self.columns).T
+
+    def correlation(self):
+        """Pearson correlation matrix of the rows without missing values."""
+        n = max(self.complete_rows, 1)
+        mean = self.sums / n
+        covariance = self.cross / n - np.outer(mean, mean)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sd = np.sqrt(np.diag(covariance))
+            corr = covariance / np.outer(sd, sd)
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.columns, columns=self.columns)
+
+    def is_categorical(self, j):
+        return bool(self.integer[j]) and len(self.value_counts[j]) <= MAX_CATEGORIES
+
+
+def collect_stats(path, chunksize=DEFAULT_BATCH_SIZE, sample=None, seed=0):
     """
-    Perform Exploratory Data Analysis (EDA) on the given DataFrame.
-    
+    Compute every statistic of the report in one pass over a dataset.
+
     Parameters:
-    data (DataFrame): The preprocessed DataFrame on which EDA is to be performed.
-    """    
-    print("First few rows of the data:")
-    print(data.head())
-
-    for col in data.columns:
-       if col is ['BMI']:
-        plt.figure(figsize=(10, 6))
-        sns.histplot(data[col], kde=True, bins=30, color='skyblue')
-        plt.title(f'Distribution of {col}')
-        plt.xlabel(col)
-        plt.ylabel('Frequency')
-        plt.show()
-
-    # Summary statistics for features
-    print("\nSummary Statistics for Features:")
-    print(data.describe())
-    print("\n")
-
-    # Heatmap for feature correlations
-    plt.figure(figsize=(12, 10))
-    correlation_matrix = data.corr()
-    sns.heatmap(correlation_matrix, annot=True, fmt=".2f", cmap="coolwarm", cbar=True)
-    plt.title("Heatmap of Feature Correlations")
-    plt.show()
-
-    # Correlation with the target 'Heart_Disease_Status'
-    plt.figure(figsize=(10, 8))
-    target_correlation = data.corr()['Heart_Disease_Status'].sort_values(ascending=False)
-    sns.barplot(x=target_correlation.values, y=target_correlation.index, palette="viridis")
-    plt.title("Correlation of Features with Heart_Disease_Status")
-    plt.xlabel("Correlation Coefficient")
-    plt.show()
-    print(target_correlation)
-
-    # Plot histograms for continuous features
-    for col in data.columns:
-        plt.figure(figsize=(10, 6))
-        sns.histplot(data[col], kde=True, bins=30, color='skyblue')
-        plt.title(f'Distribution of {col}')
-        plt.xlabel(col)
-        plt.ylabel('Frequency')
-        plt.show()
-
-# Example usage with your DataFrame
-df = pd.read_csv('smote.csv')  # Load your preprocessed dataset
-perform_eda(df)  # Call the EDA function on your DataFrame
+    path (str): Dataset ('.arrow', '.parquet' or '.csv'), read in chunks.
+    chunksize (int): Rows per chunk.
+    sample (float): Keep each row with this probability (a uniform sample); all rows when None.
+    seed (int): Seed of the sample.
+
+    Returns:
+    EDAStats: The accumulated statistics.
+    """
+    stats = EDAStats()
+    rng = np.random.default_rng(seed)
+    for chunk in iter_dataset(path, batch_size=chunksize):
+        if sample is not None:
+            chunk = chunk[rng.random(len(chunk)) < sample]
+        stats.update(chunk)
+    return stats
+
+
+# Figure renderers: they run in worker processes with the non-interactive Agg backend
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def render_distribution(path, column, keys, counts, categorical):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 5))
+    if categorical:
+        ax.bar([str(int(k)) for k in keys], counts, color='skyblue')
+    else:
+        ax.hist(keys, bins=HISTOGRAM_BINS, weights=counts, color='skyblue')
+    ax.set_title(f'Distribution of {column}')
+    ax.set_xlabel(column)
+    ax.set_ylabel('Frequency')
+    fig.tight_layout()
+    fig.savefig(path, dpi=80)
+    plt.close(fig)
+    return path
+
+
+def render_heatmap(path, corr, labels):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(12, 10))
+    image = ax.imshow(corr, cmap='coolwarm', vmin=-1, vmax=1)
+    ax.set_xticks(range(len(labels)), labels, rotation=90)
+    ax.set_yticks(range(len(labels)), labels)
+    for i, row in enumerate(corr):
+        for j, value in enumerate(row):
+            ax.text(j, i, f'{value:.2f}', ha='center', va='center', fontsize=7)
+    fig.colorbar(image)
+    ax.set_title('Heatmap of Feature Correlations')
+    fig.tight_layout()
+    fig.savefig(path, dpi=80)
+    plt.close(fig)
+    return path
+
+
+def render_target_correlation(path, values, labels, target):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 8))
+    ax.barh(labels[::-1], values[::-1], color=plt.cm.viridis(np.linspace(1, 0, len(values))))
+    ax.set_title(f'Correlation of Features with {target}')
+    ax.set_xlabel('Correlation Coefficient')
+    fig.tight_layout()
+    fig.savefig(path, dpi=80)
+    plt.close(fig)
+    return path
+
+
+def _img(path):
+    # Images are inlined so the report is a single self-contained file
+    with open(path, 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode()
+    return f'<img src="data:image/png;base64,{encoded}" alt="{html.escape(os.path.basename(path))}">'
+
+
+def perform_eda(data, out_dir='eda_report', target=TARGET_COLUMN, jobs=None, source=None, seconds=None):
+    """
+    Perform Exploratory Data Analysis (EDA) and write it as an HTML report.
+
+    Parameters:
+    data (DataFrame or EDAStats): The data, or statistics from `collect_stats`.
+    out_dir (str): Directory for the PNG figures and report.html.
+    target (str): Column whose correlation with every other column is charted.
+    jobs (int): Processes rendering the figures (all cores by default).
+
+    Returns:
+    str: Path of the HTML report.
+    """
+    stats = data
+    if not isinstance(stats, EDAStats):
+        stats = EDAStats()
+        stats.update(data)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # The correlation matrix is computed once and reused for the target correlation
+    describe = stats.describe()
+    corr = stats.correlation()
+    target_corr = corr[target].drop(target).sort_values(ascending=False) if target in corr else None
+
+    # Render every figure in parallel, straight to PNG files
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        figures = {'heatmap': pool.submit(render_heatmap, os.path.join(out_dir, 'correlation.png'),
+                                          corr.to_numpy().tolist(), list(corr.columns))}
+        if target_corr is not None:
+            figures['target'] = pool.submit(render_target_correlation, os.path.join(out_dir, 'target_correlation.png'),
+                                            target_corr.to_numpy(), list(target_corr.index), target)
+        for j, column in enumerate(stats.columns):
+            counts = stats.value_counts[j].sort_index()
+            figures[column] = pool.submit(render_distribution, os.path.join(out_dir, f'distribution_{j:02d}.png'),
+                                          column, counts.index.to_numpy(), counts.to_numpy(), stats.is_categorical(j))
+        paths = {name: future.result() for name, future in figures.items()}
+
+    number = lambda value: f'{value:.3f}'  # noqa: E731
+    summary = f'{stats.rows} rows, {len(stats.columns)} columns'
+    if seconds is not None:
+        summary += f', statistics computed in {seconds:.1f}s'
+    parts = [
+        '<!DOCTYPE html>',
+        '<html><head><meta charset="utf-8"><title>EDA report</title>',
+        '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;font-size:12px}'
+        'td,th{border:1px solid #ccc;padding:2px 6px;text-align:right}img{max-width:100%}</style>',
+        '</head><body>',
+        f'<h1>EDA report: {html.escape(str(source or "DataFrame"))}</h1>',
+        f'<p>{summary}</p>',
+        '<h2>First rows</h2>', stats.head.to_html(index=False),
+        '<h2>Summary statistics</h2>', describe.to_html(float_format=number),
+        '<h2>Feature correlations</h2>', _img(paths['heatmap']),
+    ]
+    if target_corr is not None:
+        parts += [f'<h2>Correlation with {html.escape(target)}</h2>', _img(paths['target']),
+                  target_corr.to_frame('correlation').to_html(float_format=number)]
+    parts.append('<h2>Distributions</h2>')
+    parts += [_img(paths[column]) for column in stats.columns]
+    parts.append('</body></html>')
+
+    report = os.path.join(out_dir, 'report.html')
+    with open(report, 'w') as f:
+        f.write('\n'.join(parts))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write an HTML EDA report of a pipeline dataset.')
+    parser.add_argument('data', nargs='?', default='smote.arrow')
+    parser.add_argument('--out', default='eda_report', help='directory for report.html and the figures')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--sample', type=float, help='fraction of rows to sample uniformly, e.g. 0.1')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--target', default=TARGET_COLUMN)
+    parser.add_argument('--jobs', type=int, help='processes rendering the figures')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    stats = collect_stats(args.data, args.chunksize, args.sample, args.seed)
+    seconds = time.perf_counter() - start
+    report = perform_eda(stats, args.out, args.target, args.jobs, args.data, seconds)
+    print(f"EDA report of {stats.rows} rows written to {report} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
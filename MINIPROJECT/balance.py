@@ -0,0 +1,195 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+from dataset_io import DEFAULT_BATCH_SIZE, DatasetWriter, iter_dataset, load_dataset
+from schema import FEATURE_DOMAINS, TARGET_COLUMN
+
+# Neighbours each synthetic row may be interpolated towards (imblearn's default)
+DEFAULT_K_NEIGHBORS = 5
+
+
+class SmoteSampler:
+    """
+    SMOTE over the binned integer codes, generated in bounded chunks.
+
+    Each synthetic row lies on the segment between a row of its class and one
+    of that row's `k_neighbors` nearest neighbours in the same class, and is
+    then rounded and clipped back onto the valid code grid of every column, so
+    the output holds the same int8 codes binner.py produces. The neighbour
+    table (n_rows x k int32) is computed once per oversampled class by
+    querying the index `chunksize` rows at a time on `n_jobs` workers, which
+    bounds the memory of the distance matrices.
+
+    Parameters:
+    X (DataFrame): Binned features.
+    y (array-like): Class of every row.
+    k_neighbors (int): Neighbours per row.
+    n_jobs (int): Workers of the neighbour search.
+    chunksize (int): Rows per neighbour query and per generated chunk.
+    random_state (int): Seed of the generator.
+    """
+
+    def __init__(self, X, y, k_neighbors=DEFAULT_K_NEIGHBORS, n_jobs=None, chunksize=DEFAULT_BATCH_SIZE,
+                 random_state=42):
+        self.columns = list(X.columns)
+        self.dtypes = X.dtypes
+        self.chunksize = chunksize
+        self.rng = np.random.default_rng(random_state)
+        domains = [FEATURE_DOMAINS.get(col, (-np.inf, np.inf)) for col in self.columns]
+        self.low = np.array([low for low, _ in domains], dtype=np.float32)
+        self.high = np.array([high for _, high in domains], dtype=np.float32)
+
+        self.k_neighbors = k_neighbors
+        self.n_jobs = n_jobs
+        y = np.asarray(y)
+        self.classes, self.counts = np.unique(y, return_counts=True)
+        values = X.to_numpy(dtype=np.float32)
+        self.X = {cls: values[y == cls] for cls in self.classes}
+        self._neighbors = {}
+
+    def neighbors(self, cls):
+        # Built on first use, so classes that are never oversampled (the majority) need no index
+        if cls not in self._neighbors:
+            self._neighbors[cls] = self._neighbor_table(self.X[cls])
+        return self._neighbors[cls]
+
+    def _neighbor_table(self, rows):
+        k = min(self.k_neighbors, len(rows) - 1)
+        if k < 1:
+            return None  # a single row can only be copied
+        index = NearestNeighbors(n_neighbors=k + 1, n_jobs=self.n_jobs).fit(rows)
+        table = np.empty((len(rows), k), dtype=np.int32)
+        for start in range(0, len(rows), self.chunksize):
+            _, neighbors = index.kneighbors(rows[start:start + self.chunksize])
+            table[start:start + self.chunksize] = neighbors[:, 1:]  # the first neighbour is the row itself
+        return table
+
+    def sample(self, cls, n):
+        """`n` synthetic rows of class `cls`, as a DataFrame with the input dtypes."""
+        rows = self.X[cls]
+        base = self.rng.integers(len(rows), size=n)
+        neighbors = self.neighbors(cls) if n else None
+        if neighbors is None:
+            synthetic = rows[base]
+        else:
+            other = neighbors[base, self.rng.integers(neighbors.shape[1], size=n)]
+            gap = self.rng.random((n, 1), dtype=np.float32)
+            synthetic = rows[base] + gap * (rows[other] - rows[base])
+        # Back onto the integer code grid produced by binner.py
+        synthetic = np.clip(np.rint(synthetic), self.low, self.high)
+        return pd.DataFrame(synthetic, columns=self.columns).astype(self.dtypes)
+
+    def oversample(self, target_counts=None):
+        """
+        Yield (class, synthetic rows) chunks that bring every class to the majority count.
+
+        Parameters:
+        target_counts (dict): Rows wanted per class instead of the majority count.
+        """
+        for cls, count in zip(self.classes, self.counts):
+            wanted = (target_counts or {}).get(cls, self.counts.max()) - count
+            for start in range(0, max(wanted, 0), self.chunksize):
+                yield cls, self.sample(cls, min(self.chunksize, wanted - start))
+
+    def batches(self, batch_size, n_batches=None):
+        """
+        Class-balanced training batches, generated on the fly instead of read from an oversampled file.
+
+        Every batch holds about batch_size / n_classes rows of each class: real
+        rows drawn at random, topped up with synthetic rows in proportion to
+        how under-represented the class is.
+
+        Yields:
+        tuple: (X DataFrame, y ndarray), forever unless `n_batches` is given.
+        """
+        per_class = max(batch_size // len(self.classes), 1)
+        majority = self.counts.max()
+        produced = 0
+        while n_batches is None or produced < n_batches:
+            parts, labels = [], []
+            for cls, count in zip(self.classes, self.counts):
+                real = self.rng.binomial(per_class, count / majority)
+                rows = self.X[cls][self.rng.integers(count, size=real)]
+                parts.append(pd.DataFrame(rows, columns=self.columns).astype(self.dtypes))
+                parts.append(self.sample(cls, per_class - real))
+                labels.append(np.full(per_class, cls))
+            order = self.rng.permutation(per_class * len(self.classes))
+            yield pd.concat(parts, ignore_index=True).iloc[order].reset_index(drop=True), np.concatenate(labels)[order]
+            produced += 1
+
+
+def resample(X, y, k_neighbors=DEFAULT_K_NEIGHBORS, random_state=42, n_jobs=None):
+    """
+    Oversample in memory (e.g. only the training split), as imblearn's fit_resample does.
+
+    Returns:
+    tuple: (X, y) with the original rows first, then the synthetic rows of each class.
+    """
+    sampler = SmoteSampler(X, y, k_neighbors, n_jobs, random_state=random_state)
+    parts, labels = [X.reset_index(drop=True)], [np.asarray(y)]
+    for cls, rows in sampler.oversample():
+        parts.append(rows)
+        labels.append(np.full(len(rows), cls, dtype=labels[0].dtype))
+    return pd.concat(parts, ignore_index=True), pd.Series(np.concatenate(labels), name=getattr(y, 'name', None))
+
+
+def balance_dataset(source='binned.arrow', output='smote.arrow', k_neighbors=DEFAULT_K_NEIGHBORS, random_state=42,
+                    chunksize=DEFAULT_BATCH_SIZE, n_jobs=None, target=TARGET_COLUMN):
+    """
+    Write a class-balanced copy of a binned dataset with SMOTE.
+
+    The original rows are streamed to `output` first and the synthetic rows
+    follow chunk by chunk, so only the features and the neighbour tables
+    are held in memory, never the oversampled dataset.
+
+    Parameters:
+    source (str): Binned dataset.
+    output (str): Balanced dataset to write.
+    k_neighbors (int): Neighbours per row.
+    random_state (int): Seed of the generator.
+    chunksize (int): Rows per neighbour query and per written chunk.
+    n_jobs (int): Workers of the neighbour search.
+
+    Returns:
+    dict: Rows per class before and after balancing.
+    """
+    df = load_dataset(source)
+    sampler = SmoteSampler(df.drop(columns=[target]), df[target], k_neighbors, n_jobs, chunksize, random_state)
+    target_dtype = df[target].dtype
+    del df
+
+    params = {'k_neighbors': k_neighbors, 'random_state': random_state}
+    added = dict.fromkeys(sampler.classes.tolist(), 0)
+    with DatasetWriter(output, 'balanced', [source], params) as writer:
+        for chunk in iter_dataset(source, batch_size=chunksize):
+            writer.write(chunk)
+        for cls, rows in sampler.oversample():
+            rows[target] = np.full(len(rows), cls, dtype=target_dtype)
+            writer.write(rows)
+            added[cls.item()] += len(rows)
+    return {'before': dict(zip(sampler.classes.tolist(), sampler.counts.tolist())),
+            'after': {cls: count + added[cls] for cls, count in zip(sampler.classes.tolist(), sampler.counts.tolist())}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Balance the binned dataset with chunked SMOTE.')
+    parser.add_argument('source', nargs='?', default='binned.arrow')
+    parser.add_argument('output', nargs='?', default='smote.arrow')
+    parser.add_argument('--k-neighbors', type=int, default=DEFAULT_K_NEIGHBORS)
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--jobs', type=int, help='workers of the neighbour search')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = balance_dataset(args.source, args.output, args.k_neighbors, args.random_state, args.chunksize, args.jobs)
+    print(f"Balanced {args.source} -> {args.output} in {time.perf_counter() - start:.1f}s: "
+          f"{counts['before']} -> {counts['after']}")
+
+
+if __name__ == '__main__':
+    main()
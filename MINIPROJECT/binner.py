@@ -1,48 +1,109 @@
+import numpy as np
 import pandas as pd
 
+# Right-inclusive upper edges of the bins (same bins pd.cut produced)
+BMI_EDGES = np.array([18.5, 25, 30])  # Underweight, Healthy, Overweight, Obesity
+HEALTH_DAY_EDGES = np.array([5, 10, 15, 20, 25])  # 0-5, 5-10, ..., 25-30 days
+
+# Columns to bin, with their edges and the largest value that still falls in the last bin
+BINNED_COLUMNS = {
+    'BMI': (BMI_EDGES, np.inf),
+    'MentHlth': (HEALTH_DAY_EDGES, 30),
+    'PhysHlth': (HEALTH_DAY_EDGES, 30),
+}
+
+
+def bin_values(values, edges, upper=np.inf):
+    """
+    Map values to their right-inclusive bin index with a single np.searchsorted call.
+
+    Parameters:
+    values (array-like): Values to bin.
+    edges (ndarray): Sorted inner bin edges.
+    upper (float): Largest valid value; anything above it (or NaN) is rejected.
+
+    Returns:
+    ndarray: int8 bin index for every value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    invalid = np.isnan(values) | (values > upper)
+    if invalid.any():
+        raise ValueError(f"{np.count_nonzero(invalid)} value(s) cannot be binned (NaN or above {upper})")
+    return np.searchsorted(edges, values, side='left').astype(np.int8)
+
+
+class BinningTransformer:
+    """
+    Vectorized binning shared by binner.py, app.py and the training scripts.
+
+    Converts BMI to BMI classes, bins Mental and Physical Health days into
+    5-day bins and folds Fruits and Veggies into a single Fruits_Veggies
+    feature, so raw BRFSS-style records can be scored directly.
+    """
+
+    def fit(self, data=None, y=None):
+        # Nothing to learn: the bin edges are fixed
+        return self
+
+    def transform(self, data):
+        """
+        Parameters:
+        data (DataFrame): Records with raw BMI, MentHlth, PhysHlth, Fruits and Veggies.
+
+        Returns:
+        DataFrame: A binned copy; Fruits and Veggies are replaced by Fruits_Veggies
+        as the last column.
+        """
+        columns = {}
+        for column in data.columns:
+            if column in ('Fruits', 'Veggies'):
+                continue
+            values = data[column].to_numpy()
+            if column in BINNED_COLUMNS:
+                edges, upper = BINNED_COLUMNS[column]
+                try:
+                    values = bin_values(values, edges, upper)
+                except ValueError as e:
+                    raise ValueError(f"{column}: {e}") from None
+            columns[column] = values
+
+        # If either Fruits or Veggies is 1, then Fruits_Veggies = 1
+        if 'Fruits' in data.columns and 'Veggies' in data.columns:
+            fruits = data['Fruits'].to_numpy().astype(np.int8)
+            veggies = data['Veggies'].to_numpy().astype(np.int8)
+            columns['Fruits_Veggies'] = np.bitwise_or(fruits, veggies)
+
+        # Build the result in one go instead of copying and mutating the input
+        return pd.DataFrame(columns, index=data.index)
+
+    def fit_transform(self, data, y=None):
+        return self.fit(data, y).transform(data)
+
+
 def preprocess_data(data):
     """
-    Preprocess the DataFrame to make changes to BMI, Mental Health, Physical Health, 
+    Preprocess the DataFrame to make changes to BMI, Mental Health, Physical Health,
     and combine Fruits and Veggies into a single feature.
-    
+
     Parameters:
     data (DataFrame): The DataFrame to be preprocessed.
-    
+
     Returns:
     DataFrame: The preprocessed DataFrame.
     """
-    # 1️⃣ **Convert BMI to BMI classes**
-    data['BMI'] = pd.cut(
-        data['BMI'], 
-        bins=[-float('inf'), 18.5, 25, 30, float('inf')],  # Classify BMI
-        labels=[0, 1, 2, 3]  # Corresponding classes: Underweight, Healthy, Overweight, Obesity
-    ).astype(int)
-
-    # 2️⃣ **Bin Mental Health into 6 bins (0-5, 5-10, ..., 25-30)**
-    data['MentHlth'] = pd.cut(
-        data['MentHlth'], 
-        bins=[-float('inf'), 5, 10, 15, 20, 25, 30],  
-        labels=[0, 1, 2, 3, 4, 5]  # Corresponding bins
-    ).astype(int)
-
-    # 3️⃣ **Bin Physical Health into 6 bins (0-5, 5-10, ..., 25-30)**
-    data['PhysHlth'] = pd.cut(
-        data['PhysHlth'], 
-        bins=[-float('inf'), 5, 10, 15, 20, 25, 30], 
-        labels=[0, 1, 2, 3, 4, 5]  # Corresponding bins
-    ).astype(int)
-
-    # 4️⃣ **Combine Fruits and Veggies into a single feature**
-    # If both Fruits and Veggies are 1, then Fruits_Veggies = 1
-    # Otherwise, Fruits_Veggies = 0
-    data['Fruits_Veggies'] = (data['Fruits'] | data['Veggies'])  # Binary AND operation
-
-    # Drop the original 'Fruits' and 'Veggies' columns if no longer needed
-    data = data.drop(columns=['Fruits', 'Veggies'], errors='ignore')
-    
-    return data
-
-
-df = pd.read_csv('finaldataset.csv')  # Load your preprocessed dataset
-df = preprocess_data(df)  # Apply the preprocessing function
-df.to_csv('binned.csv', index=False)  # Save the updated DataFrame
+    return BinningTransformer().transform(data)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from dataset_io import load_dataset, save_dataset
+
+    parser = argparse.ArgumentParser(description='Bin BMI and health days and fold Fruits/Veggies.')
+    parser.add_argument('input', nargs='?', default='finaldataset.arrow')
+    parser.add_argument('output', nargs='?', default='binned.arrow')
+    args = parser.parse_args()
+
+    df = load_dataset(args.input)  # Load your preprocessed dataset
+    df = preprocess_data(df)  # Apply the preprocessing function
+    save_dataset(df, args.output, 'binned', [args.input])  # Save the updated DataFrame
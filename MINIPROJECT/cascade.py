@@ -0,0 +1,279 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Members that cost microseconds per batch; the forests and boosted trees are the expensive ones
+CHEAP_MEMBERS = ('log_reg', 'naive_bayes')
+
+# Provisional probabilities (positive class, or top class for multi-class models) inside this band are uncertain
+DEFAULT_BAND = (0.2, 0.8)
+
+# Agreement with the full ensemble's labels the calibrated band must reach
+DEFAULT_TARGET_AGREEMENT = 0.995
+
+
+def ensemble_members(model):
+    """
+    The members of a soft-voting ensemble as (name, weight, predict_proba) triples.
+
+    Works on a fitted sklearn VotingClassifier and on a fused_model.FusedEnsemble.
+    The member methods are looked up at call time, so wrappers set later on the
+    instances (metrics.instrument_members) are still used.
+    """
+    if hasattr(model, 'member_names'):
+        return [(member['name'], member['weight'],
+                 lambda X, i=i, member=member: model._member_proba(X, i, member))
+                for i, member in enumerate(model.meta['members'])]
+    if getattr(model, 'voting', None) != 'soft':
+        raise ValueError('only soft-voting ensembles can be cascaded')
+    names = [name for name, est in model.estimators if est != 'drop']
+    weights = model._weights_not_none
+    if weights is None:
+        weights = [1.0] * len(names)
+    return [(name, float(weight), lambda X, est=est: est.predict_proba(X))
+            for name, weight, est in zip(names, weights, model.estimators_)]
+
+
+def _rows(X, index):
+    return X.iloc[index] if hasattr(X, 'iloc') else X[index]
+
+
+class CascadeEnsemble:
+    """
+    Soft-voting ensemble that runs its expensive members only where they can change the answer.
+
+    The cheap members score the whole batch first. Rows whose provisional
+    probability falls inside `band` are forwarded, as one sub-batch, to the
+    remaining members and get exactly the full ensemble's probability; every
+    other row keeps the cheap members' weighted average.
+
+    Parameters:
+    model: Fitted soft-voting VotingClassifier or FusedEnsemble.
+    band (tuple): (low, high), inclusive. For binary models it applies to the
+        positive class probability, otherwise to the top class probability.
+    cheap (list): Names of the members evaluated on every row.
+    """
+
+    def __init__(self, model, band=DEFAULT_BAND, cheap=CHEAP_MEMBERS):
+        self.model = model
+        self.band = (float(band[0]), float(band[1]))
+        self.classes_ = model.classes_
+        self.feature_names_in_ = getattr(model, 'feature_names_in_', None)
+        members = ensemble_members(model)
+        unknown = set(cheap) - {name for name, _, _ in members}
+        if unknown:
+            raise ValueError(f"the ensemble has no member {', '.join(sorted(unknown))}")
+        self.cheap = [member for member in members if member[0] in cheap]
+        self.expensive = [member for member in members if member[0] not in cheap]
+        if not self.cheap or not self.expensive:
+            raise ValueError('a cascade needs at least one cheap and one expensive member')
+        self.cheap_weight = sum(weight for _, weight, _ in self.cheap)
+        self.total_weight = self.cheap_weight + sum(weight for _, weight, _ in self.expensive)
+        self.rows = 0
+        self.forwarded = 0
+        self._lock = threading.Lock()
+
+    def _prepare(self, X):
+        # The fused ensemble converts to a float matrix once, not once per member
+        return self.model._matrix(X) if hasattr(self.model, '_matrix') else X
+
+    def uncertain(self, proba):
+        """Rows of provisional probabilities that fall inside the band."""
+        score = proba[:, 1] if proba.shape[1] == 2 else proba.max(axis=1)
+        return (score >= self.band[0]) & (score <= self.band[1])
+
+    def predict_proba(self, X):
+        X = self._prepare(X)
+        cheap_sum = sum(weight * proba(X) for _, weight, proba in self.cheap)
+        result = cheap_sum / self.cheap_weight
+        forward = np.flatnonzero(self.uncertain(result))
+        if len(forward):
+            subset = _rows(X, forward)
+            total = cheap_sum[forward] + sum(weight * proba(subset) for _, weight, proba in self.expensive)
+            result[forward] = total / self.total_weight
+        with self._lock:
+            self.rows += len(result)
+            self.forwarded += len(forward)
+        return result
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def stats(self):
+        with self._lock:
+            return {'band': list(self.band), 'cheap': [name for name, _, _ in self.cheap],
+                    'rows': self.rows, 'forwarded': self.forwarded,
+                    'forwarded_fraction': self.forwarded / self.rows if self.rows else None}
+
+
+def load_cascade(path, model):
+    """Wrap `model` in the cascade described by a calibration file written by `calibrate`."""
+    with open(path) as f:
+        config = json.load(f)
+    return CascadeEnsemble(model, config['band'], config['cheap'])
+
+
+def _best_time(fn, X, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(model, X, cheap=CHEAP_MEMBERS, target_agreement=DEFAULT_TARGET_AGREEMENT, grid=21, repeat=3,
+              single_rows=200):
+    """
+    Pick the band that forwards the fewest rows while agreeing with the full ensemble.
+
+    Every member is evaluated (and timed) once on the held-out rows; each
+    candidate band is then scored from those probabilities without
+    re-running the models. The chosen band is finally timed for real, on the
+    whole held-out batch and on `single_rows` one-row calls, against the full
+    `predict_proba`.
+
+    Parameters:
+    model: Fitted soft-voting VotingClassifier or FusedEnsemble.
+    X (DataFrame): Held-out features.
+    cheap (list): Members evaluated on every row.
+    target_agreement (float): Share of rows whose label must match the full ensemble.
+    grid (int): Candidate values for each end of the band.
+    repeat (int): Timing runs per measurement (best one kept).
+    single_rows (int): Rows scored one at a time for the per-request latency.
+
+    Returns:
+    dict: The chosen band with its agreement, forwarded share and timings,
+    plus the cheapest band reaching each of a few agreement levels.
+    """
+    cascade = CascadeEnsemble(model, (0.0, 1.0), cheap)
+    X = cascade._prepare(X)
+    member_seconds, cheap_sum, expensive_sum = {}, 0.0, 0.0
+    for name, weight, proba in cascade.cheap + cascade.expensive:
+        member_seconds[name] = _best_time(proba, X, repeat)
+        if name in cheap:
+            cheap_sum = cheap_sum + weight * proba(X)
+        else:
+            expensive_sum = expensive_sum + weight * proba(X)
+    provisional = cheap_sum / cascade.cheap_weight
+    full = (cheap_sum + expensive_sum) / cascade.total_weight
+    cheap_labels, full_labels = provisional.argmax(axis=1), full.argmax(axis=1)
+    score = provisional[:, 1] if provisional.shape[1] == 2 else provisional.max(axis=1)
+    cheap_seconds = sum(member_seconds[name] for name, _, _ in cascade.cheap)
+    expensive_seconds = sum(member_seconds[name] for name, _, _ in cascade.expensive)
+
+    # Binary bands may sit anywhere around 0.5; for the top class only an upper bound makes sense
+    if provisional.shape[1] == 2:
+        lows, highs = np.linspace(0.0, 0.5, grid), np.linspace(0.5, 1.0, grid)
+    else:
+        lows, highs = np.zeros(1), np.linspace(1.0 / provisional.shape[1], 1.0, grid)
+    disagree = cheap_labels != full_labels
+    candidates = []
+    for low in lows:
+        for high in highs:
+            forward = (score >= low) & (score <= high)
+            skipped = expensive_seconds * (1 - forward.mean())
+            candidates.append({
+                'band': [round(float(low), 6), round(float(high), 6)],
+                'forwarded_fraction': float(forward.mean()),
+                'agreement': 1.0 - float((disagree & ~forward).mean()),
+                'estimated_saving': float(skipped / (cheap_seconds + expensive_seconds)),
+            })
+    candidates.sort(key=lambda c: (c['forwarded_fraction'], -c['agreement']))
+
+    def cheapest(level):
+        return next(c for c in candidates if c['agreement'] >= level)
+
+    chosen = cheapest(target_agreement)
+    cascade.band = tuple(chosen['band'])
+    forward = cascade.uncertain(provisional)
+    kept = ~forward
+    single = _rows(X, np.arange(min(single_rows, len(X))))
+
+    def one_by_one(fn):
+        return lambda rows: [fn(_rows(rows, [i])) for i in range(len(rows))]
+
+    seconds = {
+        'full_batch': _best_time(model.predict_proba, X, repeat),
+        'cascade_batch': _best_time(cascade.predict_proba, X, repeat),
+        'full_single': _best_time(one_by_one(model.predict_proba), single, 1) / max(len(single), 1),
+        'cascade_single': _best_time(one_by_one(cascade.predict_proba), single, 1) / max(len(single), 1),
+    }
+    return {
+        **chosen,
+        'cheap': [name for name, _, _ in cascade.cheap],
+        'target_agreement': target_agreement,
+        'rows': len(X),
+        'max_abs_diff': float(np.abs(provisional[kept] - full[kept]).max()) if kept.any() else 0.0,
+        'member_seconds': member_seconds,
+        'seconds': seconds,
+        'saved_fraction': {'batch': 1 - seconds['cascade_batch'] / seconds['full_batch'],
+                           'single': 1 - seconds['cascade_single'] / seconds['full_single']},
+        'frontier': [{'agreement_at_least': level, **cheapest(level)} for level in (0.99, 0.995, 0.999, 1.0)],
+    }
+
+
+def holdout_split(data, test_size=0.4, random_state=42, rows=None):
+    """The test split of 'ensemble model.py' (same size and seed), i.e. rows the ensemble was not trained on."""
+    from sklearn.model_selection import train_test_split
+
+    from dataset_io import load_dataset
+    from schema import TARGET_COLUMN
+
+    df = load_dataset(data)
+    X, y = df.drop(columns=[TARGET_COLUMN]), df[TARGET_COLUMN]
+    _, X_test, _, _ = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    return X_test.head(rows) if rows else X_test
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Calibrate the uncertainty band of the cascade ensemble.')
+    parser.add_argument('model', help='joblib VotingClassifier or fused .npz artifact')
+    parser.add_argument('data', help="dataset the model was trained on; its held-out split is used")
+    parser.add_argument('--output', default='cascade.json', help='calibration file (PREDICT_CASCADE in app.py)')
+    parser.add_argument('--target-agreement', type=float, default=DEFAULT_TARGET_AGREEMENT)
+    parser.add_argument('--cheap', nargs='+', default=list(CHEAP_MEMBERS), help='members run on every row')
+    parser.add_argument('--rows', type=int, default=50000, help='held-out rows used (0: all)')
+    parser.add_argument('--grid', type=int, default=21, help='candidate values for each end of the band')
+    parser.add_argument('--test-size', type=float, default=0.4, help="test split of 'ensemble model.py'")
+    args = parser.parse_args(argv)
+
+    if args.model.endswith('.npz'):
+        from fused_model import FusedEnsemble
+        model = FusedEnsemble.load(args.model)
+    else:
+        import joblib
+        model = joblib.load(args.model)
+
+    from dataset_io import file_digest
+
+    X = holdout_split(args.data, args.test_size, rows=args.rows)
+    report = calibrate(model, X, args.cheap, args.target_agreement, args.grid)
+    report.update(model=os.path.abspath(args.model), model_sha256=file_digest(args.model),
+                  created=datetime.datetime.now(datetime.timezone.utc).isoformat())
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'agreement >=':>12} {'band':>16} {'forwarded':>10} {'est. saving':>12}")
+    for c in report['frontier']:
+        print(f"{c['agreement_at_least']:>12.3f} {str(c['band']):>16} {c['forwarded_fraction']:>10.1%} "
+              f"{c['estimated_saving']:>12.1%}")
+    s = report['seconds']
+    print(f"\nBand {report['band']} on {report['rows']} held-out rows: {report['agreement']:.2%} label agreement, "
+          f"{report['forwarded_fraction']:.1%} forwarded")
+    print(f"batch:  {s['full_batch'] * 1000:.1f} ms -> {s['cascade_batch'] * 1000:.1f} ms "
+          f"({report['saved_fraction']['batch']:.0%} saved)")
+    print(f"single: {s['full_single'] * 1000:.2f} ms -> {s['cascade_single'] * 1000:.2f} ms per row "
+          f"({report['saved_fraction']['single']:.0%} saved)")
+    print(f"Calibration written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
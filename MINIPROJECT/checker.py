@@ -1,13 +1,159 @@
-import os
-import pandas as pd
-import random
+import argparse
+import json
+import sys
+import time
+
 import numpy as np
+import pandas as pd
+
+from dataset_io import DEFAULT_BATCH_SIZE, iter_dataset, read_metadata
+from schema import (FEATURE_COLUMNS, FEATURE_DOMAINS, RAW_CONTINUOUS_COLUMNS, RAW_FEATURE_COLUMNS,
+                    RAW_FEATURE_DOMAINS, TARGET_COLUMN, TARGET_DOMAIN)
+
+# Expected columns and code domains of each kind of pipeline dataset
+DOMAINS = {
+    # convertor.py / combining.py output (finaldataset), before binning
+    'raw': (RAW_FEATURE_COLUMNS, {**RAW_FEATURE_DOMAINS, TARGET_COLUMN: TARGET_DOMAIN}, RAW_CONTINUOUS_COLUMNS),
+    # binner.py output and everything after it (binned, smote, relabelled), as predicotr.py assumes
+    'binned': (FEATURE_COLUMNS, {**FEATURE_DOMAINS, TARGET_COLUMN: TARGET_DOMAIN}, ()),
+}
+
+# Value counts are reported for integer columns with at most this many distinct codes
+MAX_CODES = 64
+
+
+def _code(value):
+    # JSON keys: '3' rather than '3.0' for integer codes
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def detect_domains(columns):
+    """'raw' when the dataset still has the unbinned Fruits/Veggies columns, else 'binned'."""
+    return 'raw' if {'Fruits', 'Veggies'} <= set(columns) else 'binned'
+
+
+def profile_dataset(path, domains='auto', chunksize=DEFAULT_BATCH_SIZE):
+    """
+    Profile a dataset in one chunked pass.
+
+    For every column: null count (non-numeric cells included), min/max, value
+    counts of the integer codes, and the values outside the expected code
+    domain (non-integer values count as violations except in continuous
+    columns such as raw BMI).
+
+    Parameters:
+    path (str): Dataset ('.arrow', '.parquet' or '.csv').
+    domains (str): 'raw', 'binned' or 'auto' (detected from the columns).
+    chunksize (int): Rows per chunk.
+
+    Returns:
+    dict: JSON-serializable profile; `ok` is False when a column is missing,
+    holds nulls or violates its domain.
+    """
+    columns = rows = None
+    nulls = low = high = violations = None
+    counts, bad_values = [], []
+    integer = None
+    start = time.perf_counter()
+    for chunk in iter_dataset(path, batch_size=chunksize):
+        if columns is None:
+            columns = list(chunk.columns)
+            if domains == 'auto':
+                domains = detect_domains(columns)
+            _, domain, continuous = DOMAINS[domains]
+            k = len(columns)
+            rows = 0
+            nulls, violations = np.zeros(k, dtype=np.int64), np.zeros(k, dtype=np.int64)
+            low, high = np.full(k, np.inf), np.full(k, -np.inf)
+            counts, bad_values = [{} for _ in range(k)], [{} for _ in range(k)]
+            integer = np.ones(k, dtype=bool)
+            bounds = np.array([domain.get(col, (-np.inf, np.inf)) for col in columns], dtype=np.float64)
+            must_be_integer = np.array([col in domain and col not in continuous for col in columns])
+
+        # Non-numeric cells (only possible in CSV input) are counted as nulls
+        values = chunk.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        rows += len(values)
+        missing = np.isnan(values)
+        nulls += missing.sum(axis=0)
+        if not len(values):
+            continue
+        low = np.fmin(low, np.nanmin(values, axis=0, initial=np.inf))
+        high = np.fmax(high, np.nanmax(values, axis=0, initial=-np.inf))
+
+        # Domain checks broadcast over the whole chunk
+        fractional = ~missing & (values != np.floor(np.where(missing, 0, values)))
+        integer &= ~fractional.any(axis=0)
+        with np.errstate(invalid='ignore'):
+            bad = ~missing & ((values < bounds[:, 0]) | (values > bounds[:, 1]) | (fractional & must_be_integer))
+        violations += bad.sum(axis=0)
+
+        for j in range(len(columns)):
+            if integer[j] and len(counts[j]) <= MAX_CODES:
+                keys, n = np.unique(values[~missing[:, j], j], return_counts=True)
+                for key, c in zip(keys.tolist(), n.tolist()):
+                    counts[j][key] = counts[j].get(key, 0) + c
+            if bad[:, j].any():
+                keys, n = np.unique(values[bad[:, j], j], return_counts=True)
+                for key, c in zip(keys.tolist(), n.tolist()):
+                    if key in bad_values[j] or len(bad_values[j]) < MAX_CODES:
+                        bad_values[j][key] = bad_values[j].get(key, 0) + c
+
+    if columns is None:
+        return {'path': path, 'rows': 0, 'ok': False, 'problems': ['dataset is empty']}
+
+    expected, domain, continuous = DOMAINS[domains]
+    profile = {'path': path, 'stage': (read_metadata(path) or {}).get('stage'), 'domains': domains,
+               'rows': rows, 'columns': {}}
+    problems = [f"missing column {col}" for col in expected + [TARGET_COLUMN] if col not in columns]
+    for j, col in enumerate(columns):
+        info = {
+            'nulls': int(nulls[j]),
+            'null_rate': round(float(nulls[j]) / rows, 6) if rows else 0.0,
+            'min': None if np.isinf(low[j]) else float(low[j]),
+            'max': None if np.isinf(high[j]) else float(high[j]),
+        }
+        if integer[j] and len(counts[j]) <= MAX_CODES:
+            info['value_counts'] = {_code(v): c for v, c in sorted(counts[j].items())}
+        if col in domain:
+            info['domain'] = list(domain[col])
+            info['violations'] = int(violations[j])
+            if violations[j]:
+                info['violating_values'] = {_code(v): c for v, c in sorted(bad_values[j].items())}
+                problems.append(f"{col}: {violations[j]} invalid values (expected {domain[col][0]}-{domain[col][1]})")
+        else:
+            problems.append(f"unexpected column {col}")
+        if nulls[j]:
+            problems.append(f"{col}: {nulls[j]} nulls")
+        profile['columns'][col] = info
+    profile['problems'] = problems
+    profile['ok'] = not problems
+    profile['seconds'] = round(time.perf_counter() - start, 3)
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile pipeline datasets and check their code domains.')
+    parser.add_argument('paths', nargs='*', default=['smote.arrow'])
+    parser.add_argument('--domains', choices=['auto', *DOMAINS], default='auto')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--output', help='write the JSON here instead of stdout')
+    parser.add_argument('--strict', action='store_true', help='exit with status 1 when any dataset has problems')
+    args = parser.parse_args(argv)
+
+    profiles = [profile_dataset(path, args.domains, args.chunksize) for path in args.paths]
+    report = profiles[0] if len(profiles) == 1 else {'datasets': profiles, 'ok': all(p['ok'] for p in profiles)}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    for profile in profiles:
+        for problem in profile['problems']:
+            print(f"{profile['path']}: {problem}", file=sys.stderr)
+    if args.strict and not all(p['ok'] for p in profiles):
+        sys.exit(1)
+
 
-# Load the dataset
-df = pd.read_csv(f'smote.csv')
-print(len(df.columns))
-# Display unique values for each column
-for column in df.columns:
-    print(f"Unique values for {column}:")
-    print(df[column].unique())
-    print("\n")
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,155 @@
-import pandas as pd 
-df1=pd.read_csv('preprocessed2015.csv')
-df2=pd.read_csv("preprocessed2013.csv")
-df_combined = pd.concat([df1, df2], ignore_index=True)
-df_combined.to_csv("finaldataset.csv",sep=',', index=False)
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import convertor
+from dataset_io import DatasetWriter, file_digest, iter_dataset
+
+MANIFEST = '_manifest.json'
+
+# Code the partitions depend on: the conversion, and the writer and column types it uses
+CONVERTER_FILES = ['convertor.py', 'dataset_io.py', 'schema.py']
+
+
+def converter_digest():
+    """SHA-256 over the CONVERTER_FILES, so an edit to any of them rebuilds every year."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    digests = [file_digest(os.path.join(here, filename)) for filename in CONVERTER_FILES]
+    return hashlib.sha256(''.join(digests).encode()).hexdigest()
+
+
+def source_state(path, previous=None):
+    """
+    Identify the current contents of a source file.
+
+    The SHA-256 is only recomputed when the size or modification time changed,
+    so an unchanged decade of BRFSS files costs a few stat calls.
+    """
+    stat = os.stat(path)
+    state = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if previous and all(previous.get(k) == state[k] for k in ('path', 'size', 'mtime_ns')):
+        state['sha256'] = previous['sha256']
+    else:
+        state['sha256'] = file_digest(path)
+    return state
+
+
+def convert_partition(year, source, out_dir, chunksize=200000):
+    """
+    Convert one BRFSS year into out_dir/year={year}/part-0.parquet.
+
+    Every year is cast to convertor.OUTPUT_SCHEMA, so all partitions share
+    one schema. The partition is written to a temporary directory and swapped
+    in at the end, so an interrupted run never leaves a half-written year behind.
+    """
+    final = os.path.join(out_dir, f'year={year}')
+    partial = final + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    with DatasetWriter(os.path.join(partial, 'part-0.parquet'), 'converted', [source], {'year': str(year)},
+                       schema=convertor.OUTPUT_SCHEMA) as writer:
+        for chunk in convertor.iter_converted_chunks(year, source, chunksize):
+            writer.write(chunk)
+    shutil.rmtree(final, ignore_errors=True)
+    os.rename(partial, final)
+    return year, writer.rows
+
+
+def build(years, source_pattern='{year}.csv', out_dir='dataset', jobs=None, force=False, chunksize=200000):
+    """
+    Build the multi-year dataset, converting only the years whose source changed.
+
+    Parameters:
+    years (list): Survey years to include, e.g. ['2013', '2015'].
+    source_pattern (str): Path of each raw file, formatted with the year.
+    out_dir (str): Root of the year-partitioned Parquet dataset.
+    jobs (int): Worker processes (defaults to one per stale year, capped by CPU count).
+    force (bool): Rebuild every year regardless of the manifest.
+
+    Returns:
+    dict: The updated manifest.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    # A change to the conversion code invalidates every year
+    converter = converter_digest()
+    partitions = manifest.get('years', {}) if manifest.get('converter_sha256') == converter else {}
+
+    stale = {}
+    for year in map(str, years):
+        state = source_state(source_pattern.format(year=year), partitions.get(year, {}).get('source'))
+        done = os.path.exists(os.path.join(out_dir, f'year={year}'))
+        if force or not done or partitions.get(year, {}).get('source', {}).get('sha256') != state['sha256']:
+            stale[year] = state
+        else:
+            partitions[year]['source'] = state
+            print(f"{year}: up to date")
+
+    for year in stale:
+        partitions.pop(year, None)  # only listed again once converted
+    error = None
+    if stale:
+        workers = min(len(stale), jobs or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(convert_partition, year, state['path'], out_dir, chunksize): year
+                       for year, state in stale.items()}
+            for future in as_completed(futures):
+                # A failed year does not cost the others: they are recorded and skipped on the next run
+                try:
+                    year, rows = future.result()
+                except Exception as e:
+                    print(f"{futures[future]}: failed: {e}")
+                    error = error or e
+                    continue
+                partitions[year] = {'source': stale[year], 'rows': rows}
+                print(f"{year}: converted {rows} rows")
+
+    manifest = {
+        'converter_sha256': converter,
+        'schema': {field.name: str(field.type) for field in convertor.OUTPUT_SCHEMA},
+        'years': partitions,
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    if error is not None:
+        raise error
+    return manifest
+
+
+def export_combined(out_dir, years, path):
+    """Concatenate the requested years into one dataset (the old finaldataset layout)."""
+    partitions = [os.path.join(out_dir, f'year={year}', 'part-0.parquet') for year in map(str, years)]
+    with DatasetWriter(path, 'combined', partitions, {'years': list(map(str, years))},
+                       schema=convertor.OUTPUT_SCHEMA) as writer:
+        for partition in partitions:
+            for chunk in iter_dataset(partition):
+                writer.write(chunk)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the multi-year BRFSS dataset in parallel.')
+    parser.add_argument('years', nargs='*', default=['2015', '2013'])
+    parser.add_argument('--source-pattern', default='{year}.csv', help="raw file per year (default: '{year}.csv')")
+    parser.add_argument('--out', default='dataset', help='output directory of the year-partitioned dataset')
+    parser.add_argument('--jobs', type=int, help='worker processes')
+    parser.add_argument('--force', action='store_true', help='rebuild every year')
+    parser.add_argument('--chunksize', type=int, default=200000)
+    parser.add_argument('--output', help='also write the combined rows to this dataset (e.g. finaldataset.arrow)')
+    args = parser.parse_args(argv)
+
+    build(args.years, args.source_pattern, args.out, args.jobs, args.force, args.chunksize)
+    if args.output:
+        export_combined(args.out, args.years, args.output)
+        print(f"Combined dataset saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,127 +1,223 @@
-import os
-import pandas as pd
-import random
+import argparse
+
 import numpy as np
+import pandas as pd
+import pyarrow as pa
 
-# Set random seed for reproducibility
-random.seed(1)
+from dataset_io import DatasetWriter
 
-# Load the dataset for the required year
-year = '2015'
-brfss_2015_dataset = pd.read_csv(f'{year}.csv')
+# BRFSS source columns (2015 names) and the names they get in the preprocessed file
+rename_columns = {
+    'TOLDHI2': 'HighChol',
+    '_BMI5': 'BMI',
+    'DIABETE3': 'Diabetes',
+    '_TOTINDA': 'PhysActivity',
+    '_FRTLT1': 'Fruits',
+    '_VEGLT1': 'Veggies',
+    '_RFDRHV5': 'HvyAlcoholConsump',
+    'GENHLTH': 'GenHlth',
+    'MENTHLTH': 'MentHlth',
+    'PHYSHLTH': 'PhysHlth',
+    'DIFFWALK': 'DiffWalk',
+    'SEX': 'Sex',
+    'EDUCA': 'Education',
+    'INCOME2': 'Income',
+    '_RFSMOK3': 'Current_Smoker',
+    '_INCOMG': 'Income_Category',
+    '_AGE_G': 'Age_Group',
+    'BPMEDS': 'On_BP_Medication',
+}
 
-# Select specific columns (with required adjustments, excluding 'BPHIGH4' and 'HighBP')
-columns_to_select = [
-    'TOLDHI2', '_BMI5', 'CVDSTRK3', 'DIABETE3', '_TOTINDA', 
-    '_FRTLT1', '_VEGLT1', '_RFDRHV5', 'GENHLTH', 'MENTHLTH', 'PHYSHLTH', 
-    'DIFFWALK', 'SEX', 'EDUCA', 'INCOME2', 
-    '_RFSMOK3', '_INCOMG', '_AGE_G', 'BPMEDS', 'CVDCRHD4', 'CVDINFR4', 'CVDSTRK3'  # New variables added
-]
+# Columns used to build the target variable
+target_columns = ['CVDCRHD4', 'CVDINFR4', 'CVDSTRK3']
 
-# Drop unnecessary columns
-brfss_df_selected = brfss_2015_dataset[columns_to_select]
+columns_to_select = list(rename_columns) + target_columns
 
-# Remove duplicate columns
-brfss_df_selected = brfss_df_selected.loc[:, ~brfss_df_selected.columns.duplicated()]
+# Names other BRFSS years use for the same variable with the same coding
+COLUMN_ALIASES = {
+    'TOLDHI2': ['TOLDHI3'],
+    'DIABETE3': ['DIABETE4'],
+    '_FRTLT1': ['_FRTLT1A'],
+    '_VEGLT1': ['_VEGLT1A'],
+    '_RFDRHV5': ['_RFDRHV4', '_RFDRHV6', '_RFDRHV7', '_RFDRHV8'],
+    'INCOME2': ['INCOME3'],
+}
 
-# Clean column names by stripping whitespace and removing special characters
-brfss_df_selected.columns = brfss_df_selected.columns.str.strip().str.replace(' ', '')
+# Output column order of preprocessed{year}.arrow ('Income' is only used to drop missing answers)
+OUTPUT_COLUMNS = [name for name in rename_columns.values() if name != 'Income'] + ['Heart_Disease_Status']
 
-# Drop missing values
-brfss_df_selected = brfss_df_selected.replace([77,99,'7', '9', 'BLANK', 'Don’t know/Not sure', 'Refused', 'Missing'], pd.NA)
-print(brfss_df_selected["TOLDHI2"].unique())
-brfss_df_selected = brfss_df_selected.dropna()
-print(brfss_df_selected["TOLDHI2"].unique())
+# Stored types of the output: small integer codes, float32 BMI
+OUTPUT_SCHEMA = pa.schema([
+    (column, pa.float32() if column == 'BMI' else pa.int8()) for column in OUTPUT_COLUMNS
+])
 
-# Convert specific variables to binary or categorical format
-brfss_df_selected['TOLDHI2'] = brfss_df_selected['TOLDHI2'].replace({2: 0, 1: 1})  # High cholesterol: 0 = No, 1 = Yes
-brfss_df_selected['_RFSMOK3'] = brfss_df_selected['_RFSMOK3'].replace({1: 0, 2: 1})  # Current smoker: 0 = No, 1 = Yes
-brfss_df_selected['BPMEDS'] = brfss_df_selected['BPMEDS'].replace({1: 1, 2: 0})  # Taking BP meds: 0 = No, 1 = Yes
-brfss_df_selected['MENTHLTH'] = brfss_df_selected['MENTHLTH'].replace({88: 0}) 
-brfss_df_selected['PHYSHLTH'] = brfss_df_selected['PHYSHLTH'].replace({88: 0}) 
+# Codes that mean "Don't know" / "Refused" in every selected column
+MISSING_CODES = (77, 99)
 
-# Create the target variable 'Heart_Disease_Status' with a default of 4 (Healthy)
-brfss_df_selected['Heart_Disease_Status'] = 4  # 4 = Healthy
+# Recodes applied to the raw values (before the original script's CSV round trip)
+RAW_RECODES = {
+    'TOLDHI2': {2: 0, 1: 1},       # High cholesterol: 0 = No, 1 = Yes
+    '_RFSMOK3': {1: 0, 2: 1},      # Current smoker: 0 = No, 1 = Yes
+    'BPMEDS': {1: 1, 2: 0},        # Taking BP meds: 0 = No, 1 = Yes
+    'MENTHLTH': {88: 0},
+    'PHYSHLTH': {88: 0},
+}
 
-# Update target status based on conditions
-brfss_df_selected.loc[brfss_df_selected['CVDCRHD4'] == 1, 'Heart_Disease_Status'] = 1  # Coronary Heart Disease
-brfss_df_selected.loc[brfss_df_selected['CVDINFR4'] == 1, 'Heart_Disease_Status'] = 2  # Myocardial Infarction
-brfss_df_selected.loc[brfss_df_selected['CVDSTRK3'] == 1, 'Heart_Disease_Status'] = 3  # Stroke
+# Recodes applied to the integer codes (NaN marks a row to drop)
+CODE_RECODES = {
+    '_TOTINDA': {2: 0, 9: np.nan},
+    'TOLDHI2': {7: np.nan, 9: np.nan},
+    'DIABETE3': {2: 1, 3: 0, 4: 0, 7: np.nan, 9: np.nan},
+    '_FRTLT1': {2: 0, 9: np.nan},
+    '_VEGLT1': {2: 0, 9: np.nan},
+    '_RFDRHV5': {1: 0, 2: 1, 9: np.nan},
+    'GENHLTH': {7: np.nan, 9: np.nan},
+    'MENTHLTH': {88: 0},
+    'PHYSHLTH': {88: 0},
+    'DIFFWALK': {2: 0, 7: np.nan, 9: np.nan},
+    'SEX': {1: 0, 2: 1},
+    'EDUCA': {9: np.nan},
+    '_RFSMOK3': {9: np.nan},
+    '_INCOMG': {9: np.nan},
+    'BPMEDS': {7: np.nan, 9: np.nan},
+}
 
-# Drop original columns used to create the target
-brfss_df_selected = brfss_df_selected.drop(columns=['CVDCRHD4', 'CVDINFR4', 'CVDSTRK3'], errors='ignore')
+# Size of the per-column lookup tables; every categorical BRFSS code is below it
+TABLE_SIZE = 256
 
-# Rename columns for clarity (excluding 'HighBP' and 'BPHIGH4')
-rename_columns = {
-    'TOLDHI2': 'HighChol', 
-    '_BMI5': 'BMI', 
-    'CVDSTRK3': 'Stroke', 
-    'DIABETE3': 'Diabetes', 
-    '_TOTINDA': 'PhysActivity', 
-    '_FRTLT1': 'Fruits', 
-    '_VEGLT1': 'Veggies', 
-    '_RFDRHV5': 'HvyAlcoholConsump', 
-    'GENHLTH': 'GenHlth', 
-    'MENTHLTH': 'MentHlth', 
-    'PHYSHLTH': 'PhysHlth', 
-    'DIFFWALK': 'DiffWalk', 
-    'SEX': 'Sex', 
-    'EDUCA': 'Education', 
-    'INCOME2': 'Income', 
-    '_RFSMOK3': 'Current_Smoker', 
-    '_INCOMG': 'Income_Category', 
-    '_AGE_G': 'Age_Group', 
-    'BPMEDS': 'On_BP_Medication'  
+
+def _lookup_table(*recodes):
+    # Identity table with each recode applied in turn
+    table = np.arange(TABLE_SIZE, dtype=np.float64)
+    for recode in recodes:
+        table = np.array([recode.get(int(v), v) if not np.isnan(v) else v for v in table])
+    return table
+
+
+# Integer-valued raw codes go through both recodes, other values only through the code recodes
+TABLES = {
+    column: (_lookup_table(RAW_RECODES.get(column, {}), CODE_RECODES.get(column, {})),
+             _lookup_table(CODE_RECODES.get(column, {})))
+    for column in rename_columns if column not in ('_BMI5', 'INCOME2')
 }
 
-brfss_df_selected = brfss_df_selected.rename(columns=rename_columns)
-
-# Save the preprocessed file
-brfss_df_selected.to_csv(f'preprocessed{year}.csv', sep=',', index=False)
-
-print(f"Preprocessed data saved to preprocessed{year}")
-
-df = pd.read_csv(f'preprocessed{year}.csv')
-
-# Convert all columns except the excluded ones
-exclude_columns = ['BMI']
-for column in df.columns:
-    if column not in exclude_columns:
-        df[column] = df[column].astype(int)  # Change to desired type (e.g., int, float)
-
-# Clean specific columns (like HighBP and PhysActivity)
-df['PhysActivity'] = df['PhysActivity'].replace({2: 0, 9: np.NaN})
-df['HighChol'] = df['HighChol'].replace({7: np.NaN, 9: np.NaN})
-df['BMI'] = df['BMI'] / 100  # Adjust BMI scale
-df['Diabetes'] = df['Diabetes'].replace({2: 1, 3: 0, 4: 0, 7: np.NaN, 9: np.NaN})
-df['Fruits'] = df['Fruits'].replace({2: 0, 9: np.NaN})
-df['Veggies'] = df['Veggies'].replace({2: 0, 9: np.NaN})
-df['HvyAlcoholConsump'] = df['HvyAlcoholConsump'].replace({1: 0, 2: 1, 9: np.NaN})
-df['GenHlth'] = df['GenHlth'].replace({7: np.NaN, 9: np.NaN})
-df['MentHlth'] = df['MentHlth'].replace({88: 0}) 
-df['PhysHlth'] = df['PhysHlth'].replace({88: 0}) 
-df['DiffWalk'] = df['DiffWalk'].replace({2: 0, 7: np.NaN, 9: np.NaN})
-df['Sex'] = df['Sex'].replace({1: 0, 2: 1})
-df['Education'] = df['Education'].replace({9: np.NaN})
-df['Income'] = df['Income'].replace({77: np.NaN, 99: np.NaN})
-df = df.drop(columns=['Income'])
-df['Current_Smoker'] = df['Current_Smoker'].replace({9: np.NaN})
-df['Income_Category'] = df['Income_Category'].replace({9: np.NaN})
-#df['Age_Group'] = df['Age_Group'].replace({:})
-df['On_BP_Medication'] = df['On_BP_Medication'].replace({7: np.NaN, 9: np.NaN})
-
-# Drop any rows with NaN values
-df = df.dropna()
-
-# Convert all columns except the excluded ones
-exclude_columns = ['BMI']
-for column in df.columns:
-    if column not in exclude_columns:
-        df[column] = df[column].astype(int)  # Change to desired type (e.g., int, float)
-
-print(df.head())
-
-# Save the final processed data
-output_path = f'preprocessed{year}.csv'
-df.to_csv(output_path, sep=',', index=False)
-print(f"Final preprocessed data saved to {output_path}")
+
+def resolve_columns(source, columns=None):
+    """
+    Map the canonical (2015) column names to the names used in `source`.
+
+    Parameters:
+    source (str): BRFSS CSV file.
+    columns (dict): Explicit canonical -> source name overrides.
+
+    Returns:
+    dict: Source column name for every canonical column.
+    """
+    header = set(pd.read_csv(source, nrows=0).columns.str.strip())
+    resolved = {}
+    for column in columns_to_select:
+        if columns and column in columns:
+            resolved[column] = columns[column]
+            continue
+        for candidate in [column] + COLUMN_ALIASES.get(column, []):
+            if candidate in header:
+                resolved[column] = candidate
+                break
+        else:
+            raise KeyError(f"{source} has no column for '{column}'")
+    return resolved
+
+
+def convert_chunk(chunk):
+    """
+    Apply every recode to one chunk of raw BRFSS rows in a single pass.
+
+    Parameters:
+    chunk (DataFrame): Raw rows with the canonical (2015) column names.
+
+    Returns:
+    DataFrame: Rows of preprocessed{year}.arrow; rows with missing answers are dropped.
+    """
+    raw = {column: chunk[column].to_numpy(dtype=np.float64) for column in columns_to_select}
+
+    # Drop rows with blank or "Don't know/Refused" answers in any selected column
+    keep = np.ones(len(chunk), dtype=bool)
+    for values in raw.values():
+        keep &= ~(np.isnan(values) | np.isin(values, MISSING_CODES))
+
+    out = {}
+    for column, name in rename_columns.items():
+        values = raw[column][keep]
+        if column == '_BMI5':
+            out[name] = values / 100  # Adjust BMI scale
+            continue
+        if column == 'INCOME2':
+            continue
+        codes = values.astype(np.int64)
+        both, code_only = TABLES[column]
+        in_table = (codes >= 0) & (codes < TABLE_SIZE)
+        index = np.where(in_table, codes, 0)
+        mapped = np.where(values == codes, both[index], code_only[index])
+        out[name] = np.where(in_table, mapped, codes)
+
+    # Heart_Disease_Status: 4 = Healthy, 1 = Coronary Heart Disease, 2 = Myocardial Infarction, 3 = Stroke
+    out['Heart_Disease_Status'] = np.select(
+        [raw['CVDSTRK3'][keep] == 1, raw['CVDINFR4'][keep] == 1, raw['CVDCRHD4'][keep] == 1], [3, 2, 1], 4)
+
+    df = pd.DataFrame(out, columns=OUTPUT_COLUMNS)
+    df = df.dropna()
+    return df.astype({column: np.int8 for column in OUTPUT_COLUMNS if column != 'BMI'})
+
+
+def iter_converted_chunks(year, source=None, chunksize=200000, columns=None):
+    """
+    Stream the preprocessed rows of one BRFSS year, one chunk at a time.
+
+    Only the selected columns are parsed, as float32, so memory use is bounded
+    by `chunksize` regardless of the size of the source file.
+    """
+    source = source or f'{year}.csv'
+    resolved = resolve_columns(source, columns)
+    source_to_canonical = {v: k for k, v in resolved.items()}
+    reader = pd.read_csv(source, usecols=list(source_to_canonical),
+                         dtype={name: np.float32 for name in source_to_canonical}, chunksize=chunksize)
+    for chunk in reader:
+        yield convert_chunk(chunk.rename(columns=source_to_canonical))
+
+
+def convert_year(year, source=None, output=None, chunksize=200000, columns=None):
+    """
+    Convert one BRFSS year to preprocessed{year}.arrow, writing the output incrementally.
+
+    Parameters:
+    year (str): Survey year, e.g. '2015'.
+    source (str): Raw BRFSS file (defaults to '{year}.csv').
+    output (str): Output dataset (defaults to 'preprocessed{year}.arrow'; '.parquet' and '.csv' also work).
+    chunksize (int): Rows read per chunk.
+    columns (dict): Canonical -> source column name overrides for unusual files.
+
+    Returns:
+    int: Number of rows written.
+    """
+    source = source or f'{year}.csv'
+    output = output or f'preprocessed{year}.arrow'
+    with DatasetWriter(output, 'converted', [source], {'year': str(year)}, schema=OUTPUT_SCHEMA) as writer:
+        for chunk in iter_converted_chunks(year, source, chunksize, columns):
+            writer.write(chunk)
+    return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert a raw BRFSS year to preprocessed{year}.arrow.')
+    parser.add_argument('year', nargs='?', default='2015')
+    parser.add_argument('--source', help="raw BRFSS CSV (default: '{year}.csv')")
+    parser.add_argument('--output', help="output dataset (default: 'preprocessed{year}.arrow')")
+    parser.add_argument('--chunksize', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    rows = convert_year(args.year, args.source, args.output, args.chunksize)
+    print(f"Final preprocessed data saved to {args.output or f'preprocessed{args.year}.arrow'} ({rows} rows)")
+
+
+if __name__ == '__main__':
+    main()
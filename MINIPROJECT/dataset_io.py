@@ -0,0 +1,293 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+# Key under which stage provenance is stored in the Arrow/Parquet schema metadata
+METADATA_KEY = b'miniproject'
+
+# Rows per record batch when reading a dataset in chunks
+DEFAULT_BATCH_SIZE = 200000
+
+
+def _format(path):
+    if os.path.isdir(path) or path.endswith('.parquet'):
+        return 'parquet'
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'arrow'
+
+
+def _smallest_dtype(low, high, integral):
+    if not integral:
+        return np.float32
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return dtype
+    return None
+
+
+def _numeric_ranges(df):
+    # column -> (min, max, integer-valued without missing values) of every numeric column
+    ranges = {}
+    for column in df.columns:
+        values = df[column]
+        if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            continue
+        array = values.to_numpy()
+        integral = array.dtype.kind in 'iu' or (len(array) and not np.isnan(array).any()
+                                                 and np.array_equal(array, np.floor(array)))
+        low, high = (array.min(), array.max()) if len(array) and integral else (0, 0)
+        ranges[column] = (low, high, bool(integral))
+    return ranges
+
+
+def compact_dtypes(df):
+    """
+    Downcast columns to the smallest exact type.
+
+    Integer-valued columns without missing values become int8 (or the
+    smallest integer type that fits); every other numeric column becomes float32.
+    """
+    casts = {column: _smallest_dtype(*bounds) for column, bounds in _numeric_ranges(df).items()}
+    return df.astype({column: dtype for column, dtype in casts.items() if dtype is not None})
+
+
+def csv_dtypes(path, columns=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    The compact_dtypes types of a CSV, chosen from all of its rows.
+
+    The file is scanned once in chunks, so every chunk can later be read
+    with the same types: a column does not come out int8 in one chunk and
+    int16 or float32 in the next.
+    """
+    ranges = None
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=batch_size):
+        found = _numeric_ranges(chunk)
+        if ranges is None:
+            ranges = found
+            continue
+        merged = {}
+        for column, (low, high, integral) in ranges.items():
+            if column in found:
+                other_low, other_high, other_integral = found[column]
+                merged[column] = (min(low, other_low), max(high, other_high), integral and other_integral)
+        ranges = merged
+    dtypes = {column: _smallest_dtype(*bounds) for column, bounds in (ranges or {}).items()}
+    return {column: dtype for column, dtype in dtypes.items() if dtype is not None}
+
+
+def file_digest(path):
+    """SHA-256 of a file (datasets, scripts, model artifacts), read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def provenance(stage, inputs=(), params=None):
+    """Describe how a dataset was produced: its stage, inputs and parameters."""
+    sources = []
+    for path in inputs:
+        entry = {'path': os.path.abspath(path)}
+        if os.path.exists(path):
+            stat = os.stat(path)
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            parent = read_metadata(path) if _format(path) != 'csv' else None
+            if parent:
+                entry['stage'] = parent.get('stage')
+        sources.append(entry)
+    return {
+        'stage': stage,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'inputs': sources,
+        'params': params or {},
+    }
+
+
+class DatasetWriter:
+    """
+    Write a dataset incrementally, one DataFrame chunk at a time.
+
+    The format follows the file extension: '.arrow' (Arrow IPC, memory-mappable),
+    '.parquet' or '.csv'. The file is written under a temporary name and moved
+    into place on close, so readers never see a partial file and a stage may
+    safely replace a dataset it is reading from.
+
+    Parameters:
+    path (str): Output file.
+    stage (str): Pipeline stage that produced the data (e.g. 'binned').
+    inputs (list): Files the stage read.
+    params (dict): Stage parameters worth recording.
+    schema (pyarrow.Schema): Fixed schema; inferred from the first chunk when None.
+    """
+
+    def __init__(self, path, stage, inputs=(), params=None, schema=None):
+        self.path = path
+        self.format = _format(path)
+        self.tmp_path = f'{path}.tmp{os.getpid()}'
+        self.metadata = provenance(stage, inputs, params)
+        self.schema = schema
+        self.rows = 0
+        self._writer = None
+        self._csv = None
+
+    def _open(self, table):
+        metadata = dict(self.metadata, schema={field.name: str(field.type) for field in table.schema})
+        self.schema = table.schema.with_metadata({METADATA_KEY: json.dumps(metadata)})
+        if self.format == 'parquet':
+            self._writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        else:
+            self._writer = ipc.new_file(self.tmp_path, self.schema)
+
+    def write(self, chunk):
+        if self.format == 'csv':
+            if self._csv is None:
+                self._csv = open(self.tmp_path, 'w', newline='')
+                chunk.to_csv(self._csv, index=False)
+            else:
+                chunk.to_csv(self._csv, header=False, index=False)
+            self.rows += len(chunk)
+            return
+        if self.schema is None:
+            chunk = compact_dtypes(chunk)
+        table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+        if self._writer is None:
+            self._open(table)
+        self._writer.write_table(table.replace_schema_metadata(self.schema.metadata))
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._csv is not None:
+            self._csv.close()
+        if self._writer is None and self._csv is None:
+            # Nothing was written: still produce an empty dataset
+            self.write(pd.DataFrame({name: pd.Series(dtype=field.to_pandas_dtype()) for name, field in
+                                     zip(self.schema.names, self.schema)}) if self.schema else pd.DataFrame())
+            return self.close()
+        if self._writer is not None:
+            self._writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._csv is not None:
+            self._csv.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def save_dataset(df, path, stage, inputs=(), params=None):
+    """Save a whole DataFrame as a typed dataset with its provenance."""
+    with DatasetWriter(path, stage, inputs, params) as writer:
+        writer.write(df)
+    return path
+
+
+def _read_table(path, columns=None, memory_map=True):
+    if _format(path) == 'parquet':
+        return pq.read_table(path, columns=columns, memory_map=memory_map)
+    source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+    table = ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+def load_dataset(path, columns=None, memory_map=True):
+    """
+    Load a dataset written by this module (or a legacy CSV) as a DataFrame.
+
+    Arrow files are memory-mapped, so numeric columns without nulls are
+    backed by the page cache instead of private copies.
+
+    Parameters:
+    path (str): '.arrow', '.parquet' (file or partitioned directory) or '.csv'.
+    columns (list): Only load these columns.
+    memory_map (bool): Map the file instead of reading it into memory.
+    """
+    if _format(path) == 'csv':
+        return compact_dtypes(pd.read_csv(path, usecols=columns))
+    return _read_table(path, columns, memory_map).to_pandas(split_blocks=True)
+
+
+def iter_dataset(path, columns=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield a dataset as DataFrame chunks of about `batch_size` rows.
+
+    Every chunk has the same column types. A CSV is scanned once first to
+    choose them (see csv_dtypes); Parquet files and partitioned directories
+    are streamed batch by batch, never loaded whole.
+    """
+    fmt = _format(path)
+    if fmt == 'csv':
+        dtypes = csv_dtypes(path, columns, batch_size)
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=batch_size):
+            yield chunk.astype(dtypes)
+    elif fmt == 'parquet' and not os.path.isdir(path):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+    elif fmt == 'parquet':
+        # Partition columns (e.g. year=2015) come back dictionary-encoded, as from pq.read_table
+        partitioning = ds.HivePartitioning.discover(infer_dictionary=True)
+        dataset = ds.dataset(path, format='parquet', partitioning=partitioning)
+        for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        table = _read_table(path, columns)
+        for batch in table.to_batches(max_chunksize=batch_size):
+            yield batch.to_pandas()
+
+
+def read_metadata(path):
+    """Return the provenance recorded in a dataset, or None for files without it."""
+    fmt = _format(path)
+    if fmt == 'csv':
+        return None
+    if fmt == 'parquet':
+        schema = pq.read_schema(path) if not os.path.isdir(path) else pq.ParquetDataset(path).schema
+    else:
+        with pa.memory_map(path) as source:
+            schema = ipc.open_file(source).schema
+    raw = (schema.metadata or {}).get(METADATA_KEY)
+    return json.loads(raw) if raw else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect or convert pipeline datasets.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    info = commands.add_parser('info', help='print the schema and provenance of a dataset')
+    info.add_argument('path')
+    convert = commands.add_parser('convert', help='convert a dataset (e.g. a legacy CSV) to another format')
+    convert.add_argument('source')
+    convert.add_argument('output')
+    convert.add_argument('--stage', required=True, help="stage name to record, e.g. 'balanced'")
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        print(json.dumps(read_metadata(args.path), indent=2))
+    else:
+        # Load the whole file so column types are chosen from all rows, not the first chunk
+        save_dataset(load_dataset(args.source), args.output, args.stage, [args.source])
+        print(f"Saved {args.source} to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,19 @@
-import pandas as pd
+import argparse
+
 import numpy as np
-from sklearn.model_selection import RandomizedSearchCV, train_test_split
+from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.ensemble import RandomForestClassifier
 from sklearn.naive_bayes import GaussianNB
 from xgboost import XGBClassifier
 from lightgbm import LGBMClassifier
 from sklearn.metrics import classification_report
-import joblib
-
-# 1️⃣ **Load Dataset**
-df = pd.read_csv('smote.csv')
-X = df.drop(columns=['Heart_Disease_Status'])  
-y = df['Heart_Disease_Status']
 
-# Split the dataset into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.4, random_state=42)
+from balance import resample
+from dataset_io import load_dataset
+from incremental import DEFAULT_CHUNKSIZE, save_model, train_incremental
+from parallel_ensemble import ParallelVotingClassifier
+from tuning import prefit_voting_classifier, successive_halving
 
 # 2️⃣ **Define Hyperparameter Grids**
 param_grids = {
@@ -56,49 +54,81 @@ models = {
     'lightgbm': LGBMClassifier(random_state=42)
 }
 
-# 4️⃣ **Hyperparameter Tuning for Each Model**
-best_models = {}
-
-for model_name, model in models.items():
-    print(f"Tuning {model_name}...")
-    param_grid = param_grids[model_name]
-    random_search = RandomizedSearchCV(
-        estimator=model,
-        param_distributions=param_grid,
-        n_iter=5,
-        scoring='accuracy',
-        cv=3,
-        verbose=2,
-        random_state=42,
-        n_jobs=-1
-    )
-    random_search.fit(X_train, y_train)
-    
-    print(f"Best parameters for {model_name}: {random_search.best_params_}")
-    print(f"Best score for {model_name}: {random_search.best_score_}")
-    
-    best_models[model_name] = random_search.best_estimator_
-
-# 5️⃣ **Voting Classifier**
-voting_clf = VotingClassifier(
-    estimators=[
-        ('log_reg', best_models['log_reg']),
-        ('random_forest', best_models['random_forest']),
-        ('naive_bayes', best_models['naive_bayes']),
-        ('xgboost', best_models['xgboost']),
-        ('lightgbm', best_models['lightgbm'])
-    ],
-    voting='soft'
-)
-
-# 6️⃣ **Train the Voting Classifier**
-voting_clf.fit(X_train, y_train)
-
-# 7️⃣ **Evaluate on the Test Set**
-y_pred = voting_clf.predict(X_test)
-print("\nClassification Report for Voting Classifier:\n")
-print(classification_report(y_test, y_pred))
-
-# 8️⃣ **Save the Final Ensemble Model**
-joblib.dump(voting_clf, 'ensemble_model_with_tuning.joblib')
-print("\nEnsemble model saved as 'ensemble_model_with_tuning.joblib'\n")
\ No newline at end of file
+
+def train_ensemble(data='relabelled.arrow', output='ensemble_model_with_tuning.joblib', n_iter=5, cv=3, n_jobs=-1,
+                   factor=3, results='tuning_results.json', balance=False):
+    """
+    Tune every base model, train the soft-voting ensemble and save it.
+
+    Parameters:
+    data (str): Training dataset (the relabelled SMOTE output).
+    output (str): Where to save the fitted VotingClassifier.
+    n_iter (int): Parameter settings sampled per model.
+    cv (int): Cross-validation folds.
+    n_jobs (int): Workers of the pool shared by every model's search.
+    factor (int): Successive halving rate.
+    results (str): Search results file; a later run on the same data reuses its scores.
+    balance (bool): Oversample the training split with SMOTE in memory, for unbalanced `data`;
+        the test split keeps the original class mix.
+
+    Returns:
+    VotingClassifier: The fitted ensemble.
+    """
+    # 1️⃣ **Load Dataset**
+    df = load_dataset(data)
+    X = df.drop(columns=['Heart_Disease_Status'])
+    y = df['Heart_Disease_Status']
+
+    # Split the dataset into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.4, random_state=42)
+    if balance:
+        X_train, y_train = resample(X_train, y_train, random_state=42, n_jobs=n_jobs)
+
+    # 4️⃣ **Hyperparameter Tuning for All Models on One Worker Pool**
+    best_models, summary = successive_halving(models, param_grids, X_train, y_train, n_iter=n_iter, cv=cv,
+                                              factor=factor, n_jobs=n_jobs, random_state=42,
+                                              results_path=results)
+    for model_name, info in summary.items():
+        print(f"{model_name}: {info['fits']} fits ({info['cached']} candidates reused), "
+              f"{info['fit_seconds']:.1f}s of fitting")
+
+    # 5️⃣ **Voting Classifier** (the tuned winners are used as fitted, not retrained)
+    voting_clf = prefit_voting_classifier(
+        [(model_name, best_models[model_name]) for model_name in models], X_train, y_train, voting='soft')
+
+    # 6️⃣ **Evaluate on the Test Set**
+    y_pred = ParallelVotingClassifier(voting_clf, n_jobs).predict(X_test)
+    print("\nClassification Report for Voting Classifier:\n")
+    print(classification_report(y_test, y_pred))
+
+    # 7️⃣ **Save the Final Ensemble Model**
+    save_model(voting_clf, output)
+    print(f"\nEnsemble model saved as '{output}'\n")
+    return voting_clf
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tune the base models and train the voting ensemble.')
+    parser.add_argument('data', nargs='?', default='relabelled.arrow')
+    parser.add_argument('output', nargs='?', default='ensemble_model_with_tuning.joblib')
+    parser.add_argument('--n-iter', type=int, default=5, help='candidates sampled per model')
+    parser.add_argument('--cv', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=-1, help='workers of the shared tuning pool')
+    parser.add_argument('--factor', type=int, default=3, help='successive halving rate')
+    parser.add_argument('--results', default='tuning_results.json', help='search results to warm-start from')
+    parser.add_argument('--balance', action='store_true',
+                        help='balance the training split in memory instead of reading an oversampled file')
+    parser.add_argument('--incremental', action='store_true',
+                        help='stream the data in chunks instead of tuning on it in memory (see incremental.py)')
+    parser.add_argument('--init', help='with --incremental: existing ensemble to fold the data into')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows per chunk with --incremental')
+    args = parser.parse_args()
+
+    if args.incremental:
+        summary = train_incremental(args.data, args.output, args.init, args.chunksize, n_jobs=args.jobs,
+                                    balance=args.balance)
+        print(f"Learned from {summary['rows']} rows in {summary['chunks']} chunks in {summary['seconds']:.1f}s; "
+              f"model saved as '{args.output}'")
+    else:
+        train_ensemble(args.data, args.output, args.n_iter, args.cv, args.jobs, args.factor, args.results,
+                       args.balance)
@@ -0,0 +1,443 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+# Values LightGBM treats as zero when a split uses missing_type 'Zero'
+LIGHTGBM_ZERO_THRESHOLD = 1e-35
+
+# Upper bound on (rows x trees) node indices held in memory while walking a forest
+WALK_BLOCK = 1 << 20
+
+# Below this many (row, tree) pairs it is cheaper to keep walking finished pairs than to compact them out
+COMPACT_MIN_PAIRS = 4096
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    np.exp(z, out=z)
+    return z / z.sum(axis=1, keepdims=True)
+
+
+def _binary_or_softmax(margin):
+    # Turn raw scores into class probabilities (one column means binary)
+    if margin.shape[1] == 1:
+        p = _sigmoid(margin[:, 0])
+        return np.column_stack([1.0 - p, p])
+    return _softmax(margin)
+
+
+class _TreeTable:
+    """
+    A forest flattened into parallel node arrays.
+
+    Leaves point to themselves, so walking every tree a fixed number of
+    levels (the depth of the deepest tree) lands each row on its leaf without
+    any per-tree branching in Python.
+    """
+
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right = [], [], [], []
+        self.default_left, self.missing_mode, self.value = [], [], []
+        self.roots, self.tree_class, self.depth = [], [], 0
+
+    def add_tree(self, feature, threshold, left, right, default_left, missing_mode, value, tree_class=0):
+        offset = sum(len(f) for f in self.feature)
+        n = len(feature)
+        nodes = np.arange(n)
+        is_leaf = np.asarray(left) < 0
+        left = np.where(is_leaf, nodes, left) + offset
+        right = np.where(is_leaf, nodes, right) + offset
+
+        # Depth of the tree, walking down from the root (node 0)
+        depth, stack = np.zeros(n, dtype=np.int64), [0]
+        while stack:
+            node = stack.pop()
+            if not is_leaf[node]:
+                for child in (left[node] - offset, right[node] - offset):
+                    depth[child] = depth[node] + 1
+                    stack.append(child)
+
+        self.feature.append(np.where(is_leaf, 0, feature).astype(np.int32))
+        self.threshold.append(np.asarray(threshold, dtype=np.float64))
+        self.left.append(left.astype(np.int32))
+        self.right.append(right.astype(np.int32))
+        self.default_left.append(np.asarray(default_left, dtype=bool))
+        self.missing_mode.append(np.asarray(missing_mode, dtype=np.int8))
+        self.value.append(np.asarray(value, dtype=np.float64))
+        self.roots.append(offset)
+        self.tree_class.append(tree_class)
+        self.depth = max(self.depth, int(depth.max()))
+
+    def arrays(self, prefix):
+        return {
+            f'{prefix}feature': np.concatenate(self.feature),
+            f'{prefix}threshold': np.concatenate(self.threshold),
+            f'{prefix}children': np.column_stack([np.concatenate(self.left), np.concatenate(self.right)]),
+            f'{prefix}default_left': np.concatenate(self.default_left),
+            f'{prefix}missing_mode': np.concatenate(self.missing_mode),
+            f'{prefix}value': np.concatenate(self.value),
+            f'{prefix}roots': np.asarray(self.roots, dtype=np.int32),
+            f'{prefix}tree_class': np.asarray(self.tree_class, dtype=np.int32),
+        }
+
+
+def _export_logistic(est):
+    coef = np.asarray(est.coef_, dtype=np.float64)
+    ovr = coef.shape[0] > 1 and (getattr(est, 'multi_class', 'auto') == 'ovr' or est.solver == 'liblinear')
+    return {'kind': 'linear', 'ovr': bool(ovr)}, {
+        'coef': coef, 'intercept': np.asarray(est.intercept_, dtype=np.float64)}
+
+
+def _export_sgd(est):
+    # Only the logistic loss has probabilities; multi-class SGD is one-vs-rest, normalized like liblinear
+    if est.loss != 'log_loss':
+        raise ValueError(f"SGDClassifier loss '{est.loss}' has no predict_proba")
+    coef = np.asarray(est.coef_, dtype=np.float64)
+    return {'kind': 'linear', 'ovr': bool(coef.shape[0] > 1)}, {
+        'coef': coef, 'intercept': np.asarray(est.intercept_, dtype=np.float64)}
+
+
+def _export_naive_bayes(est):
+    # Expand the Gaussian log likelihood into x^2 @ A + x @ B + c
+    var = np.asarray(est.var_, dtype=np.float64)
+    theta = np.asarray(est.theta_, dtype=np.float64)
+    const = (np.log(est.class_prior_) - 0.5 * np.sum(np.log(2.0 * np.pi * var), axis=1)
+             - 0.5 * np.sum(theta ** 2 / var, axis=1))
+    return {'kind': 'quadratic'}, {'square': (-0.5 / var).T, 'linear': (theta / var).T, 'const': const}
+
+
+def _export_forest(est):
+    table = _TreeTable()
+    for tree in est.estimators_:
+        t = tree.tree_
+        value = t.value[:, 0, :]
+        value = value / value.sum(axis=1, keepdims=True)
+        default_left = getattr(t, 'missing_go_to_left', np.zeros(t.node_count, dtype=bool))
+        table.add_tree(t.feature, t.threshold, t.children_left, t.children_right,
+                       default_left, np.ones(t.node_count), value)
+    # sklearn compares float32 inputs against float64 thresholds with <=
+    return {'kind': 'forest', 'strict': False, 'float32': True, 'depth': table.depth}, table.arrays('')
+
+
+def _export_xgboost(est):
+    booster = est.get_booster()
+    model = json.loads(bytes(booster.save_raw('json')))
+    learner = model['learner']
+    gbtree = learner['gradient_booster']
+    if gbtree['name'] != 'gbtree':
+        raise ValueError(f"XGBoost booster '{gbtree['name']}' is not supported")
+
+    objective = learner['objective']['name']
+    n_classes = max(1, int(learner['learner_model_param']['num_class']))
+    base = np.array([float(v) for v in learner['learner_model_param']['base_score'].strip('[]').split(',')])
+    if objective == 'binary:logistic':
+        base = np.log(base / (1.0 - base))
+    elif objective not in ('multi:softprob', 'multi:softmax'):
+        raise ValueError(f"XGBoost objective '{objective}' is not supported")
+
+    trees = gbtree['model']['trees']
+    tree_info = gbtree['model']['tree_info']
+    best_iteration = getattr(est, 'best_iteration', None)
+    if best_iteration is not None:
+        n_trees = int(gbtree['model']['iteration_indptr'][best_iteration + 1])
+        trees, tree_info = trees[:n_trees], tree_info[:n_trees]
+
+    table = _TreeTable()
+    for tree, tree_class in zip(trees, tree_info):
+        if any(tree['split_type']):
+            raise ValueError('XGBoost categorical splits are not supported')
+        left = np.asarray(tree['left_children'])
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        # Leaves keep their output in split_conditions
+        table.add_tree(tree['split_indices'], conditions, left, tree['right_children'],
+                       tree['default_left'], np.ones(len(left)), np.where(left < 0, conditions, 0.0), tree_class)
+    meta = {'kind': 'boosting', 'strict': True, 'float32': True, 'depth': table.depth,
+            'n_outputs': n_classes, 'link': 'logistic' if n_classes == 1 else 'softmax'}
+    arrays = table.arrays('')
+    arrays['base'] = np.broadcast_to(base, (n_classes,)).astype(np.float64)
+    return meta, arrays
+
+
+def _export_lightgbm(est):
+    model = est.booster_.dump_model()
+    objective = model['objective'].split()
+    if model.get('average_output'):
+        raise ValueError('LightGBM random forest mode is not supported')
+    if objective[0] not in ('binary', 'multiclass'):
+        raise ValueError(f"LightGBM objective '{objective[0]}' is not supported")
+    sigmoid = 1.0
+    for param in objective[1:]:
+        if param.startswith('sigmoid:'):
+            sigmoid = float(param.split(':')[1])
+
+    missing_modes = {'None': 0, 'NaN': 1, 'Zero': 2}
+    per_iteration = model['num_tree_per_iteration']
+    table = _TreeTable()
+    for tree in model['tree_info']:
+        nodes = []
+
+        def visit(node):
+            index = len(nodes)
+            nodes.append(None)
+            if 'leaf_value' in node or 'leaf_index' in node:
+                nodes[index] = (0, 0.0, -1, -1, False, 0, node.get('leaf_value', 0.0))
+                return index
+            if node['decision_type'] != '<=':
+                raise ValueError('LightGBM categorical splits are not supported')
+            left = visit(node['left_child'])
+            right = visit(node['right_child'])
+            nodes[index] = (node['split_feature'], node['threshold'], left, right,
+                            node['default_left'], missing_modes[node['missing_type']], 0.0)
+            return index
+
+        visit(tree['tree_structure'])
+        columns = list(zip(*nodes))
+        table.add_tree(*columns, tree_class=tree['tree_index'] % per_iteration)
+    meta = {'kind': 'boosting', 'strict': False, 'float32': False, 'depth': table.depth,
+            'n_outputs': per_iteration, 'link': 'logistic' if per_iteration == 1 else 'softmax'}
+    arrays = table.arrays('')
+    # Scale the margin so the logistic link reproduces LightGBM's sigmoid parameter
+    arrays['value'] = arrays['value'] * (sigmoid if per_iteration == 1 else 1.0)
+    arrays['base'] = np.zeros(per_iteration)
+    return meta, arrays
+
+
+EXPORTERS = {
+    'LogisticRegression': _export_logistic,
+    'SGDClassifier': _export_sgd,
+    'GaussianNB': _export_naive_bayes,
+    'RandomForestClassifier': _export_forest,
+    'ExtraTreesClassifier': _export_forest,
+    'XGBClassifier': _export_xgboost,
+    'LGBMClassifier': _export_lightgbm,
+}
+
+
+def export_ensemble(voting_clf):
+    """
+    Convert a fitted soft-voting VotingClassifier into a FusedEnsemble.
+
+    Linear and naive Bayes members become closed-form weight matrices and the
+    tree ensembles become flattened node tables, so the result only needs
+    NumPy at prediction time.
+
+    Parameters:
+    voting_clf (VotingClassifier): A fitted classifier with voting='soft'.
+
+    Returns:
+    FusedEnsemble: The equivalent pure-NumPy predictor.
+    """
+    if getattr(voting_clf, 'voting', None) != 'soft':
+        raise ValueError('only soft-voting ensembles can be fused')
+
+    names = [name for name, est in voting_clf.estimators if est != 'drop']
+    weights = voting_clf._weights_not_none
+    members, arrays = [], {}
+    for i, (name, est) in enumerate(zip(names, voting_clf.estimators_)):
+        kind = type(est).__name__
+        if kind not in EXPORTERS:
+            raise TypeError(f"cannot fuse ensemble member '{name}' of type {kind}")
+        meta, member_arrays = EXPORTERS[kind](est)
+        members.append({'name': name, 'type': kind, 'weight': 1.0 if weights is None else float(weights[i]), **meta})
+        arrays.update({f'{i}/{key}': value for key, value in member_arrays.items()})
+
+    meta = {
+        'classes': np.asarray(voting_clf.classes_).tolist(),
+        'feature_names': [str(c) for c in getattr(voting_clf, 'feature_names_in_', [])],
+        'members': members,
+    }
+    return FusedEnsemble(meta, arrays)
+
+
+class FusedEnsemble:
+    """
+    Pure-NumPy soft-voting predictor produced by `export_ensemble`.
+
+    Parameters:
+    meta (dict): Classes, feature names and per-member settings.
+    arrays (dict): Member weights and tree tables keyed by '<member>/<name>'.
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+        self.classes_ = np.asarray(meta['classes'])
+        self.feature_names_in_ = meta['feature_names']
+        self.member_names = [member['name'] for member in meta['members']]
+        self._has_zero_missing = any(
+            np.any(arrays[f'{i}/missing_mode'] == 2)
+            for i, member in enumerate(meta['members']) if member['kind'] in ('forest', 'boosting'))
+
+    def save(self, path):
+        """Write the ensemble to a single uncompressed .npz file."""
+        np.savez(path, __meta__=np.array(json.dumps(self.meta)), **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load an ensemble written by `save`; only NumPy is imported."""
+        with np.load(path, allow_pickle=False) as bundle:
+            arrays = {key: bundle[key] for key in bundle.files}
+        meta = json.loads(str(arrays.pop('__meta__')))
+        return cls(meta, arrays)
+
+    def _matrix(self, X):
+        # Accept DataFrames (reordered by name) or plain arrays in model order
+        if hasattr(X, 'columns') and self.feature_names_in_:
+            X = X[self.feature_names_in_]
+        return np.asarray(X, dtype=np.float64)
+
+    def _walk(self, X, i, member):
+        a = lambda key: self.arrays[f'{i}/{key}']  # noqa: E731
+        feature, threshold, roots = a('feature'), a('threshold'), a('roots')
+        children = a('children').ravel()
+        is_leaf = children[0::2] == np.arange(len(feature))
+        check_missing = np.isnan(X).any() or self._has_zero_missing
+        if member['float32']:
+            X = X.astype(np.float32).astype(np.float64)
+
+        n_trees, n_features = len(roots), X.shape[1]
+        block = max(1, WALK_BLOCK // n_trees)
+        leaves = np.empty(len(X) * n_trees, dtype=np.int32)
+        for start in range(0, len(X), block):
+            Xb = np.ascontiguousarray(X[start:start + block]).ravel()
+            n_rows = len(Xb) // n_features
+            # One entry per (row, tree) pair; pairs that reach a leaf are dropped from the walk
+            pair = np.arange(n_rows * n_trees)
+            offset = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, n_trees)
+            nodes = np.tile(roots, n_rows)
+            result = leaves[start * n_trees:(start + n_rows) * n_trees]
+            for _ in range(member['depth']):
+                x = Xb[offset + feature[nodes]]
+                t = threshold[nodes]
+                go_right = x >= t if member['strict'] else x > t
+                if check_missing:
+                    mode = a('missing_mode')[nodes]
+                    missing = np.isnan(x)
+                    zero = (mode == 0) & missing
+                    go_right[zero] = (0.0 >= t[zero]) if member['strict'] else (0.0 > t[zero])
+                    missing = (missing & (mode >= 1)) | ((mode == 2) & (np.abs(x) <= LIGHTGBM_ZERO_THRESHOLD))
+                    go_right = np.where(missing, ~a('default_left')[nodes], go_right)
+                nodes = children[2 * nodes + go_right]
+                done = is_leaf[nodes]
+                if done.all():
+                    break
+                if len(nodes) >= COMPACT_MIN_PAIRS and done.any():
+                    result[pair[done]] = nodes[done]
+                    walking = ~done
+                    pair, offset, nodes = pair[walking], offset[walking], nodes[walking]
+            result[pair] = nodes
+        return leaves.reshape(len(X), n_trees)
+
+    def member_proba(self, X, name):
+        """Class probabilities from a single ensemble member."""
+        i = self.member_names.index(name)
+        return self._member_proba(self._matrix(X), i, self.meta['members'][i])
+
+    def _member_proba(self, X, i, member):
+        a = lambda key: self.arrays[f'{i}/{key}']  # noqa: E731
+        if member['kind'] == 'linear':
+            margin = X @ a('coef').T + a('intercept')
+            if member['ovr']:
+                p = _sigmoid(margin)
+                return p / p.sum(axis=1, keepdims=True)
+            return _binary_or_softmax(margin)
+        if member['kind'] == 'quadratic':
+            return _softmax((X ** 2) @ a('square') + X @ a('linear') + a('const'))
+        leaves = self._walk(X, i, member)
+        if member['kind'] == 'forest':
+            proba = np.zeros((len(X), a('value').shape[1]))
+            for column in leaves.T:
+                proba += a('value')[column]
+            return proba / leaves.shape[1]
+        # Boosting: sum the leaf outputs of each class's trees on top of the base score
+        margin = np.tile(a('base'), (len(X), 1))
+        leaf_values = a('value')[leaves]
+        for k in range(member['n_outputs']):
+            margin[:, k] += leaf_values[:, a('tree_class') == k].sum(axis=1)
+        return _binary_or_softmax(margin)
+
+    def predict_proba(self, X):
+        """Weighted average of the members' class probabilities (soft voting)."""
+        X = self._matrix(X)
+        total, weight_sum = 0.0, 0.0
+        for i, member in enumerate(self.meta['members']):
+            total = total + member['weight'] * self._member_proba(X, i, member)
+            weight_sum += member['weight']
+        return total / weight_sum
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def check_parity(voting_clf, fused, X, atol=1e-5):
+    """
+    Compare the fused predictor against the original ensemble on X.
+
+    Returns:
+    dict: Maximum absolute probability difference overall and per member, and
+    whether every difference is within `atol`.
+    """
+    import pandas as pd
+
+    if getattr(voting_clf, 'feature_names_in_', None) is not None and not hasattr(X, 'columns'):
+        X = pd.DataFrame(X, columns=voting_clf.feature_names_in_)
+    report = {'rows': len(X), 'members': {}}
+    for name, est in zip(fused.member_names, voting_clf.estimators_):
+        diff = np.abs(fused.member_proba(X, name) - est.predict_proba(X)).max()
+        report['members'][name] = float(diff)
+    report['max_abs_diff'] = float(np.abs(fused.predict_proba(X) - voting_clf.predict_proba(X)).max())
+    report['ok'] = report['max_abs_diff'] <= atol and all(d <= atol for d in report['members'].values())
+    return report
+
+
+def _time_call(fn, X, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a soft-voting ensemble to a fused NumPy predictor.')
+    parser.add_argument('model', help='joblib file with the fitted VotingClassifier')
+    parser.add_argument('output', help='where to write the fused .npz artifact')
+    parser.add_argument('--check', metavar='CSV', help='dataset used to verify predict_proba parity')
+    parser.add_argument('--rows', type=int, default=10000, help='rows of the dataset used for the check')
+    parser.add_argument('--atol', type=float, default=1e-5)
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    voting_clf = joblib.load(args.model)
+    fused = export_ensemble(voting_clf)
+    fused.save(args.output)
+    print(f"Fused ensemble saved to {args.output}")
+
+    if args.check:
+        from dataset_io import load_dataset
+        from schema import TARGET_COLUMN
+
+        X = load_dataset(args.check).head(args.rows).drop(columns=[TARGET_COLUMN], errors='ignore')
+        report = check_parity(voting_clf, FusedEnsemble.load(args.output), X, atol=args.atol)
+        for batch in (1, len(X)):
+            report[f'seconds_batch_{batch}'] = {
+                'original': _time_call(voting_clf.predict_proba, X.iloc[:batch]),
+                'fused': _time_call(fused.predict_proba, X.iloc[:batch]),
+            }
+        print(json.dumps(report, indent=2))
+        if not report['ok']:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+import argparse
+import math
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import classification_report
+from sklearn.naive_bayes import GaussianNB
+from sklearn.preprocessing import LabelEncoder
+from xgboost import XGBClassifier
+
+from balance import SmoteSampler
+from dataset_io import iter_dataset, load_dataset
+from schema import TARGET_COLUMN
+from tuning import prefit_voting_classifier
+
+# Rows per training chunk; peak memory grows with this, not with the dataset
+DEFAULT_CHUNKSIZE = 100000
+
+# Trees the random forest grows on every chunk (warm start)
+DEFAULT_TREES_PER_CHUNK = 10
+
+# Boosting rounds XGBoost and LightGBM add on every chunk
+DEFAULT_ROUNDS_PER_CHUNK = 10
+
+# Size limits, so the model (and its prediction time) does not grow with the data seen:
+# the forest keeps its newest trees, the boosters stop adding rounds
+DEFAULT_MAX_TREES = 500
+DEFAULT_MAX_ROUNDS = 1000
+
+# Constant SGD step when continuing from a tuned LogisticRegression: larger steps
+# (or sklearn's 'optimal' schedule, which starts large) walk away from its coefficients
+SEEDED_ETA0 = 1e-4
+
+
+def dataset_classes(path, target=TARGET_COLUMN):
+    """Every class of a dataset, from one streamed pass over its target column."""
+    classes = set()
+    for chunk in iter_dataset(path, columns=[target]):
+        classes.update(np.unique(chunk[target]).tolist())
+    return np.array(sorted(classes))
+
+
+class IncrementalEnsemble:
+    """
+    The five-member soft-voting ensemble, trained one chunk at a time.
+
+    - log_reg: SGDClassifier with the logistic loss, one epoch per chunk. A
+      fitted LogisticRegression is replaced by an SGDClassifier that starts
+      from its coefficients and takes small constant steps.
+    - naive_bayes: GaussianNB.partial_fit, which updates the class means and
+      variances exactly.
+    - xgboost / lightgbm: `rounds_per_chunk` more boosting rounds, continuing
+      from the current booster, until it has `max_rounds`. Earlier rounds
+      cannot be dropped (later ones correct them), so a full booster is kept
+      as it is.
+    - random_forest: `trees_per_chunk` more trees grown on the chunk (warm
+      start); beyond `max_trees` the oldest trees are dropped.
+
+    The tree members need every class in a chunk. A chunk without them only
+    updates log_reg and naive_bayes.
+
+    Parameters:
+    model (VotingClassifier): Fitted ensemble to continue from; None starts from scratch.
+    classes (array-like): Labels of a new ensemble (taken from `model` otherwise).
+    trees_per_chunk (int): Trees added to the forest per chunk.
+    rounds_per_chunk (int): Boosting rounds added per chunk.
+    n_jobs (int): Threads of the forest and boosting members.
+    random_state (int): Seed of every member.
+    max_trees (int): Most trees the forest keeps.
+    max_rounds (int): Most boosting rounds of XGBoost and LightGBM.
+    """
+
+    def __init__(self, model=None, classes=None, trees_per_chunk=DEFAULT_TREES_PER_CHUNK,
+                 rounds_per_chunk=DEFAULT_ROUNDS_PER_CHUNK, n_jobs=None, random_state=42,
+                 max_trees=DEFAULT_MAX_TREES, max_rounds=DEFAULT_MAX_ROUNDS):
+        self.trees_per_chunk = trees_per_chunk
+        self.rounds_per_chunk = rounds_per_chunk
+        self.max_trees = max_trees
+        self.max_rounds = max_rounds
+        self.random_state = random_state
+        self.le = model.le_ if model is not None else LabelEncoder().fit(classes)
+        self.encoded_classes = self.le.transform(self.le.classes_)
+        self.feature_names = list(model.feature_names_in_) if model is not None else None
+        if model is not None:
+            self.members = dict(model.named_estimators_)
+        else:
+            self.members = {
+                'log_reg': SGDClassifier(loss='log_loss', random_state=random_state),
+                'random_forest': RandomForestClassifier(n_estimators=0, warm_start=True, n_jobs=n_jobs,
+                                                        random_state=random_state),
+                'naive_bayes': GaussianNB(),
+                'xgboost': XGBClassifier(eval_metric='logloss', n_jobs=n_jobs, random_state=random_state),
+                'lightgbm': LGBMClassifier(n_jobs=n_jobs, random_state=random_state, verbose=-1),
+            }
+        self.rows = 0
+        self.partial_rows = 0  # rows only the partial_fit members saw
+
+    def _update_log_reg(self, est, X, y):
+        if isinstance(est, LogisticRegression):
+            # One SGD epoch starting from the fitted coefficients, then partial_fit from there on
+            sgd = SGDClassifier(loss='log_loss', learning_rate='constant', eta0=SEEDED_ETA0, max_iter=1, tol=None,
+                                random_state=self.random_state)
+            return sgd.fit(X, y, coef_init=est.coef_, intercept_init=est.intercept_)
+        return est.partial_fit(X, y, classes=self.encoded_classes)
+
+    def _update_forest(self, est, X, y):
+        fitted = len(getattr(est, 'estimators_', []))
+        est.set_params(warm_start=True, n_estimators=fitted + self.trees_per_chunk).fit(X, y)
+        if len(est.estimators_) > self.max_trees:
+            # A sliding window over the data: the trees grown on the oldest chunks go first
+            est.estimators_ = est.estimators_[-self.max_trees:]
+            est.n_estimators = len(est.estimators_)
+        return est
+
+    def _new_rounds(self, fitted_rounds):
+        return min(self.rounds_per_chunk, self.max_rounds - fitted_rounds)
+
+    def _update_xgboost(self, est, X, y):
+        booster = est.get_booster() if est.__sklearn_is_fitted__() else None
+        rounds = self._new_rounds(booster.num_boosted_rounds() if booster is not None else 0)
+        if rounds <= 0:
+            return est
+        return est.set_params(n_estimators=rounds).fit(X, y, xgb_model=booster)
+
+    def _update_lightgbm(self, est, X, y):
+        booster = est.booster_ if est.__sklearn_is_fitted__() else None
+        rounds = self._new_rounds(booster.current_iteration() if booster is not None else 0)
+        if rounds <= 0:
+            return est
+        return est.set_params(n_estimators=rounds).fit(X, y, init_model=booster)
+
+    def partial_fit(self, X, y):
+        """Fold one chunk into every member (only log_reg and naive_bayes when a class is missing)."""
+        if self.feature_names is None:
+            self.feature_names = list(X.columns)
+        X = X[self.feature_names]
+        y = self.le.transform(np.asarray(y))
+        complete = len(np.unique(y)) == len(self.encoded_classes)
+        for name, est in self.members.items():
+            if name == 'log_reg':
+                self.members[name] = self._update_log_reg(est, X, y)
+            elif name == 'naive_bayes':
+                est.partial_fit(X, y, classes=self.encoded_classes)
+            elif not complete:
+                continue
+            elif name == 'random_forest':
+                self._update_forest(est, X, y)
+            elif name == 'xgboost':
+                self._update_xgboost(est, X, y)
+            elif name == 'lightgbm':
+                self._update_lightgbm(est, X, y)
+            else:
+                raise ValueError(f"don't know how to update ensemble member '{name}' incrementally")
+        self.rows += len(X)
+        if not complete:
+            self.partial_rows += len(X)
+        return self
+
+    def voting_classifier(self):
+        """The members as a fitted soft-voting VotingClassifier (the artifact format of 'ensemble model.py')."""
+        X = pd.DataFrame(columns=self.feature_names)
+        return prefit_voting_classifier(list(self.members.items()), X, self.le.classes_, voting='soft')
+
+
+def save_model(model, path):
+    # Swapped in atomically, so a server polling the file never loads half of it
+    tmp = f'{path}.tmp{os.getpid()}'
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
+
+
+def class_complete_chunks(chunks, classes, target=TARGET_COLUMN):
+    """
+    Regroup chunks so each holds every class.
+
+    A chunk missing a class is held back and merged with the following ones
+    until all classes are present, so the tree members do not skip it. Only
+    a trailing remainder can still lack a class.
+    """
+    held = []
+    for chunk in chunks:
+        held.append(chunk)
+        present = set(np.unique(np.concatenate([c[target].to_numpy() for c in held])).tolist())
+        if present >= set(classes.tolist()):
+            yield held[0] if len(held) == 1 else pd.concat(held, ignore_index=True)
+            held = []
+    if held:
+        yield pd.concat(held, ignore_index=True)
+
+
+def balanced_chunks(path, chunksize=DEFAULT_CHUNKSIZE, n_jobs=None, random_state=42, target=TARGET_COLUMN):
+    """
+    Class-balanced (X, y) chunks of `path`, oversampled with SMOTE on the fly.
+
+    As many rows are drawn as the dataset holds, in chunks of `chunksize`
+    rows with every class equally represented (see SmoteSampler.batches), so
+    no oversampled file is written. The features and the neighbour tables of
+    the minority classes stay in memory.
+    """
+    df = load_dataset(path)
+    sampler = SmoteSampler(df.drop(columns=[target]), df[target], n_jobs=n_jobs, chunksize=chunksize,
+                           random_state=random_state)
+    n_batches = math.ceil(len(df) / chunksize)
+    del df
+    return sampler.batches(chunksize, n_batches)
+
+
+def evaluate(model, path, chunksize=DEFAULT_CHUNKSIZE, target=TARGET_COLUMN):
+    """Classification report of `model` on a dataset, predicted chunk by chunk."""
+    y_true, y_pred = [], []
+    for chunk in iter_dataset(path, batch_size=chunksize):
+        y_true.append(chunk[target].to_numpy())
+        y_pred.append(model.predict(chunk.drop(columns=[target])[list(model.feature_names_in_)]))
+    return classification_report(np.concatenate(y_true), np.concatenate(y_pred))
+
+
+def train_incremental(data, output, init=None, chunksize=DEFAULT_CHUNKSIZE, trees_per_chunk=DEFAULT_TREES_PER_CHUNK,
+                      rounds_per_chunk=DEFAULT_ROUNDS_PER_CHUNK, n_jobs=None, random_state=42, target=TARGET_COLUMN,
+                      max_trees=DEFAULT_MAX_TREES, max_rounds=DEFAULT_MAX_ROUNDS, progress=True, balance=False):
+    """
+    Train the ensemble on a dataset streamed in chunks, or fold new rows into an existing one.
+
+    Only one chunk (plus the held-back chunks that lacked a class) is in
+    memory at a time, and the time taken grows with the rows in `data` only,
+    not with the data the `init` model was trained on.
+
+    Parameters:
+    data (str): Dataset to learn from (e.g. a new BRFSS year, binned and relabelled).
+    output (str): Where to save the updated VotingClassifier.
+    init (str): Existing ensemble artifact to continue from; None trains a new one.
+    chunksize (int): Rows per chunk.
+    trees_per_chunk (int): Trees added to the forest per chunk.
+    rounds_per_chunk (int): Boosting rounds added per chunk.
+    n_jobs (int): Threads of the forest and boosting members.
+    max_trees (int): Most trees the forest keeps (the oldest are dropped).
+    max_rounds (int): Most boosting rounds of XGBoost and LightGBM.
+    balance (bool): Train on class-balanced SMOTE chunks (see balanced_chunks), for unbalanced `data`.
+
+    Returns:
+    dict: Rows and chunks learned from, rows only seen by the partial_fit members, seconds.
+    """
+    start = time.perf_counter()
+    model = joblib.load(init) if init else None
+    classes = model.classes_ if model is not None else dataset_classes(data, target)
+    ensemble = IncrementalEnsemble(model, classes, trees_per_chunk, rounds_per_chunk, n_jobs, random_state,
+                                   max_trees, max_rounds)
+
+    if balance:
+        batches = balanced_chunks(data, chunksize, n_jobs, random_state, target)
+    else:
+        batches = ((chunk.drop(columns=[target]), chunk[target])
+                   for chunk in class_complete_chunks(iter_dataset(data, batch_size=chunksize), classes, target))
+    chunks = 0
+    for X, y in batches:
+        ensemble.partial_fit(X, y)
+        chunks += 1
+        if progress:
+            seconds = time.perf_counter() - start
+            print(f"\r{ensemble.rows} rows, {chunks} chunks, {ensemble.rows / seconds:,.0f} rows/s", end='',
+                  file=sys.stderr)
+    if progress:
+        print(file=sys.stderr)
+
+    save_model(ensemble.voting_classifier(), output)
+    return {'rows': ensemble.rows, 'chunks': chunks, 'partial_rows': ensemble.partial_rows,
+            'seconds': round(time.perf_counter() - start, 3)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the voting ensemble out of core, or update it with new rows.')
+    parser.add_argument('data', help='dataset streamed in chunks (binned and relabelled)')
+    parser.add_argument('output', nargs='?', default='ensemble_model_incremental.joblib')
+    parser.add_argument('--init', help='existing ensemble to fold the new rows into')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--trees-per-chunk', type=int, default=DEFAULT_TREES_PER_CHUNK)
+    parser.add_argument('--rounds-per-chunk', type=int, default=DEFAULT_ROUNDS_PER_CHUNK)
+    parser.add_argument('--max-trees', type=int, default=DEFAULT_MAX_TREES, help='the forest keeps its newest trees')
+    parser.add_argument('--max-rounds', type=int, default=DEFAULT_MAX_ROUNDS, help='boosters stop growing here')
+    parser.add_argument('--jobs', type=int, help='threads of the forest and boosting members')
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--balance', action='store_true',
+                        help='train on class-balanced chunks oversampled on the fly instead of reading a SMOTE file')
+    parser.add_argument('--eval', help='dataset to report the updated model on, read in chunks')
+    args = parser.parse_args()
+
+    summary = train_incremental(args.data, args.output, args.init, args.chunksize, args.trees_per_chunk,
+                                args.rounds_per_chunk, args.jobs, args.random_state, max_trees=args.max_trees,
+                                max_rounds=args.max_rounds, balance=args.balance)
+    print(f"Learned from {summary['rows']} rows in {summary['chunks']} chunks in {summary['seconds']:.1f}s; "
+          f"model saved as '{args.output}'")
+    if summary['partial_rows']:
+        print(f"{summary['partial_rows']} trailing rows lacked a class and only updated log_reg and naive_bayes")
+    if args.eval:
+        print(evaluate(joblib.load(args.output), args.eval, args.chunksize))
@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def lag_matrix(values, lag):
+    """
+    Lagged copies of a series as one strided view, without per-lag copies.
+
+    Parameters:
+    values (array-like): 1D series in time order.
+    lag (int): Number of lags.
+
+    Returns:
+    ndarray: Read-only view of shape (len(values) - lag, lag) whose row t holds
+    values[t + lag - 1], ..., values[t] (lag_1 first), i.e. the history of
+    values[t + lag].
+    """
+    values = np.asarray(values)
+    if len(values) <= lag:
+        return np.empty((0, lag), dtype=values.dtype)
+    return sliding_window_view(values[:-1], lag)[:, ::-1]
+
+
+def lagged_design_matrix(features, target, lag):
+    """
+    Base features followed by lag_1..lag_n of the target, in one allocation.
+
+    Rows without a full history (the first `lag`) are dropped, as the
+    shift + dropna version did.
+
+    Parameters:
+    features (ndarray): 2D base features, one row per time step.
+    target (ndarray): 1D target series aligned with `features`.
+    lag (int): Number of lags.
+
+    Returns:
+    tuple: (design matrix of shape (n - lag, n_features + lag), target[lag:])
+    """
+    features = np.asarray(features, dtype=np.float64)
+    target = np.asarray(target)
+    n, n_features = features.shape
+    X = np.empty((max(n - lag, 0), n_features + lag))
+    X[:, :n_features] = features[lag:]
+    X[:, n_features:] = lag_matrix(target, lag)
+    return X, target[lag:]
+
+
+class LagBuffer:
+    """
+    Bounded per-entity ring buffers of the most recent targets.
+
+    `observe` and `lags` cost O(lag) regardless of history length. Only the
+    `max_entities` most recently used entities are kept; the least recently
+    used one is evicted when a new entity arrives.
+
+    Parameters:
+    capacity (int): Targets remembered per entity (the model's lag).
+    max_entities (int): Entities kept in memory.
+    """
+
+    def __init__(self, capacity, max_entities=100000):
+        self.capacity = int(capacity)
+        self.max_entities = int(max_entities)
+        self._entities = OrderedDict()  # entity -> [ring array, next position, count]
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def observe(self, entity, value):
+        """Append one observed target of `entity`."""
+        with self._lock:
+            state = self._entities.get(entity)
+            if state is None:
+                state = self._entities[entity] = [np.zeros(self.capacity), 0, 0]
+                if len(self._entities) > self.max_entities:
+                    self._entities.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._entities.move_to_end(entity)
+            ring, position, count = state
+            ring[position] = value
+            state[1] = (position + 1) % self.capacity
+            state[2] = min(count + 1, self.capacity)
+
+    def lags(self, entity, lag=None):
+        """
+        The last `lag` targets of `entity`, most recent first (lag_1, lag_2, ...),
+        or None when fewer have been observed.
+        """
+        lag = self.capacity if lag is None else lag
+        with self._lock:
+            state = self._entities.get(entity)
+            if state is None or state[2] < lag:
+                return None
+            self._entities.move_to_end(entity)
+            ring, position, _ = state
+            return ring[(position - 1 - np.arange(lag)) % self.capacity]
+
+    def history(self, entity):
+        """Number of targets remembered for `entity`."""
+        with self._lock:
+            state = self._entities.get(entity)
+            return 0 if state is None else state[2]
+
+    def resized(self, capacity):
+        """A copy with room for `capacity` targets per entity, keeping what fits."""
+        buffer = LagBuffer(capacity, self.max_entities)
+        with self._lock:
+            for entity, (ring, position, count) in self._entities.items():
+                keep = min(count, capacity)
+                recent = ring[(position - 1 - np.arange(keep)) % self.capacity]
+                for value in recent[::-1]:
+                    buffer.observe(entity, value)
+        return buffer
+
+    def stats(self):
+        with self._lock:
+            return {'entities': len(self._entities), 'max_entities': self.max_entities,
+                    'capacity': self.capacity, 'evictions': self.evictions}
@@ -0,0 +1,89 @@
+import argparse
+import datetime
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from dataset_io import load_dataset
+from lag_features import lagged_design_matrix
+from schema import TARGET_COLUMN
+
+# Number of previous targets used as extra features
+DEFAULT_LAG = 5
+
+
+def train_lag_model(data, lag=DEFAULT_LAG, target=TARGET_COLUMN, random_state=42):
+    """
+    Fit the scaler and linear model served by app1.py.
+
+    Parameters:
+    data (DataFrame): Training rows, in order, with the target column.
+    lag (int): Number of lagged targets used as features.
+
+    Returns:
+    dict: The artifact: scaler, model, feature names, lag and class metadata.
+    """
+    features = [column for column in data.columns if column != target]
+    columns = features + [f"lag_{i}" for i in range(1, lag + 1)]
+    X, y = lagged_design_matrix(data[features].to_numpy(dtype=np.float64), data[target].to_numpy(), lag)
+
+    # Standardize the features (optional, can help linear regression)
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=random_state)
+
+    model = LinearRegression()
+    model.fit(X_train, y_train)
+
+    # Class metadata is computed once here instead of on every request
+    classes = np.unique(y)
+    return {
+        'scaler': scaler,
+        'model': model,
+        'base_features': features,
+        'features': columns,
+        'lag': lag,
+        'classes': classes.tolist(),
+        'is_binary': len(classes) == 2,
+        'test_r2': float(model.score(X_test, y_test)),
+        'trained_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def save_artifact(artifact, path):
+    # Uncompressed and swapped in atomically, so a server polling the file never reads half of it
+    tmp = f'{path}.tmp{os.getpid()}'
+    joblib.dump(artifact, tmp)
+    os.replace(tmp, path)
+
+
+def load_artifact(path):
+    artifact = joblib.load(path)
+    missing = {'scaler', 'model', 'features', 'lag', 'is_binary'} - set(artifact)
+    if missing:
+        raise ValueError(f"{path} is not a lag model artifact (missing {', '.join(sorted(missing))})")
+    return artifact
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the lagged linear model served by app1.py.')
+    parser.add_argument('data', nargs='?', default='smote.arrow')
+    parser.add_argument('output', nargs='?', default='lag_model.joblib')
+    parser.add_argument('--lag', type=int, default=DEFAULT_LAG)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    artifact = train_lag_model(load_dataset(args.data), args.lag)
+    artifact['source'] = os.path.abspath(args.data)
+    save_artifact(artifact, args.output)
+    print(f"Lag model saved to {args.output} in {time.perf_counter() - start:.1f}s "
+          f"({len(artifact['features'])} features, test R^2 {artifact['test_r2']:.3f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,35 @@
-import pandas as pd
+import argparse
 
-# Load the dataset
-df = pd.read_csv('smote.csv')
+from dataset_io import load_dataset, save_dataset
 
-# Convert values of Heart_Disease_Status from 4 to 1
-df['Heart_Disease_Status'] = df['Heart_Disease_Status'].replace(4, 0)
 
-# Save the modified dataset back to the same file
-df.to_csv('smote.csv', index=False)
+def relabel(source='smote.arrow', output='relabelled.arrow'):
+    """
+    Mark the healthy class (Heart_Disease_Status 4) as 0.
 
-print("Conversion complete. Values of 4 in 'Heart_Disease_Status' have been changed to 1.")
\ No newline at end of file
+    The result is written to a new dataset; `source` is never modified,
+    so running the step twice gives the same output.
+
+    Parameters:
+    source (str): Balanced dataset.
+    output (str): Relabelled dataset to write.
+    """
+    # Load the dataset
+    df = load_dataset(source)
+
+    # Convert values of Heart_Disease_Status from 4 to 0
+    df['Heart_Disease_Status'] = df['Heart_Disease_Status'].replace(4, 0)
+
+    # Save the modified dataset to a new file
+    save_dataset(df, output, 'relabelled', [source])
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Relabel Heart_Disease_Status 4 (healthy) as 0.')
+    parser.add_argument('source', nargs='?', default='smote.arrow')
+    parser.add_argument('output', nargs='?', default='relabelled.arrow')
+    args = parser.parse_args()
+
+    relabel(args.source, args.output)
+    print(f"Conversion complete. Values of 4 in 'Heart_Disease_Status' have been changed to 0 in {args.output}.")
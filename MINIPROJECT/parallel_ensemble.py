@@ -0,0 +1,164 @@
+import copy
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from cascade import ensemble_members
+
+# Batches larger than this are split into row shards, so every member's work spreads over the pool
+DEFAULT_SHARD_ROWS = 50000
+
+# Below this many rows the members run one after another: dispatching to the pool would cost more than it saves
+DEFAULT_MIN_PARALLEL_ROWS = 64
+
+# Member parameters that set their own prediction threads (RandomForest, XGBoost, LightGBM)
+THREAD_PARAMS = ('n_jobs',)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def shared_pool(n_jobs):
+    """The process-wide thread pool every ParallelVotingClassifier submits to (grown if more threads are asked for)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._max_workers < n_jobs:
+            old, _pool = _pool, ThreadPoolExecutor(n_jobs, thread_name_prefix='ensemble')
+            if old is not None:
+                old.shutdown(wait=False)
+        return _pool
+
+
+class _NativeThreadLimit:
+    """
+    Cap BLAS and OpenMP threads while at least one parallel prediction runs.
+
+    threadpoolctl limits are process-wide, so concurrent predictions share one
+    limit: the first to start sets it and the last to finish restores it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+        self._limiter = None
+
+    @contextmanager
+    def __call__(self, threads):
+        with self._lock:
+            if self._active == 0:
+                self._limiter = threadpool_limits(limits=threads)
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                if self._active == 0:
+                    self._limiter.restore_original_limits()
+                    self._limiter = None
+
+
+_native_limit = _NativeThreadLimit()
+
+
+def thread_limited(est, threads):
+    """
+    A shallow copy of a fitted member that predicts with `threads` threads.
+
+    The copy shares the fitted trees, so it costs almost no memory, and the
+    member itself keeps its settings. Members without their own threading
+    are returned as they are.
+    """
+    params = est.get_params(deep=False) if hasattr(est, 'get_params') else {}
+    threads_params = [name for name in THREAD_PARAMS if name in params]
+    if not threads_params:
+        return est
+    member = copy.copy(est)
+    vars(member).pop('predict_proba', None)  # a timing wrapper set on the original would call the original
+    if hasattr(member, '_other_params'):
+        member._other_params = dict(member._other_params)  # LightGBM's set_params writes into this dict
+    if hasattr(member, 'get_xgb_params') and member.__sklearn_is_fitted__():
+        member._Booster = member.get_booster().copy()  # XGBoost's set_params writes into its booster
+    return member.set_params(**dict.fromkeys(threads_params, threads))
+
+
+def _take(X, start, stop):
+    return X.iloc[start:stop] if hasattr(X, 'iloc') else X[start:stop]
+
+
+class ParallelVotingClassifier:
+    """
+    Drop-in soft-voting predictor that evaluates the ensemble members concurrently.
+
+    Each member's predict_proba runs as a task on a thread pool shared by
+    every instance; the tree predictors and NumPy release the GIL, so the
+    members overlap on separate cores. Batches above `shard_rows` are also
+    split into row shards, giving (members x shards) tasks. The probabilities
+    are summed in member order, so results do not depend on scheduling.
+
+    To avoid oversubscription, members with their own threading (n_jobs of
+    the forest, XGBoost and LightGBM) are predicted through copies set to
+    `inner_threads` (see thread_limited), and BLAS/OpenMP pools are capped to
+    the same count during a prediction. `model` itself is not changed, so it
+    can still be served or saved as it is.
+
+    Parameters:
+    model: Fitted soft-voting VotingClassifier or FusedEnsemble.
+    n_jobs (int): Threads of the shared pool (-1 or None: all cores).
+    shard_rows (int): Largest number of rows per task.
+    min_parallel_rows (int): Smaller batches are predicted serially in the calling thread.
+    inner_threads (int): Threads each member may use itself (default: cores // n_jobs, at least 1).
+    """
+
+    def __init__(self, model, n_jobs=None, shard_rows=DEFAULT_SHARD_ROWS, min_parallel_rows=DEFAULT_MIN_PARALLEL_ROWS,
+                 inner_threads=None):
+        cores = os.cpu_count() or 1
+        self.model = model
+        self.n_jobs = cores if n_jobs in (None, -1) else max(int(n_jobs), 1)
+        self.shard_rows = max(int(shard_rows), 1)
+        self.min_parallel_rows = min_parallel_rows
+        self.inner_threads = inner_threads or max(cores // self.n_jobs, 1)
+        self.classes_ = model.classes_
+        self.feature_names_in_ = getattr(model, 'feature_names_in_', None)
+        self.named_estimators_ = {name: thread_limited(est, self.inner_threads)
+                                  for name, est in getattr(model, 'named_estimators_', {}).items()}
+        self.members = []
+        for name, weight, proba in ensemble_members(model):
+            if name in self.named_estimators_:
+                # Looked up at call time, like ensemble_members, so timing wrappers set later are used
+                proba = lambda X, est=self.named_estimators_[name]: est.predict_proba(X)  # noqa: E731
+            self.members.append((name, weight, proba))
+        self.total_weight = sum(weight for _, weight, _ in self.members)
+
+    def _prepare(self, X):
+        # One conversion for every member and shard
+        if hasattr(self.model, '_matrix'):
+            return self.model._matrix(X)
+        if self.feature_names_in_ is not None and not hasattr(X, 'columns'):
+            return pd.DataFrame(X, columns=self.feature_names_in_)
+        return X
+
+    def predict_proba(self, X):
+        X = self._prepare(X)
+        n = len(X)
+        if n < self.min_parallel_rows or self.n_jobs == 1:
+            total = sum(weight * proba(X) for _, weight, proba in self.members)
+            return total / self.total_weight
+
+        bounds = [(start, min(start + self.shard_rows, n)) for start in range(0, n, self.shard_rows)]
+        pool = shared_pool(self.n_jobs)
+        with _native_limit(self.inner_threads):
+            futures = [[pool.submit(proba, _take(X, start, stop)) for start, stop in bounds]
+                       for _, _, proba in self.members]
+            result = 0.0
+            for (_, weight, _), shards in zip(self.members, futures):
+                result = result + weight * np.concatenate([future.result() for future in shards])
+        return result / self.total_weight
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
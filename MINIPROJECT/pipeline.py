@@ -0,0 +1,415 @@
+import argparse
+import ast
+import graphlib
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import resource
+import shutil
+import sys
+import time
+import tracemalloc
+
+from combining import source_state
+from dataset_io import file_digest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Where stage outputs are cached, one directory per stage and cache key
+DEFAULT_CACHE_DIR = '.pipeline_cache'
+
+# Marker written last into a cache entry; entries without it are incomplete
+STAGE_RECORD = '_stage.json'
+
+
+def load_script(filename):
+    """Import a pipeline script by file name (several contain spaces, e.g. 'mini con.py')."""
+    name = os.path.splitext(filename)[0].replace(' ', '_')
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def imported_scripts(source):
+    """Pipeline scripts (modules next to this file) that a piece of source imports."""
+    names = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    scripts = {name.split('.')[0] + '.py' for name in names}
+    return sorted(script for script in scripts if os.path.exists(os.path.join(HERE, script)))
+
+
+def code_files(scripts, func=None):
+    """`scripts` and `func`'s imports, plus every pipeline script they import in turn."""
+    pending = list(scripts) + (imported_scripts(inspect.getsource(func)) if func else [])
+    found = set()
+    while pending:
+        script = pending.pop()
+        if script in found:
+            continue
+        found.add(script)
+        if script == os.path.basename(__file__):
+            continue  # the stage functions here are hashed on their own
+        with open(os.path.join(HERE, script), encoding='utf-8') as f:
+            pending += imported_scripts(f.read())
+    return sorted(found)
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Parameters:
+    name (str): Stage name, also the name of its cache directory.
+    func (callable): Called as func(inputs, outputs, **params, **options) with
+        dicts of input and output paths; it must write every output path.
+    inputs (dict): Logical input name -> output name of another stage, or a file path.
+    outputs (dict): Output name -> file name it is published under.
+    params (dict): Parameters that change the result; part of the cache key.
+    options (dict): Parameters that do not change the result (e.g. worker counts).
+    code (list): Scripts whose source is part of the cache key. The scripts
+        they and `func` import are followed and added (see code_files), so
+        this only needs the scripts loaded by name, like 'mini con.py'.
+    """
+
+    def __init__(self, name, func, inputs, outputs, params=None, options=None, code=()):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+        self.options = options or {}
+        self.code = list(code)
+
+
+class Pipeline:
+    """
+    Run stages as a DAG, skipping every stage whose cache key is already cached.
+
+    A stage's key is the SHA-256 of its name, parameters, code (its function
+    and every pipeline script it imports) and inputs, where
+    an upstream input contributes its producer's key and an external file its
+    content hash. Outputs are written into a fresh cache entry, never over an
+    existing file, and then linked into the working directory, so an interrupted
+    run resumes at the stage that failed and editing a late stage only reruns
+    that stage and the ones after it.
+
+    Parameters:
+    stages (list): Stage objects.
+    cache_dir (str): Root of the stage cache.
+    workdir (str): Directory where external inputs are read and outputs published.
+    """
+
+    def __init__(self, stages, cache_dir=DEFAULT_CACHE_DIR, workdir='.'):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir
+        self.workdir = workdir
+        self.producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"output '{output}' is produced by both {self.producers[output]} and {stage.name}")
+                self.producers[output] = stage.name
+
+    def dependencies(self, stage):
+        return {self.producers[ref] for ref in stage.inputs.values() if ref in self.producers}
+
+    def order(self, targets=None):
+        """Stage names in dependency order, restricted to what `targets` need."""
+        graph = {name: self.dependencies(stage) for name, stage in self.stages.items()}
+        needed = set()
+        pending = list(targets or self.stages)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"unknown stage '{name}'")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(graph[name])
+        return [name for name in graphlib.TopologicalSorter(graph).static_order() if name in needed]
+
+    def _source_states(self):
+        path = os.path.join(self.cache_dir, 'sources.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_source_states(self, states):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, 'sources.json'), 'w') as f:
+            json.dump(states, f, indent=2)
+
+    def stage_key(self, stage, keys, states):
+        inputs = {}
+        for name, ref in sorted(stage.inputs.items()):
+            if ref in self.producers:
+                inputs[name] = keys[self.producers[ref]] + ':' + ref
+            else:
+                path = os.path.join(self.workdir, ref)
+                states[path] = source_state(path, states.get(path))
+                inputs[name] = states[path]['sha256']
+        description = {
+            'stage': stage.name,
+            'params': stage.params,
+            'func': hashlib.sha256(inspect.getsource(stage.func).encode()).hexdigest(),
+            'code': {filename: file_digest(os.path.join(HERE, filename))
+                     for filename in code_files(stage.code, stage.func)},
+            'inputs': inputs,
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def entry(self, stage, key):
+        return os.path.join(self.cache_dir, stage.name, key)
+
+    def publish(self, stage, entry):
+        """Hard-link (or copy) the cached outputs into the working directory."""
+        for name, filename in stage.outputs.items():
+            source = os.path.join(entry, filename)
+            target = os.path.join(self.workdir, filename)
+            if os.path.exists(target) and os.path.samefile(source, target):
+                continue
+            tmp = f'{target}.tmp{os.getpid()}'
+            try:
+                os.link(source, tmp)
+            except OSError:
+                shutil.copy2(source, tmp)
+            os.replace(tmp, target)
+
+    def run(self, targets=None, force=(), dry_run=False, trace_memory=False):
+        """
+        Run the stages `targets` depend on (all stages by default).
+
+        Parameters:
+        targets (list): Stages to bring up to date.
+        force (list): Stages to rerun even when cached.
+        dry_run (bool): Only report which stages would run.
+        trace_memory (bool): Also report each stage's peak traced Python memory. tracemalloc
+            slows allocation-heavy stages down a lot, so their times are then inflated.
+
+        Returns:
+        list: One report dict per stage with its status, time and memory.
+        """
+        states = self._source_states()
+        keys, paths, report = {}, {}, []
+        for name in self.order(targets):
+            stage = self.stages[name]
+            key = keys[name] = self.stage_key(stage, keys, states)
+            entry = self.entry(stage, key)
+            for output, filename in stage.outputs.items():
+                paths[output] = os.path.join(entry, filename)
+            cached = os.path.exists(os.path.join(entry, STAGE_RECORD)) and name not in force
+            if cached or dry_run:
+                report.append({'stage': name, 'key': key, 'status': 'cached' if cached else 'would run'})
+                if cached and not dry_run:
+                    self.publish(stage, entry)
+                continue
+
+            inputs = {n: paths[ref] if ref in self.producers else os.path.join(self.workdir, ref)
+                      for n, ref in stage.inputs.items()}
+            partial = entry + '.partial'
+            shutil.rmtree(partial, ignore_errors=True)
+            os.makedirs(partial)
+            outputs = {output: os.path.join(partial, filename) for output, filename in stage.outputs.items()}
+
+            print(f"[{name}] running ({key})")
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                stage.func(inputs, outputs, **stage.params, **stage.options)
+            finally:
+                if trace_memory:
+                    _, traced_peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+            seconds = time.perf_counter() - start
+
+            missing = [path for path in outputs.values() if not os.path.exists(path)]
+            if missing:
+                raise RuntimeError(f"stage {name} did not write {', '.join(missing)}")
+            record = {
+                'stage': name, 'key': key, 'status': 'ran', 'seconds': round(seconds, 3),
+                'process_peak_rss_mb': round(peak_rss_mb(), 1),
+                'params': stage.params, 'inputs': inputs,
+            }
+            if trace_memory:
+                record['peak_traced_mb'] = round(traced_peak / 2**20, 1)
+            with open(os.path.join(partial, STAGE_RECORD), 'w') as f:
+                json.dump(record, f, indent=2, default=str)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.rename(partial, entry)
+            self.publish(stage, entry)
+            report.append({k: record[k] for k in ('stage', 'key', 'status', 'seconds', 'process_peak_rss_mb',
+                                                   'peak_traced_mb') if k in record})
+            self._save_source_states(states)
+
+        self._save_source_states(states)
+        return report
+
+    def gc(self, targets=None):
+        """Delete cache entries that the current stage definitions no longer produce."""
+        states = self._source_states()
+        keys = {}
+        for name in self.order(targets):
+            keys[name] = self.stage_key(self.stages[name], keys, states)
+        removed = 0
+        for name in keys:
+            directory = os.path.join(self.cache_dir, name)
+            for key in os.listdir(directory) if os.path.isdir(directory) else []:
+                if key != keys[name]:
+                    shutil.rmtree(os.path.join(directory, key))
+                    removed += 1
+        return removed
+
+
+def peak_rss_mb():
+    """
+    High-water RSS of this process and its finished children, in MB (Linux reports KB).
+
+    It is process-wide and never goes down: a stage reports the largest RSS of
+    the run so far, which may belong to an earlier stage. peak_traced_mb
+    (with trace_memory) is the per-stage figure.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+# Stage functions: thin adapters from (inputs, outputs, params) to the scripts
+
+def combine_stage(inputs, outputs, years, chunksize, dataset_dir, jobs=None):
+    import combining
+
+    # The year partitions persist between runs, so a new or changed year only converts that year
+    pattern = os.path.join(os.path.dirname(inputs[years[0]]), '{year}.csv')
+    combining.build(years, pattern, dataset_dir, jobs, chunksize=chunksize)
+    combining.export_combined(dataset_dir, years, outputs['finaldataset'])
+
+
+def validate_stage(inputs, outputs, domains):
+    from checker import profile_dataset
+
+    # The profile is kept even when the check fails, next to the partial outputs
+    profile = profile_dataset(inputs['data'], domains)
+    with open(outputs['profile'], 'w') as f:
+        json.dump(profile, f, indent=2)
+    if not profile['ok']:
+        raise ValueError(f"{inputs['data']} failed validation ({outputs['profile']}): " + '; '.join(profile['problems']))
+
+
+def bin_stage(inputs, outputs):
+    from binner import preprocess_data
+    from dataset_io import load_dataset, save_dataset
+
+    save_dataset(preprocess_data(load_dataset(inputs['data'])), outputs['binned'], 'binned', [inputs['data']])
+
+
+def smote_stage(inputs, outputs, random_state, k_neighbors, chunksize, jobs=None):
+    from balance import balance_dataset
+
+    balance_dataset(inputs['data'], outputs['smote'], k_neighbors, random_state, chunksize, jobs)
+
+
+def relabel_stage(inputs, outputs):
+    load_script('mini con.py').relabel(inputs['data'], outputs['relabelled'])
+
+
+def train_stage(inputs, outputs, n_iter, cv, factor, results, n_jobs=-1):
+    load_script('ensemble model.py').train_ensemble(inputs['data'], outputs['model'], n_iter, cv, n_jobs,
+                                                    factor, results)
+
+
+def build_pipeline(years=('2015', '2013'), chunksize=200000, jobs=None, n_iter=5, cv=3, factor=3,
+                   random_state=42, cache_dir=DEFAULT_CACHE_DIR, workdir='.', k_neighbors=5):
+    """The heart disease pipeline: convert+combine -> validate -> bin -> SMOTE -> relabel -> train."""
+    years = [str(year) for year in years]
+    return Pipeline([
+        Stage('combine', combine_stage,
+              inputs={year: f'{year}.csv' for year in years},
+              outputs={'finaldataset': 'finaldataset.arrow'},
+              params={'years': years, 'chunksize': chunksize},
+              options={'dataset_dir': os.path.join(cache_dir, 'dataset'), 'jobs': jobs},
+              code=['convertor.py', 'combining.py', 'dataset_io.py']),
+        # New data drops are profiled and checked against the expected codes before anything is built on them
+        Stage('validate', validate_stage,
+              inputs={'data': 'finaldataset'},
+              outputs={'profile': 'profile_finaldataset.json'},
+              params={'domains': 'raw'},
+              code=['checker.py', 'schema.py']),
+        Stage('bin', bin_stage,
+              inputs={'data': 'finaldataset', 'profile': 'profile'},
+              outputs={'binned': 'binned.arrow'},
+              code=['binner.py', 'dataset_io.py', 'schema.py']),
+        Stage('smote', smote_stage,
+              inputs={'data': 'binned'},
+              outputs={'smote': 'smote.arrow'},
+              # The chunk size sets how the random draws are split, so it is part of the result
+              params={'random_state': random_state, 'k_neighbors': k_neighbors, 'chunksize': chunksize},
+              options={'jobs': jobs},
+              code=['balance.py', 'schema.py', 'dataset_io.py']),
+        Stage('relabel', relabel_stage,
+              inputs={'data': 'smote'},
+              outputs={'relabelled': 'relabelled.arrow'},
+              code=['mini con.py']),
+        Stage('train', train_stage,
+              inputs={'data': 'relabelled'},
+              outputs={'model': 'ensemble_model_with_tuning.joblib'},
+              params={'n_iter': n_iter, 'cv': cv, 'factor': factor},
+              # Search scores persist across cache entries so a changed grid warm-starts
+              options={'n_jobs': jobs or -1, 'results': os.path.join(cache_dir, 'tuning_results.json')},
+              code=['ensemble model.py', 'tuning.py', 'balance.py', 'incremental.py', 'parallel_ensemble.py',
+                    'dataset_io.py', 'schema.py']),
+    ], cache_dir, workdir)
+
+
+def print_report(report):
+    traced = any('peak_traced_mb' in row for row in report)
+    header = f"{'stage':<10} {'status':<10} {'seconds':>9} {'process peak RSS MB':>20}"
+    print(header + (f" {'traced MB':>10}" if traced else ''))
+    for row in report:
+        print(f"{row['stage']:<10} {row['status']:<10} {row.get('seconds', ''):>9} "
+              f"{row.get('process_peak_rss_mb', ''):>20}" + (f" {row.get('peak_traced_mb', ''):>10}" if traced else ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the cached heart disease pipeline.')
+    parser.add_argument('targets', nargs='*', help='stages to bring up to date (default: all)')
+    parser.add_argument('--years', nargs='+', default=['2015', '2013'])
+    parser.add_argument('--workdir', default='.', help='directory with the raw {year}.csv files')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--chunksize', type=int, default=200000)
+    parser.add_argument('--jobs', type=int, help='worker processes for conversion and tuning')
+    parser.add_argument('--n-iter', type=int, default=5, help='parameter settings sampled per model')
+    parser.add_argument('--cv', type=int, default=3)
+    parser.add_argument('--factor', type=int, default=3, help='successive halving rate of the tuning')
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--k-neighbors', type=int, default=5, help='SMOTE neighbours per row')
+    parser.add_argument('--force', nargs='+', default=[], metavar='STAGE', help='rerun these stages')
+    parser.add_argument('--dry-run', action='store_true', help='only show which stages would run')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also report peak traced Python memory per stage (slows the stages down)')
+    parser.add_argument('--gc', action='store_true', help='delete cache entries of outdated runs')
+    args = parser.parse_args(argv)
+
+    pipeline = build_pipeline(args.years, args.chunksize, args.jobs, args.n_iter, args.cv, args.factor,
+                              args.random_state, os.path.join(args.workdir, args.cache_dir), args.workdir,
+                              args.k_neighbors)
+    report = pipeline.run(args.targets or None, args.force, args.dry_run, args.trace_memory)
+    print_report(report)
+    with open(os.path.join(pipeline.cache_dir, 'last_run.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.gc:
+        print(f"Removed {pipeline.gc(args.targets or None)} outdated cache entries")
+
+
+if __name__ == '__main__':
+    main()
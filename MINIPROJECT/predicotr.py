@@ -1,76 +1,278 @@
+import argparse
+import collections
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import joblib
 import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from binner import BinningTransformer
+from dataset_io import DatasetWriter, iter_dataset
+from schema import (FEATURE_COLUMNS, FEATURE_DOMAINS, RAW_CONTINUOUS_COLUMNS, RAW_FEATURE_COLUMNS,
+                    RAW_FEATURE_DOMAINS, coerce_frame)
+
+MODEL_PATH = 'ensemble_model_with_tuning.joblib'
+
+# Rows per chunk read from the input and scored by one worker call
+DEFAULT_CHUNKSIZE = 50000
+
+# Names of the Heart_Disease_Status classes predicted by the multi-class model
+CLASS_NAMES = {
+    1: "Coronary Heart Disease (CHD)",
+    2: "Myocardial Infarction (Heart Attack)",
+    3: "Stroke",
+}
+
+
+def load_model(path=MODEL_PATH):
+    """Loads the pre-trained ensemble model (joblib, or a fused .npz artifact that only needs NumPy)."""
+    if path.endswith('.npz'):
+        from fused_model import FusedEnsemble
+        return FusedEnsemble.load(path)
+    return joblib.load(path)
+
+
+def input_kind(columns):
+    """'raw' for convertor.py-style rows (separate Fruits/Veggies, BMI and health days as measured), else 'binned'."""
+    return 'raw' if {'Fruits', 'Veggies'} <= set(columns) else 'binned'
+
+
+def features_from_frame(frame, kind):
+    """
+    Apply the input coercion and binning used for training to a DataFrame.
+
+    Returns:
+    tuple: (16 model features of the valid rows, their positions, dict of position -> error)
+    """
+    if kind == 'raw':
+        raw, valid_index, errors = coerce_frame(frame, RAW_FEATURE_COLUMNS, RAW_FEATURE_DOMAINS,
+                                                continuous=RAW_CONTINUOUS_COLUMNS)
+        return BinningTransformer().transform(raw)[FEATURE_COLUMNS], valid_index, errors
+    return coerce_frame(frame, FEATURE_COLUMNS, FEATURE_DOMAINS)
+
+
+# Bulk scoring: each pool worker loads the model once, in its initializer
+worker_model = None
+
+
+def init_worker(model_path):
+    global worker_model
+    worker_model = load_model(model_path)
+
+
+def score_chunk(chunk, kind, keep=()):
+    """
+    Score one chunk in a worker.
+
+    Returns:
+    DataFrame: The `keep` columns, one probability column per class, the
+    predicted class and an error message ('' for rows that were scored).
+    """
+    features, valid_index, errors = features_from_frame(chunk, kind)
+    classes = worker_model.classes_
+    proba = np.full((len(chunk), len(classes)), np.nan, dtype=np.float32)
+    if len(valid_index):
+        proba[valid_index] = worker_model.predict_proba(features)
+    prediction = pd.array(np.full(len(chunk), pd.NA, dtype=object), dtype='Int64')
+    prediction[valid_index] = classes[np.argmax(proba[valid_index], axis=1)]
+
+    result = chunk[list(keep)].reset_index(drop=True)
+    for i, cls in enumerate(classes):
+        result[f'proba_{cls}'] = proba[:, i]
+    result['prediction'] = prediction
+    result['error'] = [errors.get(i, '') for i in range(len(chunk))]
+    return result
+
+
+def widest_field(field):
+    # The first chunk only shows part of the value range: ids that fit int16 there may not later
+    if pa.types.is_integer(field.type):
+        return field.with_type(pa.int64())
+    if pa.types.is_floating(field.type):
+        return field.with_type(pa.float64())
+    return field
+
+
+def output_schema(chunk, keep, classes):
+    # Fixed up front so every chunk is written with the same types, whatever its first rows hold
+    fields = [widest_field(pa.Schema.from_pandas(chunk[list(keep)], preserve_index=False).field(col)) for col in keep]
+    fields += [pa.field(f'proba_{cls}', pa.float32()) for cls in classes]
+    return pa.schema(fields + [pa.field('prediction', pa.int64()), pa.field('error', pa.string())])
+
+
+def score_file(source, output, model_path=MODEL_PATH, kind='auto', keep=(), chunksize=DEFAULT_CHUNKSIZE,
+               workers=None, max_in_flight=None, progress=True):
+    """
+    Score every row of a CSV, Parquet or Arrow file and write the results incrementally.
+
+    Chunks are read one at a time and fanned out to a process pool whose
+    workers load the model once. At most `max_in_flight` chunks are queued or
+    being scored, and results are written in input order as soon as the
+    oldest chunk is done, so memory stays bounded whatever the input size.
+
+    Parameters:
+    source (str): Input extract (raw convertor.py columns or binned model inputs).
+    output (str): Output file ('.csv', '.parquet' or '.arrow').
+    model_path (str): Fitted ensemble (joblib) or fused '.npz' artifact.
+    kind (str): 'raw', 'binned' or 'auto' (from the input's columns).
+    keep (list): Input columns copied to the output (e.g. a patient id).
+    chunksize (int): Rows per chunk.
+    workers (int): Pool processes (all cores by default); 0 scores in this process.
+    max_in_flight (int): Chunks submitted but not yet written (2 per worker by default).
+
+    Returns:
+    dict: Rows read, rows scored and rejected, seconds and rows per second.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    max_in_flight = max_in_flight or 2 * max(workers, 1)
+    # Loaded here too: it scores the chunks when workers=0 and gives the output columns either way
+    init_worker(model_path)
+    classes = worker_model.classes_
+
+    pool = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(model_path,)) if workers else None
+    pending = collections.deque()
+    totals = {'rows': 0, 'scored': 0, 'rejected': 0}
+    start = time.perf_counter()
+    writer = None
+
+    def write(result):
+        writer.write(result)
+        rejected = int((result['error'] != '').sum())
+        totals['rejected'] += rejected
+        totals['scored'] += len(result) - rejected
+        if progress:
+            seconds = time.perf_counter() - start
+            print(f"\r{writer.rows} rows written, {writer.rows / seconds:,.0f} rows/s", end='', file=sys.stderr)
+
+    try:
+        for chunk in iter_dataset(source, batch_size=chunksize):
+            if writer is None:
+                kind = input_kind(chunk.columns) if kind == 'auto' else kind
+                missing = [col for col in keep if col not in chunk.columns]
+                if missing:
+                    raise ValueError(f"{source} has no column {', '.join(missing)}")
+                params = {'kind': kind, 'model': os.path.abspath(model_path)}
+                writer = DatasetWriter(output, 'scored', [source], params, schema=output_schema(chunk, keep, classes))
+            totals['rows'] += len(chunk)
+            if pool is None:
+                write(score_chunk(chunk, kind, keep))
+                continue
+            pending.append(pool.submit(score_chunk, chunk, kind, keep))
+            if len(pending) >= max_in_flight:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+        if writer is None:
+            raise ValueError(f"{source} has no rows")
+        writer.close()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if progress:
+            print(file=sys.stderr)
+
+    seconds = time.perf_counter() - start
+    return {**totals, 'seconds': round(seconds, 3), 'rows_per_second': round(totals['rows'] / seconds, 1)}
+
+
+# Interactive mode: one patient typed in field by field
 
 def get_user_input():
     """Collects user input for all the necessary features to make a prediction."""
     print("Please provide the following information for heart disease prediction:\n")
-    
-    try:
-        HighChol = int(input("High Cholesterol (1 = Yes, 0 = No): "))
-        BMI = float(input("BMI (Body Mass Index, e.g., 24.5): "))
-        Diabetes = int(input("Diabetes (1 = Yes, 0 = No): "))
-        PhysActivity = int(input("Physical Activity (1 = Yes, 0 = No): "))
-        Fruits = int(input("Consumes Fruits Daily (1 = Yes, 0 = No): "))
-        Veggies = int(input("Consumes Vegetables Daily (1 = Yes, 0 = No): "))
-        HvyAlcoholConsump = int(input("Heavy Alcohol Consumption (1 = Yes, 0 = No): "))
-        GenHlth = int(input("General Health (1 = Excellent, 2 = Very Good, 3 = Good, 4 = Fair, 5 = Poor): "))
-        MentHlth = int(input("Days of Poor Mental Health (0-30): "))
-        PhysHlth = int(input("Days of Poor Physical Health (0-30): "))
-        DiffWalk = int(input("Difficulty Walking (1 = Yes, 0 = No): "))
-        Sex = int(input("Sex (1 = Male, 0 = Female): "))
-        Education = int(input("Education Level (1 = No Schooling, 2 = Elementary, 3 = Some High School, 4 = High School Graduate, 5 = Some College, 6 = College Graduate): "))
-        Current_Smoker = int(input("Current Smoker (1 = Yes, 0 = No): "))
-        Income_Category = int(input("Income Category (1 = <15K, 2 = 15K-25K, 3 = 25K-35K, 4 = 35K-50K, 5 = 50K+): "))
-        Age_Group = int(input("Age Group (1 = 18-24, 2 = 25-34, 3 = 35-44, 4 = 45-54, 5 = 55-64, 6 = 65+): "))
-        On_BP_Medication = int(input("On BP Medication (1 = Yes, 0 = No): "))
-        
-        # Return all inputs as a NumPy array
-        user_input = np.array([HighChol, BMI, Diabetes, PhysActivity, Fruits, Veggies, HvyAlcoholConsump, GenHlth, 
-                               MentHlth, PhysHlth, DiffWalk, Sex, Education, Current_Smoker, Income_Category, 
-                               Age_Group, On_BP_Medication]).reshape(1, -1)
-        
-        return user_input
-    except ValueError as e:
-        print("Invalid input. Please enter the correct data type.", e)
-        return None
 
-def load_model():
-    """Loads the pre-trained ensemble model from the joblib file."""
-    try:
-        model = joblib.load('ensemble_model_with_tuning.joblib')
-        print("Model loaded successfully.")
-        return model
-    except FileNotFoundError:
-        print("The model file 'ensemble_model_with_tuning.joblib' was not found.")
+    # Raw answers, validated and binned exactly like the training data
+    prompts = {
+        'HighChol': "High Cholesterol (1 = Yes, 0 = No): ",
+        'BMI': "BMI (Body Mass Index, e.g., 24.5): ",
+        'Diabetes': "Diabetes (1 = Yes, 0 = No): ",
+        'PhysActivity': "Physical Activity (1 = Yes, 0 = No): ",
+        'Fruits': "Consumes Fruits Daily (1 = Yes, 0 = No): ",
+        'Veggies': "Consumes Vegetables Daily (1 = Yes, 0 = No): ",
+        'HvyAlcoholConsump': "Heavy Alcohol Consumption (1 = Yes, 0 = No): ",
+        'GenHlth': "General Health (1 = Excellent, 2 = Very Good, 3 = Good, 4 = Fair, 5 = Poor): ",
+        'MentHlth': "Days of Poor Mental Health (0-30): ",
+        'PhysHlth': "Days of Poor Physical Health (0-30): ",
+        'DiffWalk': "Difficulty Walking (1 = Yes, 0 = No): ",
+        'Sex': "Sex (0 = Male, 1 = Female): ",
+        'Education': "Education Level (1 = No Schooling, 2 = Elementary, 3 = Some High School, "
+                     "4 = High School Graduate, 5 = Some College, 6 = College Graduate): ",
+        'Current_Smoker': "Current Smoker (1 = Yes, 0 = No): ",
+        'Income_Category': "Income Category (1 = <15K, 2 = 15K-25K, 3 = 25K-35K, 4 = 35K-50K, 5 = 50K+): ",
+        'Age_Group': "Age Group (1 = 18-24, 2 = 25-34, 3 = 35-44, 4 = 45-54, 5 = 55-64, 6 = 65+): ",
+        'On_BP_Medication': "On BP Medication (1 = Yes, 0 = No): ",
+    }
+    record = {column: input(prompt) for column, prompt in prompts.items()}
+
+    features, _, errors = features_from_frame(pd.DataFrame([record]), 'raw')
+    if errors:
+        print("Invalid input:", errors[0])
         return None
+    return features
+
 
 def predict_heart_disease(model, user_input):
     """Makes a prediction using the loaded model and user input."""
     try:
-        prediction = model.predict(user_input)
-        
-        if prediction[0] == 1:
-            result = "Predicted Heart Disease Type: Coronary Heart Disease (CHD)"
-        elif prediction[0] == 2:
-            result = "Predicted Heart Disease Type: Myocardial Infarction (Heart Attack)"
-        elif prediction[0] == 3:
-            result = "Predicted Heart Disease Type: Stroke"
+        proba = model.predict_proba(user_input)[0]
+        prediction = model.classes_[np.argmax(proba)]
+        if len(model.classes_) == 2 and prediction == 1:
+            result = "Heart Disease Predicted"
+        elif prediction in CLASS_NAMES:
+            result = f"Predicted Heart Disease Type: {CLASS_NAMES[prediction]}"
         else:
             result = "No Heart Disease Detected"
-        
-        return result
+        return f"{result} (probability {proba.max():.2f})"
     except Exception as e:
         print("An error occurred during prediction.", e)
         return None
 
-def main():
-    """Main function to load the model, get user input, and make a prediction."""
-    model = load_model()
-    if model is not None:
-        user_input = get_user_input()
-        if user_input is not None:
-            result = predict_heart_disease(model, user_input)
-            print("\n", result)
-
-if _name_ == "_main_":
-    main()
\ No newline at end of file
+
+def interactive(model_path=MODEL_PATH):
+    """Load the model, ask for one patient's answers and print the prediction."""
+    try:
+        model = load_model(model_path)
+        print("Model loaded successfully.")
+    except FileNotFoundError:
+        print(f"The model file '{model_path}' was not found.")
+        return
+    user_input = get_user_input()
+    if user_input is not None:
+        result = predict_heart_disease(model, user_input)
+        print("\n", result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score patients with the trained ensemble.')
+    parser.add_argument('--model', default=MODEL_PATH, help='joblib model or fused .npz artifact')
+    commands = parser.add_subparsers(dest='command')
+    score = commands.add_parser('score', help='score a whole CSV/Parquet/Arrow extract')
+    score.add_argument('source')
+    score.add_argument('output', help="'.csv', '.parquet' or '.arrow'")
+    score.add_argument('--kind', choices=['auto', 'raw', 'binned'], default='auto',
+                       help='raw convertor.py columns or binned model inputs')
+    score.add_argument('--keep', nargs='+', default=[], help='input columns copied to the output, e.g. an id')
+    score.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    score.add_argument('--workers', type=int, help='scoring processes (default: all cores, 0: in-process)')
+    score.add_argument('--max-in-flight', type=int, help='chunks queued at once (default: 2 per worker)')
+    args = parser.parse_args(argv)
+
+    if args.command != 'score':
+        interactive(args.model)
+        return
+    totals = score_file(args.source, args.output, args.model, args.kind, args.keep, args.chunksize,
+                        args.workers, args.max_in_flight)
+    print(f"Scored {totals['scored']} of {totals['rows']} rows ({totals['rejected']} rejected) into {args.output} "
+          f"in {totals['seconds']:.1f}s, {totals['rows_per_second']:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
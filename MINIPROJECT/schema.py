@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+# Name of the label column in the pipeline datasets
+TARGET_COLUMN = 'Heart_Disease_Status'
+
+# Target codes: 1-3 disease, 4 healthy as written by convertor.py; 'mini con.py' relabels 4 to 0
+TARGET_DOMAIN = (0, 4)
+
+# The 16 model inputs, in the order the ensemble was trained on
+FEATURE_COLUMNS = [
+    'HighChol', 'BMI', 'Diabetes', 'PhysActivity', 'HvyAlcoholConsump',
+    'GenHlth', 'MentHlth', 'PhysHlth', 'DiffWalk', 'Sex', 'Education',
+    'Current_Smoker', 'Income_Category', 'Age_Group', 'On_BP_Medication', 'Fruits_Veggies'
+]
+
+# Valid codes (inclusive) for every model input after binner.py has run
+FEATURE_DOMAINS = {
+    'HighChol': (0, 1),
+    'BMI': (0, 3),               # Underweight, Healthy, Overweight, Obesity
+    'Diabetes': (0, 1),
+    'PhysActivity': (0, 1),
+    'HvyAlcoholConsump': (0, 1),
+    'GenHlth': (1, 5),           # 1 = Excellent ... 5 = Poor
+    'MentHlth': (0, 5),          # 5-day bins of poor mental health days
+    'PhysHlth': (0, 5),          # 5-day bins of poor physical health days
+    'DiffWalk': (0, 1),
+    'Sex': (0, 1),
+    'Education': (1, 6),
+    'Current_Smoker': (0, 1),
+    'Income_Category': (1, 5),
+    'Age_Group': (1, 6),
+    'On_BP_Medication': (0, 1),
+    'Fruits_Veggies': (0, 1),
+}
+
+# Raw (unbinned) inputs as written by convertor.py, before binner.py runs
+RAW_FEATURE_COLUMNS = [
+    'HighChol', 'BMI', 'Diabetes', 'PhysActivity', 'Fruits', 'Veggies', 'HvyAlcoholConsump',
+    'GenHlth', 'MentHlth', 'PhysHlth', 'DiffWalk', 'Sex', 'Education',
+    'Current_Smoker', 'Income_Category', 'Age_Group', 'On_BP_Medication'
+]
+
+RAW_FEATURE_DOMAINS = {
+    **{col: FEATURE_DOMAINS[col] for col in RAW_FEATURE_COLUMNS if col in FEATURE_DOMAINS},
+    'BMI': (0, 100),             # _BMI5 / 100
+    'Fruits': (0, 1),
+    'Veggies': (0, 1),
+    'MentHlth': (0, 30),         # days of poor mental health in the past 30
+    'PhysHlth': (0, 30),         # days of poor physical health in the past 30
+}
+
+# Raw columns that may hold non-integer values
+RAW_CONTINUOUS_COLUMNS = ('BMI',)
+
+
+def coerce_records(records, columns=FEATURE_COLUMNS, domains=FEATURE_DOMAINS, continuous=()):
+    """
+    Validate and convert a list of input records to model features in one vectorized pass.
+
+    Every cell of the batch is parsed with a single pd.to_numeric call, and the
+    domain checks are broadcast over the whole matrix, so the cost per record
+    does not depend on how many columns are checked one by one.
+
+    Parameters:
+    records (list): Decoded JSON records (dicts keyed by column name).
+    columns (list): Column names, in model order.
+    domains (dict): Inclusive (low, high) range of valid integer codes per column.
+    continuous (tuple): Columns allowed to hold non-integer values.
+
+    Returns:
+    tuple: (DataFrame of the valid rows, array with the positions of the valid
+    rows in `records`, dict mapping the position of each rejected record to an
+    error message).
+    """
+    errors = {}
+    rows = []
+    for i, record in enumerate(records):
+        if isinstance(record, dict):
+            rows.append(record)
+        else:
+            errors[i] = 'record must be a JSON object'
+            rows.append({})
+
+    features, valid_index, frame_errors = coerce_frame(pd.DataFrame(rows, columns=columns), columns, domains,
+                                                       continuous, skip=errors)
+    return features, valid_index, {**errors, **frame_errors}
+
+
+def coerce_frame(frame, columns=FEATURE_COLUMNS, domains=FEATURE_DOMAINS, continuous=(), skip=()):
+    """
+    Validate and convert the rows of a DataFrame (e.g. a chunk of a CSV extract).
+
+    Same checks and return value as `coerce_records`; columns that are already
+    numeric skip the per-cell parsing. Missing columns make every row invalid.
+
+    Parameters:
+    skip (collection): Row positions already known to be invalid.
+    """
+    frame = frame.reindex(columns=columns)
+    if all(pd.api.types.is_numeric_dtype(frame[col]) for col in columns):
+        values = frame.to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+    else:
+        cells = frame.to_numpy(dtype=object)
+        missing = pd.isna(cells)
+        values = pd.to_numeric(pd.Series(cells.ravel()), errors='coerce')
+        values = values.to_numpy(dtype=np.float64).reshape(cells.shape)
+
+    low = np.array([domains[col][0] for col in columns], dtype=np.float64)
+    high = np.array([domains[col][1] for col in columns], dtype=np.float64)
+    integer = np.array([col not in continuous for col in columns])
+    not_numeric = np.isnan(values) & ~missing
+    with np.errstate(invalid='ignore'):
+        out_of_range = ~np.isnan(values) & (
+            (values < low) | (values > high) | (integer & (values != np.floor(values))))
+
+    bad = missing | not_numeric | out_of_range
+    errors = {}
+    for i in np.flatnonzero(bad.any(axis=1)):
+        if i in skip:
+            continue
+        problems = []
+        if missing[i].any():
+            problems.append('missing ' + ', '.join(np.asarray(columns)[missing[i]]))
+        if not_numeric[i].any():
+            problems.append('non-numeric ' + ', '.join(np.asarray(columns)[not_numeric[i]]))
+        if out_of_range[i].any():
+            problems.append('out of range ' + ', '.join(
+                f'{col}={values[i, j]:g}' for j, col in enumerate(columns) if out_of_range[i, j]))
+        errors[int(i)] = '; '.join(problems)
+
+    valid = np.ones(len(frame), dtype=bool)
+    valid[list(errors)] = False
+    valid[list(skip)] = False
+    valid_index = np.flatnonzero(valid)
+    values = values[valid_index]
+    features = pd.DataFrame(values if continuous else values.astype(np.int8), columns=columns)
+    return features, valid_index, errors
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import math
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import VotingClassifier
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+from sklearn.preprocessing import LabelEncoder
+from sklearn.utils import Bunch
+
+# Each halving round keeps the best 1/FACTOR of a model's candidates
+DEFAULT_FACTOR = 3
+
+# Smallest subsample a candidate is scored on
+MIN_RESOURCES = 500
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def params_key(params):
+    """Stable text key of a parameter setting (used in the results file)."""
+    return json.dumps({k: _jsonable(v) for k, v in params.items()}, sort_keys=True, default=str)
+
+
+def sample_candidates(param_grid, n_iter, random_state=42):
+    """Up to `n_iter` parameter settings of a grid ([{}] for models without one)."""
+    if not param_grid:
+        return [{}]
+    sizes = [len(v) for v in param_grid.values() if hasattr(v, '__len__')]
+    n_iter = min(n_iter, math.prod(sizes)) if len(sizes) == len(param_grid) else n_iter
+    return list(ParameterSampler(param_grid, n_iter, random_state=random_state))
+
+
+def single_threaded(estimator):
+    """Run each fit on one thread; parallelism comes from the shared pool instead."""
+    params = estimator.get_params()
+    for name in ('n_jobs', 'nthread'):
+        if name in params:
+            estimator = estimator.set_params(**{name: 1})
+    return estimator
+
+
+def _fit_and_score(estimator, params, X, y, train, test):
+    model = single_threaded(clone(estimator).set_params(**params))
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    score = float(np.mean(model.predict(X[test]) == y[test]))
+    return score, time.perf_counter() - start
+
+
+def _fit(estimator, params, X, y, n_jobs):
+    model = clone(estimator).set_params(**params)
+    threaded = 'n_jobs' in model.get_params()
+    if threaded:
+        own_jobs = model.get_params()['n_jobs']
+        model.set_params(n_jobs=n_jobs)
+    start = time.perf_counter()
+    model.fit(X, y)
+    if threaded:
+        model.set_params(n_jobs=own_jobs)  # the saved model keeps its own thread setting, not the pool's split
+    return model, time.perf_counter() - start
+
+
+def halving_rounds(n_candidates, factor):
+    """Rounds needed to cut `n_candidates` down to one, keeping 1/`factor` per round (exact integer arithmetic)."""
+    rounds = 0
+    while factor ** rounds < n_candidates:
+        rounds += 1
+    return rounds
+
+
+def rung_rows(n_rows, rung, rounds, factor, min_resources):
+    """Subsample size of a halving round: all rows in the last round, 1/factor fewer per round before it."""
+    return max(min(min_resources, n_rows), n_rows // factor ** (rounds - 1 - rung))
+
+
+def data_fingerprint(X, y, cv, random_state):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(f'{X.shape}|{cv}|{random_state}'.encode())
+    return digest.hexdigest()
+
+
+class SearchResults:
+    """
+    Cross-validated scores of every (model, parameters, subsample size) tried,
+    persisted as JSON so a later run on the same data skips those fits.
+    """
+
+    def __init__(self, path=None, fingerprint=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.scores = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('fingerprint') == fingerprint:
+                self.scores = saved.get('scores', {})
+
+    def get(self, model, params, n):
+        return self.scores.get(model, {}).get(params_key(params), {}).get(str(n))
+
+    def put(self, model, params, n, score):
+        self.scores.setdefault(model, {}).setdefault(params_key(params), {})[str(n)] = score
+
+    def save(self, best=None):
+        if not self.path:
+            return
+        tmp = f'{self.path}.tmp{os.getpid()}'
+        with open(tmp, 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'scores': self.scores, 'best': best or {}}, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def successive_halving(models, param_grids, X, y, n_iter=5, cv=3, factor=DEFAULT_FACTOR,
+                       min_resources=MIN_RESOURCES, n_jobs=-1, random_state=42, results_path=None, verbose=True):
+    """
+    Tune several models at once with successive halving on one shared worker pool.
+
+    Every model samples `n_iter` candidates. In each round all surviving
+    candidates of all models are cross-validated on a subsample of the rows, and
+    each model keeps its best 1/`factor`; the subsample grows by `factor` per
+    round, and the last round of every model uses all rows. All fits of a round,
+    across models and folds, are scheduled on the same joblib pool with single-
+    threaded estimators, so wall-clock scales with the number of cores rather
+    than the number of models. The winners are then fitted once on all rows.
+
+    Parameters:
+    models (dict): Name -> unfitted estimator.
+    param_grids (dict): Name -> parameter distributions (empty dict: nothing to tune).
+    X (DataFrame): Training features.
+    y (array-like): Training labels (encoded to 0..k-1 internally).
+    n_iter (int): Candidates sampled per model.
+    cv (int): Stratified folds per candidate evaluation.
+    factor (int): Halving rate.
+    min_resources (int): Smallest subsample size.
+    n_jobs (int): Workers of the shared pool.
+    random_state (int): Seed of the candidate sampling, subsampling and folds.
+    results_path (str): JSON file to warm-start from and save the scores to.
+
+    Returns:
+    tuple: (dict of fitted best estimators, dict with the search summary per model)
+    """
+    values = np.asarray(X)
+    # Fit on encoded labels, as VotingClassifier.fit does
+    y = LabelEncoder().fit_transform(np.asarray(y))
+    n_rows = len(y)
+    order = np.random.RandomState(random_state).permutation(n_rows)
+    results = SearchResults(results_path, data_fingerprint(values, y, cv, random_state) if results_path else None)
+
+    candidates = {name: sample_candidates(param_grids.get(name, {}), n_iter, random_state) for name in models}
+    rounds = {name: halving_rounds(len(c), factor) for name, c in candidates.items()}
+    total_rounds = max(rounds.values())
+    summary = {name: {'candidates': len(c), 'fits': 0, 'cached': 0, 'fit_seconds': 0.0, 'rounds': []}
+               for name, c in candidates.items()}
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for round_index in range(total_rounds):
+            tasks, slots = [], []
+            for name, alive in candidates.items():
+                # Models with fewer rounds join later, so every model finishes in the last round
+                rung = round_index - (total_rounds - rounds[name])
+                if rung < 0 or len(alive) == 1:
+                    continue
+                n = rung_rows(n_rows, rung, rounds[name], factor, min_resources)
+                subset = np.sort(order[:n])
+                folds = list(StratifiedKFold(cv, shuffle=True, random_state=random_state).split(subset, y[subset]))
+                for params in alive:
+                    if results.get(name, params, n) is not None:
+                        summary[name]['cached'] += 1
+                        continue
+                    for train, test in folds:
+                        tasks.append(delayed(_fit_and_score)(models[name], params, values, y,
+                                                             subset[train], subset[test]))
+                        slots.append((name, params, n))
+
+            start = time.perf_counter()
+            fold_scores = {}
+            for (name, params, n), (score, seconds) in zip(slots, parallel(tasks)):
+                fold_scores.setdefault((name, params_key(params), n), (params, []))[1].append(score)
+                summary[name]['fits'] += 1
+                summary[name]['fit_seconds'] += seconds
+            for (name, _, n), (params, scores) in fold_scores.items():
+                results.put(name, params, n, float(np.mean(scores)))
+            results.save()
+
+            for name, alive in candidates.items():
+                rung = round_index - (total_rounds - rounds[name])
+                if rung < 0 or len(alive) == 1:
+                    continue
+                n = rung_rows(n_rows, rung, rounds[name], factor, min_resources)
+                ranked = sorted(alive, key=lambda p: results.get(name, p, n), reverse=True)
+                candidates[name] = ranked[:max(1, math.ceil(len(alive) / factor))]
+                summary[name]['rounds'].append({'rows': n, 'candidates': len(alive),
+                                                'best_score': results.get(name, ranked[0], n)})
+            if verbose:
+                print(f"Round {round_index + 1}/{total_rounds}: {len(tasks)} fits in {time.perf_counter() - start:.1f}s")
+
+        # Fit every winner once on all rows, all models in parallel
+        names = list(candidates)
+        inner_jobs = max(1, (os.cpu_count() or 1) // len(names))
+        fitted = parallel(delayed(_fit)(models[name], candidates[name][0], X, y, inner_jobs) for name in names)
+
+    best = {}
+    for name, (model, seconds) in zip(names, fitted):
+        best[name] = model
+        summary[name]['best_params'] = {k: _jsonable(v) for k, v in candidates[name][0].items()}
+        summary[name]['final_fit_seconds'] = seconds
+        if verbose:
+            print(f"Best parameters for {name}: {summary[name]['best_params']}")
+    results.save({name: summary[name]['best_params'] for name in names})
+    return best, summary
+
+
+def prefit_voting_classifier(estimators, X, y, voting='soft', weights=None):
+    """
+    Build a VotingClassifier around already fitted estimators, without refitting them.
+
+    The estimators must have been fitted on LabelEncoder-encoded `y` (as
+    VotingClassifier.fit itself does), so the ensemble predicts the original labels.
+
+    Parameters:
+    estimators (list): (name, fitted estimator) pairs.
+    X (DataFrame): Training features (used for the feature names).
+    y (array-like): Original training labels.
+    """
+    voting_clf = VotingClassifier(estimators=estimators, voting=voting, weights=weights)
+    voting_clf.le_ = LabelEncoder().fit(y)
+    voting_clf.classes_ = voting_clf.le_.classes_
+    voting_clf.estimators_ = [est for _, est in estimators]
+    voting_clf.named_estimators_ = Bunch(**dict(estimators))
+    if hasattr(X, 'columns'):
+        voting_clf.feature_names_in_ = np.asarray(X.columns, dtype=object)
+    return voting_clf
@@ -1,76 +1,465 @@
-from flask import Flask, request, jsonify, make_response
-import joblib
+import json
+import os
+import sys
+import threading
+import time
+
+from flask import Flask, g, request, jsonify, make_response
+import numpy as np
 import pandas as pd
 from flask_cors import CORS
 
+import metrics
+import model_store
+from coalescer import MicroBatcher
+from prediction_cache import PrecomputedTable, PredictionCache, model_fingerprint, pack_keys
+
+# Shared column schema lives next to the pipeline scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MINIPROJECT'))
+from binner import BinningTransformer  # noqa: E402
+from cascade import CascadeEnsemble, load_cascade  # noqa: E402
+from parallel_ensemble import ParallelVotingClassifier  # noqa: E402
+from schema import (FEATURE_COLUMNS, RAW_CONTINUOUS_COLUMNS, RAW_FEATURE_COLUMNS,  # noqa: E402
+                    RAW_FEATURE_DOMAINS, coerce_records)
+
 app = Flask(__name__)
 
 # Enable CORS for all routes
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 # Load the machine learning model
-model = joblib.load("./ensemble_model_binary_compressed_1.joblib")  # Update path if necessary
+MODEL_PATH = os.environ.get('MODEL_PATH', './ensemble_model_binary_compressed_1.joblib')
+
+
+# For model store directories: 'fused' (NumPy only), 'sklearn' or 'auto'
+MODEL_ENGINE = os.environ.get('MODEL_ENGINE', 'auto')
+
+
+def load_model(path):
+    # Model stores are memory-mapped and shared between workers; fused .npz artifacts only need NumPy
+    return model_store.load_model(path, MODEL_ENGINE)
+
+
+def file_signature(path):
+    if os.path.isdir(path):
+        path = os.path.join(path, 'store.json')
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Metrics of this worker, served in the Prometheus text format at /metrics
+registry = metrics.Registry()
+request_seconds = registry.histogram(
+    'prediction_request_seconds', 'Time to handle a request, by endpoint.', ('endpoint',))
+stage_seconds = registry.histogram(
+    'prediction_stage_seconds', 'Time spent in each step of a prediction request.', ('endpoint', 'stage'))
+estimator_seconds = registry.histogram(
+    'prediction_estimator_seconds', 'predict_proba time of each base estimator of the ensemble.', ('estimator',))
+requests_total = registry.counter(
+    'prediction_requests_total', 'Requests by endpoint and HTTP status.', ('endpoint', 'status'))
+records_total = registry.counter(
+    'prediction_records_total', 'Records received, by endpoint and outcome (scored or invalid).', ('endpoint', 'outcome'))
+model_loads_total = registry.counter('model_loads_total', 'Model (re)loads in this process.')
+registry.gauge('model_load_seconds', 'Time the current model took to load.', lambda: model_load['seconds'])
+
+# Opt-in sampling profiler; its rate can be changed at runtime through /debug/profile
+profiler = metrics.SamplingProfiler(float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+                                    float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000)
+
+# /debug/* endpoints are only registered when this is set
+DEBUG_ENDPOINTS = os.environ.get('DEBUG_ENDPOINTS', '0') == '1'
+
+# Optional band file written by MINIPROJECT/cascade.py, only used if it was calibrated on this model file
+PREDICT_CASCADE = os.environ.get('PREDICT_CASCADE')
+
+
+def cascaded(loaded):
+    # Run the expensive members only on rows the cheap ones are unsure about
+    if not PREDICT_CASCADE:
+        return loaded
+    with open(PREDICT_CASCADE) as f:
+        calibrated_for = json.load(f)['model_sha256']
+    if calibrated_for != model_fingerprint(MODEL_PATH):
+        app.logger.warning("Ignoring %s: it was calibrated for a different model file", PREDICT_CASCADE)
+        return loaded
+    return load_cascade(PREDICT_CASCADE, loaded)
+
+
+# Threads that evaluate the ensemble members of one batch concurrently (1: one after another)
+PREDICT_THREADS = int(os.environ.get('PREDICT_THREADS', 1))
+
+
+def parallel(loaded):
+    # The cascade already skips most of the expensive members, so it is left as it is
+    if PREDICT_THREADS <= 1 or isinstance(loaded, CascadeEnsemble):
+        return loaded
+    # Its forest and boosters are thread-limited copies, timed on their own
+    return metrics.instrument_members(ParallelVotingClassifier(loaded, PREDICT_THREADS), estimator_seconds)
+
+
+def timed_load(path):
+    # Load the model and record how long it took and in which process
+    global model_load
+    start = time.perf_counter()
+    loaded = load_model(path)
+    model_load = {'path': path, 'seconds': time.perf_counter() - start, 'pid': os.getpid()}
+    model_loads_total.inc()
+    return parallel(cascaded(metrics.instrument_members(loaded, estimator_seconds)))
+
+
+model_load = None
+model = timed_load(MODEL_PATH)
+model_signature = file_signature(MODEL_PATH)
+
+# Opt-in exact-lookup cache keyed on the packed (binned) feature row
+cache = None
+if int(os.environ.get('PREDICT_CACHE_SIZE', 0)) > 0:
+    cache = PredictionCache(int(os.environ['PREDICT_CACHE_SIZE']), os.environ.get('PREDICT_CACHE_POLICY', 'lru'))
+
+# Optional table precomputed by prediction_cache.py, only used if it was built from this model file
+PREDICT_TABLE = os.environ.get('PREDICT_TABLE')
+
+
+def load_table():
+    if not PREDICT_TABLE:
+        return None
+    table = PrecomputedTable(PREDICT_TABLE)
+    if table.meta['model_sha256'] != model_fingerprint(MODEL_PATH):
+        app.logger.warning("Ignoring %s: it was built for a different model file", PREDICT_TABLE)
+        return None
+    return table
+
+
+table = load_table()
+
+# The model file is checked for changes at most this often (seconds)
+MODEL_CHECK_INTERVAL = float(os.environ.get('MODEL_CHECK_INTERVAL', 1))
+model_lock = threading.Lock()
+next_model_check = time.monotonic() + MODEL_CHECK_INTERVAL
+
+
+def check_model():
+    # Reload the model when its file changes and drop everything cached for the old one
+    global model, model_signature, table, next_model_check
+    if time.monotonic() < next_model_check:
+        return
+    with model_lock:
+        if time.monotonic() < next_model_check:
+            return
+        next_model_check = time.monotonic() + MODEL_CHECK_INTERVAL
+        try:
+            signature = file_signature(MODEL_PATH)
+        except OSError as e:
+            # e.g. the file is briefly missing while a deploy swaps it
+            app.logger.warning("Keeping the current model: cannot read %s: %s", MODEL_PATH, e)
+            return
+        if signature == model_signature:
+            return
+        try:
+            loaded = timed_load(MODEL_PATH)
+        except Exception as e:
+            # Not retried until the file changes again; requests keep using the current model
+            app.logger.error("Keeping the current model: cannot load %s: %s", MODEL_PATH, e)
+            model_signature = signature
+            return
+        model, model_signature = loaded, signature
+        if cache is not None:
+            cache.clear()
+        table = load_table()
+        app.logger.info("Reloaded model from %s", MODEL_PATH)
+
+
+# Largest number of records accepted by /predict/batch in one request
+MAX_BATCH_RECORDS = int(os.environ.get('MAX_BATCH_RECORDS', 100000))
+
+# Bins raw BMI/health-day values the same way the training data was binned
+binner = BinningTransformer()
+
+
+def features_from_records(records):
+    """
+    Validate records and return (model features, valid positions, errors).
+
+    With ?raw=1 the records carry raw BRFSS-style values (BMI, MentHlth and
+    PhysHlth as measured, separate Fruits and Veggies) and are binned here.
+    """
+    if request.args.get('raw', '0').lower() in ('1', 'true'):
+        raw, valid_index, errors = coerce_records(
+            records, RAW_FEATURE_COLUMNS, RAW_FEATURE_DOMAINS, continuous=RAW_CONTINUOUS_COLUMNS)
+        return binner.transform(raw)[FEATURE_COLUMNS], valid_index, errors
+    return coerce_records(records)
+
+
+def predict_positive(rows):
+    # Positive class probability for a 2D array of feature rows
+    return model.predict_proba(pd.DataFrame(rows, columns=FEATURE_COLUMNS))[:, 1]
+
+
+def score_rows(rows, compute=predict_positive):
+    """
+    Positive class probabilities for validated feature rows.
+
+    Rows are looked up in the precomputed table and the cache first; each
+    distinct profile that is still missing is scored once with `compute`.
+    """
+    check_model()
+    if cache is None and table is None:
+        return compute(rows)
+
+    keys = pack_keys(rows)
+    scores = table.lookup(keys) if table is not None else np.full(len(keys), np.nan)
+    missing = np.isnan(scores)
+    if cache is not None and missing.any():
+        scores[missing] = cache.get_many(keys[missing])
+        missing = np.isnan(scores)
+    if missing.any():
+        missing_keys, first, inverse = np.unique(keys[missing], return_index=True, return_inverse=True)
+        computed = compute(rows[missing][first])
+        scores[missing] = computed[inverse]
+        if cache is not None:
+            cache.put_many(missing_keys, computed)
+    return scores
 
-# Function to convert input data columns to appropriate types
-def convert_input_data(data):
-    # Convert categorical columns to numeric (if they are encoded as strings)
-    categorical_columns = ['HighChol', 'BMI', 'Diabetes', 'PhysActivity', 'HvyAlcoholConsump',
-                           'GenHlth', 'MentHlth', 'PhysHlth', 'DiffWalk', 'Sex', 'Education',
-                           'Current_Smoker', 'Income_Category', 'Age_Group', 'On_BP_Medication', 'Fruits_Veggies']
 
-    # Ensure all categorical columns are converted to numeric
-    for col in categorical_columns:
-        data[col] = pd.to_numeric(data[col], errors='coerce', downcast='integer')  # Coerce errors to NaN if non-numeric
+# Opt-in micro-batching: concurrent /predict calls are scored together
+batcher = None
+if os.environ.get('PREDICT_COALESCE', '0') == '1':
+    batcher = MicroBatcher(
+        predict_positive,
+        max_batch_size=int(os.environ.get('COALESCE_MAX_BATCH', 64)),
+        max_wait_ms=float(os.environ.get('COALESCE_MAX_WAIT_MS', 5)),
+    )
+
+
+def component_stats(name):
+    # Scrape-time view of the coalescer, cache and table counters (None when the component is off)
+    if name == 'coalescer':
+        return batcher.stats() if batcher is not None else None
+    if name == 'cache':
+        return cache.stats() if cache is not None else None
+    if name == 'cascade':
+        return model.stats() if isinstance(model, CascadeEnsemble) else None
+    return table.stats() if table is not None else None
+
+
+def stat(name, key):
+    def read():
+        stats = component_stats(name)
+        return None if stats is None else stats[key]
+    return read
+
+
+registry.gauge('coalescer_queue_depth', 'Rows waiting for the micro-batcher.', stat('coalescer', 'queue_depth'))
+registry.gauge('coalescer_batches_total', 'Batches scored by the micro-batcher.', stat('coalescer', 'batches'),
+               kind='counter')
+registry.gauge('coalescer_records_total', 'Rows scored by the micro-batcher.', stat('coalescer', 'records'),
+               kind='counter')
+registry.gauge('prediction_cache_size', 'Entries in the prediction cache.', stat('cache', 'size'))
+registry.gauge('prediction_cache_hits_total', 'Prediction cache hits.', stat('cache', 'hits'), kind='counter')
+registry.gauge('prediction_cache_misses_total', 'Prediction cache misses.', stat('cache', 'misses'), kind='counter')
+registry.gauge('prediction_cache_evictions_total', 'Prediction cache evictions.', stat('cache', 'evictions'),
+               kind='counter')
+registry.gauge('prediction_table_hits_total', 'Rows found in the precomputed table.', stat('table', 'hits'),
+               kind='counter')
+registry.gauge('prediction_table_misses_total', 'Rows missing from the precomputed table.', stat('table', 'misses'),
+               kind='counter')
+registry.gauge('cascade_rows_total', 'Rows scored by the cascade.', stat('cascade', 'rows'), kind='counter')
+registry.gauge('cascade_forwarded_rows_total', 'Rows the cascade forwarded to the expensive members.',
+               stat('cascade', 'forwarded'), kind='counter')
+
+
+def timed_stage(stage):
+    # Time one step of the current request into prediction_stage_seconds
+    return stage_seconds.time(endpoint=request.endpoint, stage=stage)
+
+
+@app.before_request
+def start_request():
+    g.request_start = time.perf_counter()
+    g.profiled = profiler.begin()
+
+
+@app.after_request
+def count_request(response):
+    endpoint = request.endpoint or 'unknown'
+    requests_total.inc(endpoint=endpoint, status=response.status_code)
+    if 'request_start' in g:
+        request_seconds.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    return response
+
+
+@app.teardown_request
+def stop_profiling(exc):
+    if g.get('profiled'):
+        profiler.end()
+
+
+def preflight_response(methods):
+    # Handle preflight OPTIONS request
+    response = make_response(jsonify({}))
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Methods"] = methods
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    response.headers["Access-Control-Allow-Credentials"] = "true"
+    return response
+
+
+def json_response(payload, status=200):
+    response = jsonify(payload)
+    response.status_code = status
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Credentials"] = "true"
+    return response
+
+
+def parse_batch_body():
+    """
+    Decode the body of a batch request.
+
+    Accepts either a JSON array of records or NDJSON (one record per line).
+
+    Returns:
+    tuple: (list of records, dict mapping record position to a parse error).
+    Lines that fail to parse are kept as None so positions still line up
+    with the client's input.
+    """
+    body = request.get_data(as_text=True)
+    if request.mimetype not in ('application/x-ndjson', 'application/jsonl'):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None  # Not a single JSON document, try NDJSON
+        else:
+            return (payload if isinstance(payload, list) else [payload]), {}
+
+    records, errors = [], {}
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            errors[len(records)] = f'invalid JSON: {e}'
+            records.append(None)
+    return records, errors
 
-    return data
 
 @app.route('/predict', methods=['OPTIONS', 'POST'])
 def predict():
     if request.method == 'OPTIONS':
-        # Handle preflight OPTIONS request
-        response = make_response(jsonify({}))
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        return response
-
-    if request.method == 'POST':
-        # Handle the POST request
+        return preflight_response("POST, OPTIONS")
+
+    # Handle the POST request
+    with timed_stage('parse'):
         data = request.get_json()
 
-        # Convert input data into DataFrame
-        input_data = pd.DataFrame([{
-            'HighChol': data['HighChol'],
-            'BMI': data['BMI'],
-            'Diabetes': data['Diabetes'],
-            'PhysActivity': data['PhysActivity'],
-            'HvyAlcoholConsump': data['HvyAlcoholConsump'],
-            'GenHlth': data['GenHlth'],
-            'MentHlth': data['MentHlth'],
-            'PhysHlth': data['PhysHlth'],
-            'DiffWalk': data['DiffWalk'],
-            'Sex': data['Sex'],
-            'Education': data['Education'],
-            'Current_Smoker': data['Current_Smoker'],
-            'Income_Category': data['Income_Category'],
-            'Age_Group': data['Age_Group'],
-            'On_BP_Medication': data['On_BP_Medication'],
-            'Fruits_Veggies': data['Fruits_Veggies'],
-        }])
-
-        # Convert input data types
-        input_data = convert_input_data(input_data)
-
-        # Make prediction using the trained modelser
-        prediction = model.predict_proba(input_data)
-        positive_class_probability = prediction[0][1]
-
-        # Return prediction result as JSON
-        response = jsonify({"prediction": float(positive_class_probability)})
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        return response
+    # Validate and convert the record into a one-row DataFrame
+    with timed_stage('convert'):
+        input_data, _, errors = features_from_records([data])
+    if errors:
+        records_total.inc(endpoint='predict', outcome='invalid')
+        return json_response({"error": errors[0]}, status=400)
+
+    # Make prediction using the trained model
+    compute = predict_positive
+    if batcher is not None:
+        compute = lambda rows: np.array([batcher.predict(rows[0])])  # noqa: E731
+    with timed_stage('predict'):
+        positive_class_probability = score_rows(input_data.to_numpy(), compute)[0]
+    records_total.inc(endpoint='predict', outcome='scored')
+
+    # Return prediction result as JSON
+    with timed_stage('serialize'):
+        return json_response({"prediction": float(positive_class_probability)})
+
+
+@app.route('/predict/batch', methods=['OPTIONS', 'POST'])
+def predict_batch():
+    if request.method == 'OPTIONS':
+        return preflight_response("POST, OPTIONS")
+
+    with timed_stage('parse'):
+        records, errors = parse_batch_body()
+    if not records:
+        return json_response({"error": "request body contains no records"}, status=400)
+    if len(records) > MAX_BATCH_RECORDS:
+        return json_response({"error": f"batch exceeds {MAX_BATCH_RECORDS} records"}, status=413)
+
+    # Validate the whole batch at once; bad records are reported, not fatal
+    with timed_stage('convert'):
+        input_data, valid_index, record_errors = features_from_records(records)
+    errors = {**record_errors, **errors}
+
+    # Score every valid record with a single predict_proba call
+    probabilities = np.full(len(records), np.nan)
+    if len(valid_index):
+        with timed_stage('predict'):
+            probabilities[valid_index] = score_rows(input_data.to_numpy())
+    records_total.inc(len(valid_index), endpoint='predict_batch', outcome='scored')
+    records_total.inc(len(records) - len(valid_index), endpoint='predict_batch', outcome='invalid')
+
+    with timed_stage('serialize'):
+        predictions = [None if np.isnan(p) else float(p) for p in probabilities]
+        return json_response({
+            "predictions": predictions,
+            "errors": [{"index": i, "error": errors[i]} for i in sorted(errors)],
+        })
+
+
+@app.route('/stats/coalescer', methods=['GET'])
+def coalescer_stats():
+    if batcher is None:
+        return json_response({"enabled": False})
+    return json_response({"enabled": True, **batcher.stats()})
+
+
+@app.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    stats = {"enabled": cache is not None, "table": None}
+    if cache is not None:
+        stats.update(cache.stats())
+    if table is not None:
+        stats["table"] = {**table.meta, **table.stats()}
+    return json_response(stats)
+
+
+@app.route('/stats/model', methods=['GET'])
+def model_stats():
+    return json_response({
+        **model_load,
+        "preloaded": model_load['pid'] != os.getpid(),  # loaded in the master before fork
+        "worker_pid": os.getpid(),
+        "engine": type(model).__name__,
+        "cascade": model.stats() if isinstance(model, CascadeEnsemble) else None,
+        "memory": model_store.memory_usage(),
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return app.response_class(registry.render(), content_type=registry.content_type)
+
+
+if DEBUG_ENDPOINTS:
+    @app.route('/debug/profile', methods=['GET'])
+    def profile_stacks():
+        # Folded stacks, ready for flamegraph.pl or speedscope
+        return app.response_class(profiler.folded(), mimetype='text/plain')
+
+    @app.route('/debug/profile', methods=['POST'])
+    def configure_profiler():
+        # {"rate": 0.05, "interval_ms": 5, "reset": true}; every field is optional
+        settings = request.get_json(silent=True) or {}
+        try:
+            profiler.configure(settings.get('rate'),
+                               settings['interval_ms'] / 1000 if 'interval_ms' in settings else None)
+        except (TypeError, ValueError) as e:
+            return json_response({"error": f"invalid profiler settings: {e}"}, status=400)
+        if settings.get('reset'):
+            profiler.reset()
+        return json_response(profiler.stats())
+
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=8080)
+    # The debugger allows running code from the browser, so it stays off unless FLASK_DEBUG=1
+    app.run(debug=os.environ.get('FLASK_DEBUG', '0') == '1', host='0.0.0.0', port=8080)
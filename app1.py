@@ -1,62 +1,137 @@
+import os
+import sys
+import threading
+import time
+
 from flask import Flask, request, jsonify
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MINIPROJECT'))
+from lag_features import LagBuffer  # noqa: E402
+from lag_model import load_artifact  # noqa: E402
 
 app = Flask(__name__)
 
-# Load and train the model once when the server starts
-data = pd.read_csv(r"C:\Users\srush\OneDrive\Desktop\mini_project\smote.csv")
-features = data.columns[:-1]  # All columns except the last one are features
-target = "Heart_Disease_Status"
+# Artifact written by MINIPROJECT/lag_model.py (scaler, model, feature names and class metadata)
+ARTIFACT_PATH = os.environ.get('ARTIFACT_PATH', './lag_model.joblib')
+
+# The artifact file is checked for changes at most this often (seconds)
+ARTIFACT_CHECK_INTERVAL = float(os.environ.get('ARTIFACT_CHECK_INTERVAL', 1))
+
+# Entities whose recent targets are kept for filling in lag features (least recently used are dropped)
+LAG_MAX_ENTITIES = int(os.environ.get('LAG_MAX_ENTITIES', 100000))
+
 
-# Create lagged features for time series modeling
-def create_lagged_features(data, lag=1):
-    for i in range(1, lag + 1):
-        data[f"lag_{i}"] = data[target].shift(i)  # Use target as dependent variable for lagging
-    data.dropna(inplace=True)  # Drop rows with NaN values generated by shifting
-    return data
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
 
-# Apply lagged features (adjust lag if needed)
-lag = 5
-data = create_lagged_features(data, lag)
-X = data[features.tolist() + [f"lag_{i}" for i in range(1, lag + 1)]]
-y = data[target]
 
-# Standardize the features (optional, can help linear regression)
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+# Load the trained model once when the server starts; no training happens here
+artifact = load_artifact(ARTIFACT_PATH)
+artifact_signature = file_signature(ARTIFACT_PATH)
+artifact_lock = threading.Lock()
+next_artifact_check = time.monotonic() + ARTIFACT_CHECK_INTERVAL
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
+# Recent targets per entity, so online requests only send the base features
+history = LagBuffer(artifact['lag'], LAG_MAX_ENTITIES)
+
+
+def reload_artifact(force=False):
+    """
+    Swap in a new artifact when its file changed (or always, with `force`).
+
+    The new artifact is fully loaded before the global reference is replaced,
+    so requests already running keep the artifact they started with. A file
+    that fails to load is logged and the current artifact stays in service.
+    """
+    global artifact, artifact_signature, next_artifact_check, history
+    with artifact_lock:
+        next_artifact_check = time.monotonic() + ARTIFACT_CHECK_INTERVAL
+        try:
+            signature = file_signature(ARTIFACT_PATH)
+        except OSError as e:
+            # e.g. removed while a deploy swaps it; checked again on the next interval
+            app.logger.warning("Keeping the current model: cannot read %s: %s", ARTIFACT_PATH, e)
+            return False
+        if signature == artifact_signature and not force:
+            return False
+        try:
+            loaded = load_artifact(ARTIFACT_PATH)
+        except Exception as e:
+            app.logger.error("Keeping the current model: cannot load %s: %s", ARTIFACT_PATH, e)
+            artifact_signature = signature
+            return False
+        if loaded['lag'] > history.capacity:
+            history = history.resized(loaded['lag'])
+        artifact, artifact_signature = loaded, signature
+        app.logger.info("Reloaded model from %s (trained %s)", ARTIFACT_PATH, loaded.get('trained_at'))
+        return True
 
-# Initialize and train the linear regression model
-model = LinearRegression()
-model.fit(X_train, y_train)
 
 @app.route('/predict', methods=['POST'])
 def predict():
+    if time.monotonic() >= next_artifact_check:
+        reload_artifact()
+    current = artifact  # one consistent artifact for the whole request
+
     try:
         # Get input data from the request
         data = request.json
-        input_features = np.array([data['features']])
+        input_features = np.array([data['features']], dtype=np.float64)
+
+        # With an entity, only the base features are sent and the lags come from its recent targets
+        entity = data.get('entity')
+        if entity is not None:
+            lags = history.lags(entity, current['lag'])
+            if lags is None:
+                return jsonify({'error': f"entity {entity!r} has {history.history(entity)} of the "
+                                         f"{current['lag']} observations needed"}), 409
+            input_features = np.hstack([input_features, lags[None, :]])
+
+        if input_features.shape[1] != len(current['features']):
+            return jsonify({'error': f"expected {len(current['features'])} features: "
+                                     f"{', '.join(current['features'])}"}), 400
 
         # Standardize the input features (same scaling as the training data)
-        input_scaled = scaler.transform(input_features)
+        input_scaled = current['scaler'].transform(input_features)
 
         # Predict the result using the trained model
-        prediction = model.predict(input_scaled)
+        prediction = current['model'].predict(input_scaled)
 
         # If it's a binary classification problem, return a binary prediction
-        if len(np.unique(y)) == 2:
+        if current['is_binary']:
             prediction = (prediction >= 0.5).astype(int)
 
+        # Streaming: record the observed target once it has been scored
+        if entity is not None and 'target' in data:
+            history.observe(entity, float(data['target']))
+
         return jsonify({'prediction': int(prediction[0])})
 
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/observe', methods=['POST'])
+def observe():
+    """Record observed targets: {"entity": id, "target": value} or a list of them, in time order."""
+    data = request.json
+    observations = data if isinstance(data, list) else [data]
+    try:
+        for observation in observations:
+            history.observe(observation['entity'], float(observation['target']))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f"each observation needs an entity and a numeric target ({e})"}), 400
+    return jsonify({'observed': len(observations), **history.stats()})
+
+
+@app.route('/reload', methods=['POST'])
+def reload():
+    reloaded = reload_artifact(force=True)
+    return jsonify({'reloaded': reloaded, 'trained_at': artifact.get('trained_at'),
+                    'features': artifact['features']})
+
 
 if __name__ == '__main__':
     app.run(debug=True, port=8080)
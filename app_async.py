@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from pydantic import Field, create_model
+
+import model_store
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MINIPROJECT'))
+from schema import FEATURE_COLUMNS, FEATURE_DOMAINS, coerce_records  # noqa: E402
+
+# Load the machine learning model (same files and engines as app.py)
+MODEL_PATH = os.environ.get('MODEL_PATH', './ensemble_model_binary_compressed_1.joblib')
+MODEL_ENGINE = os.environ.get('MODEL_ENGINE', 'auto')
+
+# Inference runs on a bounded pool ('thread' or 'process') sized to the host's cores by default
+INFERENCE_POOL = os.environ.get('INFERENCE_POOL', 'thread')
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', os.cpu_count() or 1))
+
+# Requests queued or running on the pool beyond this are rejected with 503
+MAX_PENDING = int(os.environ.get('MAX_PENDING', INFERENCE_WORKERS * 4))
+
+# Largest number of records accepted by /predict/batch in one request
+MAX_BATCH_RECORDS = int(os.environ.get('MAX_BATCH_RECORDS', 100000))
+
+# Define the input data format: the 16 binned model inputs with their valid ranges
+InputData = create_model('InputData', **{
+    column: (int, Field(ge=FEATURE_DOMAINS[column][0], le=FEATURE_DOMAINS[column][1]))
+    for column in FEATURE_COLUMNS
+})
+
+model = None
+
+
+def load_worker_model():
+    # Runs once per pool process (or once in this process for the thread pool)
+    global model
+    model = model_store.load_model(MODEL_PATH, MODEL_ENGINE)
+
+
+def predict_positive(rows):
+    # Positive class probability for a 2D array of feature rows
+    return model.predict_proba(pd.DataFrame(rows, columns=FEATURE_COLUMNS))[:, 1]
+
+
+def score_batch(body):
+    """
+    Decode, validate and score a /predict/batch body; runs on the pool, not the event loop.
+
+    Returns:
+    tuple: (HTTP status, JSON response text).
+    """
+    try:
+        records = json.loads(body)
+    except ValueError:
+        records = None
+    if not isinstance(records, list) or not records:
+        return 400, json.dumps({"error": "expected a non-empty JSON array of records"})
+    # Checked before any record is validated
+    if len(records) > MAX_BATCH_RECORDS:
+        return 413, json.dumps({"error": f"at most {MAX_BATCH_RECORDS} records per request"})
+
+    # Invalid records are reported one by one, like the Flask app does
+    features, valid_index, errors = coerce_records(records)
+    predictions = [None] * len(records)
+    if len(valid_index):
+        for i, score in zip(valid_index, predict_positive(features.to_numpy())):
+            predictions[i] = float(score)
+    return 200, json.dumps({"predictions": predictions,
+                            "errors": [{"index": i, "error": errors[i]} for i in sorted(errors)]})
+
+
+class InferencePool:
+    """
+    Run CPU-bound predictions off the event loop, with a bounded backlog.
+
+    Parameters:
+    kind (str): 'thread' or 'process'. Process workers each load the model in
+        their initializer (use a model store so they share its pages).
+    workers (int): Pool size.
+    max_pending (int): Largest number of calls queued or running at once.
+    """
+
+    def __init__(self, kind, workers, max_pending):
+        if kind == 'process':
+            self.executor = ProcessPoolExecutor(workers, initializer=load_worker_model)
+        elif kind == 'thread':
+            load_worker_model()
+            self.executor = ThreadPoolExecutor(workers, thread_name_prefix='inference')
+        else:
+            raise ValueError(f"INFERENCE_POOL must be 'thread' or 'process', not '{kind}'")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def predict(self, rows):
+        """Scores for `rows`, or None when the backlog is full."""
+        return await self.run(predict_positive, rows)
+
+    async def run(self, fn, *args):
+        """fn(*args) on a pool worker (which has the model loaded), or None when the backlog is full."""
+        # Only the event loop thread touches the counters, so no lock is needed
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            return None
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self):
+        return {'kind': self.kind, 'workers': self.workers, 'max_pending': self.max_pending,
+                'pending': self.pending, 'completed': self.completed, 'rejected': self.rejected}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+pool = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # The pool is created at startup, not import, so process workers never re-create it
+    global pool
+    pool = InferencePool(INFERENCE_POOL, INFERENCE_WORKERS, MAX_PENDING)
+    yield
+    pool.shutdown()
+
+
+# Create the FastAPI app
+app = FastAPI(lifespan=lifespan)
+
+# Add CORS middleware to allow cross-origin requests
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(request, exc):
+    # Same status and shape as the Flask app's validation errors
+    problems = ['.'.join(str(part) for part in error['loc'][1:]) + ': ' + error['msg'] for error in exc.errors()]
+    return JSONResponse({"error": '; '.join(problems)}, status_code=400)
+
+
+def overloaded():
+    return JSONResponse({"error": "inference queue is full, retry later"}, status_code=503,
+                        headers={"Retry-After": "1"})
+
+
+# Define the prediction endpoint
+@app.post("/predict")
+@app.post("/predict/", include_in_schema=False)
+async def predict(data: InputData):
+    rows = np.array([[getattr(data, column) for column in FEATURE_COLUMNS]])
+    scores = await pool.predict(rows)
+    if scores is None:
+        return overloaded()
+    return {"prediction": float(scores[0])}
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    # Decoding and validating 100k records takes about a second, so the raw body goes to the
+    # pool with the prediction instead of being parsed (or checked by pydantic) on the event loop
+    result = await pool.run(score_batch, await request.body())
+    if result is None:
+        return overloaded()
+    status, content = result
+    return Response(content, status_code=status, media_type='application/json')
+
+
+@app.get("/stats/pool")
+async def pool_stats():
+    return pool.stats()
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 8080)))
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MINIPROJECT'))
+from binner import BinningTransformer  # noqa: E402
+
+
+def legacy_preprocess(data):
+    # The original pd.cut + astype implementation from binner.py, kept for comparison
+    data['BMI'] = pd.cut(data['BMI'], bins=[-float('inf'), 18.5, 25, 30, float('inf')],
+                         labels=[0, 1, 2, 3]).astype(int)
+    data['MentHlth'] = pd.cut(data['MentHlth'], bins=[-float('inf'), 5, 10, 15, 20, 25, 30],
+                              labels=[0, 1, 2, 3, 4, 5]).astype(int)
+    data['PhysHlth'] = pd.cut(data['PhysHlth'], bins=[-float('inf'), 5, 10, 15, 20, 25, 30],
+                              labels=[0, 1, 2, 3, 4, 5]).astype(int)
+    data['Fruits_Veggies'] = (data['Fruits'] | data['Veggies'])
+    return data.drop(columns=['Fruits', 'Veggies'], errors='ignore')
+
+
+def make_raw_frame(n, seed=0):
+    # Synthetic rows shaped like convertor.py output
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'BMI': np.round(rng.uniform(13, 60, n), 2),
+        'MentHlth': rng.integers(0, 31, n),
+        'PhysHlth': rng.integers(0, 31, n),
+        'Fruits': rng.integers(0, 2, n),
+        'Veggies': rng.integers(0, 2, n),
+    })
+
+
+def best_time(fn, frame, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        data = frame.copy()
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-row cost of the binning transformer vs the pd.cut version.')
+    parser.add_argument('--max-rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    transformer = BinningTransformer()
+    frame = make_raw_frame(args.max_rows)
+    assert legacy_preprocess(frame.copy()).equals(transformer.transform(frame).astype(int)), 'outputs differ'
+
+    print(f"{'rows':>9} {'pd.cut us/row':>14} {'searchsorted us/row':>20} {'speed-up':>9}")
+    n = 1
+    while n <= args.max_rows:
+        sample = frame.iloc[:n]
+        legacy = best_time(legacy_preprocess, sample, args.repeat)
+        vectorized = best_time(transformer.transform, sample, args.repeat)
+        print(f"{n:>9} {legacy / n * 1e6:>14.3f} {vectorized / n * 1e6:>20.3f} {legacy / vectorized:>8.1f}x")
+        n *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MINIPROJECT'))
+from convertor import columns_to_select, convert_year  # noqa: E402
+
+
+def legacy_convert(source, output):
+    # The original in-memory convertor.py, kept for comparison (np.NaN spelled np.nan for NumPy 2)
+    brfss_df_selected = pd.read_csv(source)[columns_to_select]
+    brfss_df_selected = brfss_df_selected.loc[:, ~brfss_df_selected.columns.duplicated()]
+    brfss_df_selected = brfss_df_selected.replace([77, 99, '7', '9', 'BLANK', 'Don’t know/Not sure', 'Refused', 'Missing'], pd.NA)
+    brfss_df_selected = brfss_df_selected.dropna()
+    brfss_df_selected['TOLDHI2'] = brfss_df_selected['TOLDHI2'].replace({2: 0, 1: 1})
+    brfss_df_selected['_RFSMOK3'] = brfss_df_selected['_RFSMOK3'].replace({1: 0, 2: 1})
+    brfss_df_selected['BPMEDS'] = brfss_df_selected['BPMEDS'].replace({1: 1, 2: 0})
+    brfss_df_selected['MENTHLTH'] = brfss_df_selected['MENTHLTH'].replace({88: 0})
+    brfss_df_selected['PHYSHLTH'] = brfss_df_selected['PHYSHLTH'].replace({88: 0})
+    brfss_df_selected['Heart_Disease_Status'] = 4
+    brfss_df_selected.loc[brfss_df_selected['CVDCRHD4'] == 1, 'Heart_Disease_Status'] = 1
+    brfss_df_selected.loc[brfss_df_selected['CVDINFR4'] == 1, 'Heart_Disease_Status'] = 2
+    brfss_df_selected.loc[brfss_df_selected['CVDSTRK3'] == 1, 'Heart_Disease_Status'] = 3
+    brfss_df_selected = brfss_df_selected.drop(columns=['CVDCRHD4', 'CVDINFR4', 'CVDSTRK3'], errors='ignore')
+    from convertor import rename_columns
+    brfss_df_selected = brfss_df_selected.rename(columns=rename_columns)
+    brfss_df_selected.to_csv(output, sep=',', index=False)
+
+    df = pd.read_csv(output)
+    for column in df.columns:
+        if column != 'BMI':
+            df[column] = df[column].astype(int)
+    df['PhysActivity'] = df['PhysActivity'].replace({2: 0, 9: np.nan})
+    df['HighChol'] = df['HighChol'].replace({7: np.nan, 9: np.nan})
+    df['BMI'] = df['BMI'] / 100
+    df['Diabetes'] = df['Diabetes'].replace({2: 1, 3: 0, 4: 0, 7: np.nan, 9: np.nan})
+    df['Fruits'] = df['Fruits'].replace({2: 0, 9: np.nan})
+    df['Veggies'] = df['Veggies'].replace({2: 0, 9: np.nan})
+    df['HvyAlcoholConsump'] = df['HvyAlcoholConsump'].replace({1: 0, 2: 1, 9: np.nan})
+    df['GenHlth'] = df['GenHlth'].replace({7: np.nan, 9: np.nan})
+    df['MentHlth'] = df['MentHlth'].replace({88: 0})
+    df['PhysHlth'] = df['PhysHlth'].replace({88: 0})
+    df['DiffWalk'] = df['DiffWalk'].replace({2: 0, 7: np.nan, 9: np.nan})
+    df['Sex'] = df['Sex'].replace({1: 0, 2: 1})
+    df['Education'] = df['Education'].replace({9: np.nan})
+    df = df.drop(columns=['Income'])
+    df['Current_Smoker'] = df['Current_Smoker'].replace({9: np.nan})
+    df['Income_Category'] = df['Income_Category'].replace({9: np.nan})
+    df['On_BP_Medication'] = df['On_BP_Medication'].replace({7: np.nan, 9: np.nan})
+    df = df.dropna()
+    for column in df.columns:
+        if column != 'BMI':
+            df[column] = df[column].astype(int)
+    df.to_csv(output, sep=',', index=False)
+
+
+def make_brfss_file(path, rows, extra_columns=310, seed=0):
+    """Write a synthetic BRFSS-shaped CSV: the selected columns plus filler columns, with blanks."""
+    rng = np.random.default_rng(seed)
+    codes = {
+        'TOLDHI2': [1, 2, 7, 9], 'DIABETE3': [1, 2, 3, 4, 7, 9], '_TOTINDA': [1, 2, 9],
+        '_FRTLT1': [1, 2, 9], '_VEGLT1': [1, 2, 9], '_RFDRHV5': [1, 2, 9], 'GENHLTH': [1, 2, 3, 4, 5, 7, 9],
+        'MENTHLTH': list(range(1, 31)) + [77, 88, 99], 'PHYSHLTH': list(range(1, 31)) + [77, 88, 99],
+        'DIFFWALK': [1, 2, 7, 9], 'SEX': [1, 2], 'EDUCA': [1, 2, 3, 4, 5, 6, 9], 'INCOME2': list(range(1, 9)) + [77, 99],
+        '_RFSMOK3': [1, 2, 9], '_INCOMG': [1, 2, 3, 4, 5, 9], '_AGE_G': [1, 2, 3, 4, 5, 6], 'BPMEDS': [1, 2, 7, 9],
+        'CVDCRHD4': [1, 2, 7, 9], 'CVDINFR4': [1, 2, 7, 9], 'CVDSTRK3': [1, 2, 7, 9],
+    }
+    data = {column: rng.choice(values, rows).astype(float) for column, values in codes.items()}
+    data['_BMI5'] = rng.integers(1200, 6000, rows).astype(float)
+    data['BPMEDS'][rng.random(rows) < 0.5] = np.nan  # only asked of people told they have high blood pressure
+    for i in range(extra_columns):
+        data[f'FILLER{i}'] = rng.integers(0, 100, rows)
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def peak_rss_mb():
+    # VmHWM starts fresh at exec; ru_maxrss can carry over the parent's peak on Linux
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_one(mode, source, output):
+    start = time.perf_counter()
+    if mode == 'legacy':
+        legacy_convert(source, output)
+    else:
+        convert_year('bench', source, output)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'mode': mode, 'seconds': seconds, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Wall-clock and peak memory of the streaming convertor vs the original script.')
+    parser.add_argument('--source', help='BRFSS CSV to convert (a synthetic one is generated if omitted)')
+    parser.add_argument('--rows', type=int, default=200000, help='rows of the synthetic file')
+    parser.add_argument('--run', choices=['legacy', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        run_one(args.run, args.source, args.output)
+        return
+
+    source = args.source
+    if source is None:
+        source = 'bench_brfss.csv'
+        make_brfss_file(source, args.rows)
+
+    # Each mode runs in its own process so peak RSS is measured separately
+    results = []
+    for mode in ('legacy', 'streaming'):
+        out = subprocess.run([sys.executable, __file__, '--run', mode, '--source', source, '--output', f'bench_{mode}.csv'],
+                             check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    same = pd.read_csv('bench_legacy.csv').equals(pd.read_csv('bench_streaming.csv'))
+    for result in results:
+        print(f"{result['mode']:>10}: {result['seconds']:8.2f} s  peak RSS {result['peak_rss_mb']:8.1f} MB")
+    print(f"outputs identical: {same}")
+
+
+if __name__ == '__main__':
+    main()
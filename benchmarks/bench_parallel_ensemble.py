@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'MINIPROJECT'))
+from parallel_ensemble import DEFAULT_SHARD_ROWS, ParallelVotingClassifier  # noqa: E402
+from schema import FEATURE_COLUMNS, FEATURE_DOMAINS  # noqa: E402
+
+DEFAULT_MODEL = os.path.join(ROOT, 'ensemble_model_binary_compressed_1.joblib')
+
+
+def make_features(n, seed=0):
+    # Random valid binned rows, as the service receives them
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({col: rng.integers(FEATURE_DOMAINS[col][0], FEATURE_DOMAINS[col][1] + 1, n)
+                         for col in FEATURE_COLUMNS})
+
+
+def best_time(fn, X, repeat, budget):
+    # Best of up to `repeat` runs, stopping early once `budget` seconds are spent
+    best, deadline = float('inf'), time.perf_counter() + budget
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+        if time.perf_counter() > deadline:
+            break
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stock VotingClassifier vs members evaluated on a thread pool.')
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--max-rows', type=int, default=1000000)
+    parser.add_argument('--jobs', type=int, help='threads of the shared pool (default: all cores)')
+    parser.add_argument('--shard-rows', type=int, default=DEFAULT_SHARD_ROWS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=10.0, help='seconds per measurement before stopping early')
+    args = parser.parse_args(argv)
+
+    stock = joblib.load(args.model)
+    parallel = ParallelVotingClassifier(joblib.load(args.model), args.jobs, args.shard_rows)
+    X = make_features(args.max_rows)
+    check = X.iloc[:min(len(X), 100000)]
+    assert np.allclose(stock.predict_proba(check), parallel.predict_proba(check), atol=1e-12), 'outputs differ'
+
+    print(f"{os.cpu_count()} cores, pool of {parallel.n_jobs} threads, {parallel.inner_threads} per member")
+    print(f"{'rows':>9} {'stock ms':>12} {'parallel ms':>12} {'speed-up':>9}")
+    n = 1
+    while n <= args.max_rows:
+        sample = X.iloc[:n]
+        serial = best_time(stock.predict_proba, sample, args.repeat, args.budget)
+        threaded = best_time(parallel.predict_proba, sample, args.repeat, args.budget)
+        print(f"{n:>9} {serial * 1000:>12.2f} {threaded * 1000:>12.2f} {serial / threaded:>8.2f}x")
+        n *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, candidate, threshold):
+    """
+    Pair up the measurements of two run_benchmarks.py results.
+
+    Returns:
+    list: One row per measurement found in both files: (section, key, metric,
+    baseline value, candidate value, change, regressed).
+    """
+    rows = []
+    micro = {(r['batch'], r['stage']): r for r in baseline.get('micro', [])}
+    for r in candidate.get('micro', []):
+        old = micro.get((r['batch'], r['stage']))
+        if old and old['median_ms'] > 0:
+            change = r['median_ms'] / old['median_ms'] - 1
+            rows.append(('micro', f"batch={r['batch']} {r['stage']}", 'median_ms', old['median_ms'], r['median_ms'],
+                         change, change > threshold))
+
+    http = {(r['mode'], r['concurrency'], r.get('batch', 0)): r for r in baseline.get('http', [])}
+    for r in candidate.get('http', []):
+        old = http.get((r['mode'], r['concurrency'], r.get('batch', 0)))
+        if not old:
+            continue
+        key = f"{r['mode']} c={r['concurrency']}"
+        if old['requests_per_second']:
+            change = r['requests_per_second'] / old['requests_per_second'] - 1
+            rows.append(('http', key, 'requests_per_second', old['requests_per_second'], r['requests_per_second'],
+                         change, change < -threshold))
+        if old['p99_ms'] and r['p99_ms']:
+            change = r['p99_ms'] / old['p99_ms'] - 1
+            rows.append(('http', key, 'p99_ms', old['p99_ms'], r['p99_ms'], change, change > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two run_benchmarks.py result files.')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change counted as a regression')
+    parser.add_argument('--fail', action='store_true', help='exit with status 1 when anything regressed')
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    for label, results in (('baseline', baseline), ('candidate', candidate)):
+        env = results.get('environment', {})
+        print(f"{label:>9}: model {env.get('model_sha256', '?')[:12]}  commit {(env.get('git_commit') or '?')[:12]}  "
+              f"{env.get('created', '')}")
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"\n{'section':<6} {'measurement':<40} {'metric':<20} {'baseline':>11} {'candidate':>11} {'change':>8}")
+    for section, key, metric, old, new, change, regressed in rows:
+        flag = '  REGRESSED' if regressed else ''
+        print(f"{section:<6} {key:<40} {metric:<20} {old:>11.3f} {new:>11.3f} {change:>+7.1%}{flag}")
+
+    regressions = sum(row[-1] for row in rows)
+    print(f"\n{regressions} of {len(rows)} measurements regressed by more than {args.threshold:.0%}")
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'MINIPROJECT'))
+from schema import FEATURE_COLUMNS, FEATURE_DOMAINS  # noqa: E402
+
+# How each serving mode is started on a local port
+SERVERS = {
+    'flask': lambda port: [sys.executable, '-c',
+                           f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+    'async': lambda port: [sys.executable, '-m', 'uvicorn', 'app_async:app', '--host', '127.0.0.1',
+                           '--port', str(port), '--log-level', 'warning'],
+}
+
+
+def make_records(n, seed=0):
+    """`n` random valid records (reproducible for a given seed)."""
+    rng = np.random.default_rng(seed)
+    columns = {col: rng.integers(FEATURE_DOMAINS[col][0], FEATURE_DOMAINS[col][1] + 1, n) for col in FEATURE_COLUMNS}
+    return [{col: int(columns[col][i]) for col in FEATURE_COLUMNS} for i in range(n)]
+
+
+def start_server(mode, port, env, timeout=120):
+    process = subprocess.Popen(SERVERS[mode](port), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with code {process.returncode}")
+        try:
+            if httpx.post(f'{url}/predict', json=make_records(1)[0], timeout=5).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not become ready within {timeout}s")
+
+
+async def run_load(url, records, concurrency, total, batch=0):
+    """
+    Closed-loop load: `concurrency` clients send `total` requests back to back.
+
+    Returns:
+    dict: Throughput, latency percentiles (ms) and status counts.
+    """
+    latencies = np.empty(total)
+    statuses = np.zeros(total, dtype=np.int16)
+    next_request = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def client(http):
+        nonlocal next_request
+        while next_request < total:
+            i = next_request
+            next_request += 1
+            if batch:
+                path = '/predict/batch'
+                body = [records[(i * batch + j) % len(records)] for j in range(batch)]
+            else:
+                path, body = '/predict', records[i % len(records)]
+            start = time.perf_counter()
+            try:
+                statuses[i] = (await http.post(url + path, json=body)).status_code
+            except httpx.HTTPError:
+                statuses[i] = -1
+            latencies[i] = time.perf_counter() - start
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        seconds = time.perf_counter() - start
+
+    ok = statuses == 200
+    ms = latencies[ok] * 1000
+    percentile = lambda q: round(float(np.percentile(ms, q)), 2) if len(ms) else None  # noqa: E731
+    return {
+        'concurrency': concurrency, 'requests': total, 'ok': int(ok.sum()),
+        'rejected_503': int((statuses == 503).sum()), 'failed': int((~ok & (statuses != 503)).sum()),
+        'seconds': round(seconds, 3), 'requests_per_second': round(ok.sum() / seconds, 1),
+        'records_per_second': round(ok.sum() * max(batch, 1) / seconds, 1),
+        'p50_ms': percentile(50), 'p90_ms': percentile(90), 'p99_ms': percentile(99),
+        'max_ms': round(float(ms.max()), 2) if len(ms) else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Throughput and latency of the Flask and async servers.')
+    parser.add_argument('--modes', nargs='+', choices=sorted(SERVERS), default=['flask', 'async'])
+    parser.add_argument('--url', help='load an already running server instead of starting one')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=2000, help='requests per concurrency level')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--batch', type=int, default=0, help='records per /predict/batch call (0: /predict)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--model', help='MODEL_PATH for the servers')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    records = make_records(1000, args.seed)
+    env = dict(os.environ)
+    if args.model:
+        env['MODEL_PATH'] = os.path.abspath(args.model)
+
+    results = []
+    for mode in ['external'] if args.url else args.modes:
+        process, url = (None, args.url) if args.url else start_server(mode, args.port, env)
+        try:
+            asyncio.run(run_load(url, records, 1, args.warmup, args.batch))
+            for concurrency in args.concurrency:
+                result = {'mode': mode, **asyncio.run(run_load(url, records, concurrency, args.requests, args.batch))}
+                results.append(result)
+                print(f"{mode:>8} c={concurrency:<4} {result['requests_per_second']:>9.1f} req/s  "
+                      f"p50 {result['p50_ms']} ms  p90 {result['p90_ms']} ms  p99 {result['p99_ms']} ms  "
+                      f"503s {result['rejected_503']}  failed {result['failed']}")
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'MINIPROJECT'))
+import model_store  # noqa: E402
+from load_test import make_records, run_load, start_server  # noqa: E402
+from prediction_cache import model_fingerprint  # noqa: E402
+from schema import FEATURE_COLUMNS, coerce_records  # noqa: E402
+
+DEFAULT_MODEL = os.path.join(ROOT, 'ensemble_model_binary_compressed_1.joblib')
+
+
+def measure(fn, repeat, budget):
+    """
+    Run `fn` up to `repeat` times (at least once), stopping early after `budget` seconds.
+
+    Returns:
+    dict: Median, p90 and best time in milliseconds, and the number of runs.
+    """
+    times = []
+    deadline = time.perf_counter() + budget
+    while len(times) < repeat and (not times or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    ms = np.array(times) * 1000
+    return {'median_ms': round(float(np.median(ms)), 4), 'p90_ms': round(float(np.percentile(ms, 90)), 4),
+            'min_ms': round(float(ms.min()), 4), 'runs': len(times)}
+
+
+def request_stages(model, records):
+    """
+    The steps of app.py's /predict and /predict/batch, one callable each, for one batch of records.
+
+    Each step gets its input precomputed, so it is timed on its own.
+    """
+    body = json.dumps(records if len(records) > 1 else records[0])
+    parsed = json.loads(body)
+    features, _, _ = coerce_records(records)
+    rows = features.to_numpy()
+    frame = pd.DataFrame(rows, columns=FEATURE_COLUMNS)
+    scores = model.predict_proba(frame)[:, 1]
+
+    stages = {
+        'parse_json': lambda: json.loads(body),
+        'validate': lambda: coerce_records(parsed if isinstance(parsed, list) else [parsed]),
+        'build_dataframe': lambda: pd.DataFrame(rows, columns=FEATURE_COLUMNS),
+        'predict_proba': lambda: model.predict_proba(frame),
+        'serialize': lambda: json.dumps({'predictions': [float(s) for s in scores], 'errors': []}),
+    }
+    # What the VotingClassifier spends in each of its fitted estimators
+    for name, estimator in getattr(model, 'named_estimators_', {}).items():
+        stages[f'estimator:{name}'] = lambda estimator=estimator: estimator.predict_proba(frame)
+    return stages
+
+
+def flask_stages(records):
+    """A whole request through the Flask app in-process (routing included, no network)."""
+    if 'app' not in sys.modules:
+        # Loaded by path: MINIPROJECT, first on sys.path, has an app.py of its own
+        spec = importlib.util.spec_from_file_location('app', os.path.join(ROOT, 'app.py'))
+        sys.modules['app'] = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(sys.modules['app'])
+
+    client = sys.modules['app'].app.test_client()
+    if len(records) == 1:
+        return {'flask_request': lambda: client.post('/predict', json=records[0])}
+    return {'flask_request': lambda: client.post('/predict/batch', json=records)}
+
+
+def run_micro(model, batch_sizes, repeat, budget, flask=True, seed=0):
+    records = make_records(max(batch_sizes), seed)
+    results = []
+    for batch in batch_sizes:
+        stages = request_stages(model, records[:batch])
+        if flask:
+            stages.update(flask_stages(records[:batch]))
+        for stage, fn in stages.items():
+            out = fn()  # warm-up
+            # A failing app must not be timed as if it answered
+            if getattr(out, 'status_code', 200) != 200:
+                raise RuntimeError(f"{stage} returned {out.status_code}: {out.get_data(as_text=True)[:200]}")
+            result = {'batch': batch, 'stage': stage, **measure(fn, repeat, budget)}
+            result['us_per_row'] = round(result['median_ms'] * 1000 / batch, 3)
+            results.append(result)
+            print(f"{batch:>7} {stage:<24} {result['median_ms']:>11.3f} ms  {result['us_per_row']:>10.3f} us/row")
+    return results
+
+
+def run_http(model_path, concurrency, requests, batch, port, seed=0):
+    env = dict(os.environ, MODEL_PATH=os.path.abspath(model_path))
+    records = make_records(1000, seed)
+    process, url = start_server('flask', port, env)
+    results = []
+    try:
+        asyncio.run(run_load(url, records, 1, 50, batch))
+        for level in concurrency:
+            result = {'mode': 'flask', 'batch': batch, **asyncio.run(run_load(url, records, level, requests, batch))}
+            results.append(result)
+            print(f"  flask c={level:<4} {result['requests_per_second']:>9.1f} req/s  p50 {result['p50_ms']} ms  "
+                  f"p99 {result['p99_ms']} ms  failed {result['failed']}")
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+def environment(model_path):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    import sklearn
+
+    return {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'model_path': os.path.abspath(model_path),
+        'model_sha256': model_fingerprint(model_path),
+        'git_commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'cpu_count': os.cpu_count(),
+        'machine': platform.machine(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Latency and throughput of the prediction stack, written as JSON.')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='model file or store (MODEL_PATH)')
+    parser.add_argument('--engine', default='auto', help='MODEL_ENGINE for model stores')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=50, help='runs per measurement')
+    parser.add_argument('--budget', type=float, default=2.0, help='seconds per measurement before stopping early')
+    parser.add_argument('--no-flask', action='store_true', help='skip the in-process Flask requests')
+    parser.add_argument('--http', action='store_true', help='also load a local Flask server over HTTP')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--requests', type=int, default=1000, help='HTTP requests per concurrency level')
+    parser.add_argument('--http-batch', type=int, default=0, help='records per /predict/batch call (0: /predict)')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    # The in-process Flask app loads the same model
+    os.environ['MODEL_PATH'] = os.path.abspath(args.model)
+    os.environ['MODEL_ENGINE'] = args.engine
+
+    start = time.perf_counter()
+    model = model_store.load_model(args.model, args.engine)
+    load_seconds = time.perf_counter() - start
+
+    print(f"{'batch':>7} {'stage':<24} {'median':>14} {'per row':>13}")
+    results = {
+        'environment': environment(args.model),
+        'args': vars(args),
+        'model_load_seconds': round(load_seconds, 4),
+        'micro': run_micro(model, args.batch_sizes, args.repeat, args.budget, not args.no_flask, args.seed),
+        'http': [],
+    }
+    if args.http:
+        results['http'] = run_http(args.model, args.concurrency, args.requests, args.http_batch, args.port, args.seed)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Coalesce single-record predictions into small batches.
+
+    Callers submit one feature row at a time. A background thread waits up to
+    `max_wait_ms` after the first queued row (or until `max_batch_size` rows are
+    queued), scores all of them with one call to `predict_fn`, and hands each
+    caller its own result through a Future.
+
+    Parameters:
+    predict_fn (callable): Takes a 2D array of feature rows and returns one score per row.
+    max_batch_size (int): Largest number of rows scored together.
+    max_wait_ms (float): How long the first row of a batch may wait for company.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        # Histogram buckets are powers of two up to the batch size limit
+        bounds, bound = [], 1
+        while bound < self.max_batch_size:
+            bounds.append(bound)
+            bound *= 2
+        self.bucket_bounds = bounds + [self.max_batch_size]
+
+        self._batch_sizes = np.zeros(len(self.bucket_bounds), dtype=np.int64)
+        self._queue_depths = np.zeros(len(self.bucket_bounds) + 1, dtype=np.int64)
+        self._batches = 0
+        self._records = 0
+        self._start()
+        # Threads do not survive fork (e.g. gunicorn preload_app): forked workers start their own
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue one feature row and return a Future for its score."""
+        future = Future()
+        self._queue.put((np.asarray(row), future))
+        return future
+
+    def predict(self, row, timeout=None):
+        """Score one feature row, blocking until its batch has been evaluated."""
+        return self.submit(row).result(timeout)
+
+    def _collect(self):
+        # Block for the first row, then gather more until the batch is full or the wait expires
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._record(len(batch), self._queue.qsize())
+            futures = [future for _, future in batch]
+            try:
+                scores = self.predict_fn(np.vstack([row for row, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, score in zip(futures, scores):
+                future.set_result(score)
+
+    def _record(self, batch_size, queue_depth):
+        with self._lock:
+            self._batches += 1
+            self._records += batch_size
+            self._batch_sizes[np.searchsorted(self.bucket_bounds, batch_size)] += 1
+            self._queue_depths[np.searchsorted(self.bucket_bounds, queue_depth)] += 1
+
+    def stats(self):
+        """
+        Return counters for tuning the latency/throughput trade-off.
+
+        Histograms are keyed by the inclusive upper bound of each bucket; the
+        queue depth is sampled each time a batch is dispatched.
+        """
+        labels = [str(bound) for bound in self.bucket_bounds]
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'records': self._records,
+                'mean_batch_size': self._records / self._batches if self._batches else 0.0,
+                'batch_size_histogram': dict(zip(labels, self._batch_sizes.tolist())),
+                'queue_depth_histogram': dict(zip(labels + ['+Inf'], self._queue_depths.tolist())),
+            }
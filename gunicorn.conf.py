@@ -0,0 +1,25 @@
+# gunicorn -c gunicorn.conf.py app:app
+import os
+import sys
+
+bind = os.environ.get('BIND', '0.0.0.0:8080')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+
+# Load the model once in the master; forked workers inherit it instead of each loading their own copy.
+# With MODEL_PATH pointing at a model store the arrays are memory-mapped, so they stay shared.
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+
+
+def post_worker_init(worker):
+    # Runs in every worker once the app is loaded (inherited from the master with preload_app)
+    from model_store import memory_usage
+
+    app_module = sys.modules.get('app')
+    load = getattr(app_module, 'model_load', None) or {}
+    memory = memory_usage()
+    worker.log.info(
+        "worker %s: model %s loaded in %.3fs %s; rss %s MB, pss %s MB, private %s MB",
+        worker.pid, load.get('path'), load.get('seconds', float('nan')),
+        'in the master (preloaded)' if load.get('pid') != worker.pid else 'in this worker',
+        memory.get('rss_mb'), memory.get('pss_mb'),
+        round(memory.get('private_clean_mb', 0) + memory.get('private_dirty_mb', 0), 1))
@@ -0,0 +1,267 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+import numpy as np
+
+# Latency buckets in seconds, from 100 us to 10 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+
+class Counter:
+    """Monotonic count per label set, rendered as a Prometheus counter."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge:
+    """
+    Value read at scrape time from `fn`, which returns a number or a dict of
+    label tuple -> number (None when there is nothing to report). Totals kept
+    by another object (e.g. cache hits) are exposed with kind='counter'.
+    """
+
+    def __init__(self, name, help, fn, labelnames=(), kind='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def samples(self):
+        value = self.fn()
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            return [(self.name, '', value)]
+        return [(self.name, _labels(self.labelnames, key), v) for key, v in sorted(value.items())]
+
+
+class Histogram:
+    """Cumulative latency histogram per label set, rendered as a Prometheus histogram."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = np.asarray(buckets, dtype=np.float64)
+        self._series = {}  # label tuple -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        i = int(np.searchsorted(self.buckets, value))  # first bucket with bound >= value
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [np.zeros(len(self.buckets) + 1, dtype=np.int64), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            series = {key: (counts.cumsum(), total, n) for key, (counts, total, n) in sorted(self._series.items())}
+        for key, (cumulative, total, n) in series.items():
+            for bound, count in zip([*map(repr, self.buckets.tolist()), '+Inf'], cumulative.tolist()):
+                out.append((f'{self.name}_bucket', _labels(self.labelnames + ('le',), key + (bound,)), count))
+            out.append((f'{self.name}_sum', _labels(self.labelnames, key), total))
+            out.append((f'{self.name}_count', _labels(self.labelnames, key), n))
+        return out
+
+
+class Registry:
+    """The metrics of one process, rendered in the Prometheus text format (version 0.0.4)."""
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, fn, labelnames=(), kind='gauge'):
+        return self.add(Gauge(name, help, fn, labelnames, kind))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.add(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{name}{labels} {float(value)!r}' for name, labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_members(model, histogram):
+    """
+    Time every base estimator of a soft-voting ensemble into `histogram` (label 'estimator').
+
+    Works on a fitted sklearn VotingClassifier and on a fused_model.FusedEnsemble;
+    the wrappers are set on the instances, so the class and the saved model are
+    untouched. Other models are returned as they are.
+    """
+    for name, estimator in getattr(model, 'named_estimators_', {}).items():
+        if 'predict_proba' not in vars(estimator):
+            estimator.predict_proba = _timed(estimator.predict_proba, histogram, name)
+
+    member_names = getattr(model, 'member_names', None)
+    if member_names and '_member_proba' not in vars(model):
+        member_proba = model._member_proba
+
+        def timed_member(X, i, member):
+            with histogram.time(estimator=member_names[i]):
+                return member_proba(X, i, member)
+
+        model._member_proba = timed_member
+    return model
+
+
+def _timed(fn, histogram, name):
+    def wrapper(*args, **kwargs):
+        with histogram.time(estimator=name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for a random fraction of requests.
+
+    While a sampled request runs, a background thread records its thread's
+    Python stack every `interval` seconds. Stacks are aggregated in the folded
+    format ('outer;inner;leaf count' per line) that flamegraph.pl and
+    speedscope read directly. Requests that are not sampled pay one
+    random() call.
+
+    Parameters:
+    rate (float): Fraction of requests profiled (0 disables the profiler).
+    interval (float): Seconds between two stack samples.
+    """
+
+    def __init__(self, rate=0.0, interval=0.005):
+        self.rate = float(rate)
+        self.interval = float(interval)
+        self.stacks = _Tally()
+        self.profiled_requests = 0
+        self._active = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def configure(self, rate=None, interval=None):
+        if rate is not None:
+            self.rate = min(max(float(rate), 0.0), 1.0)
+        if interval is not None:
+            self.interval = max(float(interval), 0.0005)
+
+    def begin(self):
+        """Start profiling the calling thread `rate` of the time; returns whether it was picked."""
+        if self.rate <= 0 or random.random() >= self.rate:
+            return False
+        with self._lock:
+            self._active.add(threading.get_ident())
+            self.profiled_requests += 1
+            # The sampler thread does not survive fork (gunicorn preload), so it is tracked per process
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+        return True
+
+    def end(self):
+        with self._lock:
+            self._active.discard(threading.get_ident())
+
+    @contextmanager
+    def maybe_profile(self):
+        """Profile the calling thread for the duration of the block, `rate` of the time."""
+        profiled = self.begin()
+        try:
+            yield profiled
+        finally:
+            if profiled:
+                self.end()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id in active:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                with self._lock:
+                    self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        with self._lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.profiled_requests = 0
+
+    def stats(self):
+        with self._lock:
+            return {'rate': self.rate, 'interval': self.interval, 'profiled_requests': self.profiled_requests,
+                    'active': len(self._active), 'distinct_stacks': len(self.stacks),
+                    'samples': sum(self.stacks.values())}
@@ -0,0 +1,180 @@
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+
+from prediction_cache import model_fingerprint
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MINIPROJECT'))
+from fused_model import FusedEnsemble, export_ensemble  # noqa: E402
+
+# Written last into a store directory; its presence marks a complete store
+STORE_FILE = 'store.json'
+
+# Uncompressed pickle of the original estimator, loadable with mmap_mode='r'
+SKLEARN_FILE = 'model.joblib'
+
+
+def _array_file(key):
+    # Fused array keys look like '3/threshold'
+    return key.replace('/', '__') + '.npy'
+
+
+def save_store(model, directory, source=None):
+    """
+    Save a model as a directory of uncompressed, memory-mappable arrays.
+
+    The store holds the fused NumPy form of the ensemble (one .npy file per
+    array) and an uncompressed joblib pickle of the original estimator. Both
+    load with mmap_mode='r', so worker processes map the same files and share
+    their pages through the OS cache instead of each holding a private copy.
+    The store is built next to `directory` and swapped in at the end.
+
+    Parameters:
+    model: Fitted VotingClassifier (or any estimator; the fused form is skipped
+        when the ensemble cannot be exported).
+    directory (str): Store directory to create or replace.
+    source (str): Model file the store was built from, recorded with its SHA-256.
+    """
+    tmp = f'{directory}.tmp{os.getpid()}'
+    shutil.rmtree(tmp, ignore_errors=True)
+    try:
+        os.makedirs(os.path.join(tmp, 'arrays'))
+
+        info = {
+            'format': 1,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'source': os.path.abspath(source) if source else None,
+            'source_sha256': model_fingerprint(source) if source else None,
+            'sklearn': SKLEARN_FILE,
+            'fused': None,
+        }
+        try:
+            fused = export_ensemble(model)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            print(f"Not storing a fused form: {e}")
+        else:
+            for key, array in fused.arrays.items():
+                np.save(os.path.join(tmp, 'arrays', _array_file(key)), np.ascontiguousarray(array))
+            info['fused'] = {'meta': fused.meta, 'arrays': sorted(fused.arrays)}
+
+        joblib.dump(model, os.path.join(tmp, SKLEARN_FILE), compress=0)
+        with open(os.path.join(tmp, STORE_FILE), 'w') as f:
+            json.dump(info, f, indent=2)
+
+        # Swap the new store in; processes that mapped the old files keep reading them until they reload
+        old = f'{directory}.old{os.getpid()}'
+        if os.path.exists(directory):
+            os.rename(directory, old)
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            # Put the previous store back rather than leaving none
+            if os.path.exists(old):
+                os.rename(old, directory)
+            raise
+        shutil.rmtree(old, ignore_errors=True)
+    finally:
+        # Nothing is left behind when building the store fails
+        shutil.rmtree(tmp, ignore_errors=True)
+    return info
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, STORE_FILE))
+
+
+def read_store_info(directory):
+    with open(os.path.join(directory, STORE_FILE)) as f:
+        return json.load(f)
+
+
+def load_store(directory, engine='auto'):
+    """
+    Load a model store with its arrays memory-mapped.
+
+    Parameters:
+    directory (str): Store written by `save_store`.
+    engine (str): 'fused' (NumPy only), 'sklearn' (the original estimator) or
+        'auto' (fused when the store has it).
+    """
+    info = read_store_info(directory)
+    if engine == 'auto':
+        engine = 'fused' if info['fused'] else 'sklearn'
+    if engine == 'fused':
+        if not info['fused']:
+            raise ValueError(f"{directory} has no fused form; use engine='sklearn'")
+        arrays = {key: np.load(os.path.join(directory, 'arrays', _array_file(key)), mmap_mode='r')
+                  for key in info['fused']['arrays']}
+        return FusedEnsemble(info['fused']['meta'], arrays)
+    if engine == 'sklearn':
+        return joblib.load(os.path.join(directory, info['sklearn']), mmap_mode='r')
+    raise ValueError(f"unknown engine '{engine}'")
+
+
+def load_model(path, engine='auto'):
+    """
+    Load a model from a store directory, a fused .npz artifact or a joblib file.
+
+    Stores are memory-mapped and shared between workers; fused artifacts only
+    need NumPy. `engine` only applies to stores (see `load_store`).
+    """
+    if os.path.isdir(path):
+        return load_store(path, engine)
+    if path.endswith('.npz'):
+        return FusedEnsemble.load(path)
+    return joblib.load(path)
+
+
+def memory_usage():
+    """
+    Resident memory of this process in MB, split into shared and private pages.
+
+    Read from /proc/self/smaps_rollup (Linux); PSS divides each shared page
+    among the processes that map it. Empty on other platforms.
+    """
+    fields = {'Rss': 'rss_mb', 'Pss': 'pss_mb', 'Shared_Clean': 'shared_clean_mb',
+              'Private_Clean': 'private_clean_mb', 'Private_Dirty': 'private_dirty_mb'}
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in fields:
+                    usage[fields[name]] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return usage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert a joblib model to a memory-mappable model store.')
+    parser.add_argument('model', help='joblib model file')
+    parser.add_argument('output', help='store directory')
+    parser.add_argument('--check', action='store_true', help='time loading the store against the joblib file')
+    args = parser.parse_args(argv)
+
+    model = joblib.load(args.model)
+    info = save_store(model, args.output, source=args.model)
+    print(f"Model store saved to {args.output} (fused form: {'yes' if info['fused'] else 'no'})")
+
+    if args.check:
+        # Modules are already imported, so these times are the loading work alone
+        start = time.perf_counter()
+        joblib.load(args.model)
+        report = {'joblib_load_seconds': round(time.perf_counter() - start, 4)}
+        for engine in ('fused', 'sklearn') if info['fused'] else ('sklearn',):
+            start = time.perf_counter()
+            load_store(args.output, engine)
+            report[f'{engine}_load_seconds'] = round(time.perf_counter() - start, 4)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MINIPROJECT'))
+from dataset_io import file_digest  # noqa: E402
+from schema import FEATURE_COLUMNS, FEATURE_DOMAINS  # noqa: E402
+
+# Mixed-radix layout of the binned feature space: every valid row maps to one integer
+_LOW = np.array([FEATURE_DOMAINS[col][0] for col in FEATURE_COLUMNS], dtype=np.int64)
+_RADIX = np.array([FEATURE_DOMAINS[col][1] - FEATURE_DOMAINS[col][0] + 1 for col in FEATURE_COLUMNS], dtype=np.int64)
+_STRIDE = np.concatenate([np.cumprod(_RADIX[::-1])[::-1][1:], [1]])
+SPACE_SIZE = int(np.prod(_RADIX))
+
+
+def pack_keys(rows):
+    """Map validated feature rows (model column order) to their integer cache keys."""
+    return (np.asarray(rows, dtype=np.int64) - _LOW) @ _STRIDE
+
+
+def unpack_keys(keys):
+    """Inverse of pack_keys: rebuild the feature rows for an array of keys."""
+    keys = np.asarray(keys, dtype=np.int64)
+    return (keys[:, None] // _STRIDE) % _RADIX + _LOW
+
+
+def model_fingerprint(path):
+    """SHA-256 of a model file, used to tie cached probabilities to the model that produced them."""
+    if os.path.isdir(path):
+        # A model store (model_store.py) is identified by the model file it was built from
+        with open(os.path.join(path, 'store.json')) as f:
+            return json.load(f)['source_sha256']
+    return file_digest(path)
+
+
+class PredictionCache:
+    """
+    Bounded in-memory map from packed feature keys to probabilities.
+
+    Parameters:
+    maxsize (int): Largest number of entries kept.
+    policy (str): 'lru' evicts the least recently used entry, 'lfu' the least
+    frequently used one (ties broken by recency).
+    """
+
+    def __init__(self, maxsize=100000, policy='lru'):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"unknown eviction policy '{policy}'")
+        self.maxsize = int(maxsize)
+        self.policy = policy
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._values = OrderedDict()
+            # LFU bookkeeping: key -> use count, count -> keys in recency order
+            self._counts = {}
+            self._buckets = defaultdict(OrderedDict)
+            self._min_count = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def _touch(self, key):
+        if self.policy == 'lru':
+            self._values.move_to_end(key)
+            return
+        count = self._counts[key]
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+            if self._min_count == count:
+                self._min_count = count + 1
+        self._counts[key] = count + 1
+        self._buckets[count + 1][key] = None
+
+    def _evict(self):
+        if self.policy == 'lru':
+            self._values.popitem(last=False)
+        else:
+            bucket = self._buckets[self._min_count]
+            key, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self._buckets[self._min_count]
+            del self._counts[key]
+            del self._values[key]
+        self.evictions += 1
+
+    def get_many(self, keys):
+        """Return cached probabilities for `keys`, NaN where there is no entry."""
+        out = np.full(len(keys), np.nan)
+        with self._lock:
+            for i, key in enumerate(keys.tolist()):
+                value = self._values.get(key)
+                if value is not None:
+                    out[i] = value
+                    self._touch(key)
+            found = int(np.count_nonzero(~np.isnan(out)))
+            self.hits += found
+            self.misses += len(keys) - found
+        return out
+
+    def put_many(self, keys, values):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            for key, value in zip(keys.tolist(), values.tolist()):
+                if key in self._values:
+                    self._values[key] = value
+                    self._touch(key)
+                    continue
+                if len(self._values) >= self.maxsize:
+                    self._evict()
+                self._values[key] = value
+                if self.policy == 'lfu':
+                    self._counts[key] = 1
+                    self._buckets[1][key] = None
+                    self._min_count = 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'policy': self.policy,
+                'maxsize': self.maxsize,
+                'size': len(self._values),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class PrecomputedTable:
+    """
+    Memory-mapped probability table built offline by `build_table`.
+
+    The table directory holds `probs.npy` and, unless it covers the whole
+    feature space, a sorted `keys.npy`; both are opened with mmap_mode='r' so
+    lookups only touch the pages they need.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.probs = np.load(os.path.join(directory, 'probs.npy'), mmap_mode='r')
+        keys_path = os.path.join(directory, 'keys.npy')
+        self.keys = np.load(keys_path, mmap_mode='r') if os.path.exists(keys_path) else None
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def lookup(self, keys):
+        """Probabilities for `keys`, NaN for keys that are not in the table."""
+        if self.keys is None:
+            out = np.asarray(self.probs[keys], dtype=np.float64)
+        else:
+            out = np.full(len(keys), np.nan)
+            if len(self.keys):
+                pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+                found = self.keys[pos] == keys
+                out[found] = self.probs[pos[found]]
+        found = int(np.count_nonzero(~np.isnan(out)))
+        with self._lock:
+            self.hits += found
+            self.misses += len(keys) - found
+        return out
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+def build_table(model, model_path, out_dir, data=None, top=None, chunksize=1000000):
+    """
+    Precompute positive-class probabilities into a memory-mapped table.
+
+    Parameters:
+    model: Fitted classifier with predict_proba.
+    model_path (str): File the model was loaded from (its hash is recorded).
+    out_dir (str): Directory the table is written to.
+    data (str): Optional dataset (e.g. smote.arrow); when given, only the `top`
+    most frequent feature rows seen in it are precomputed instead of the
+    whole feature space.
+    top (int): Number of frequent rows to keep (all distinct rows when None).
+    chunksize (int): Rows scored per predict_proba call.
+    """
+    import pandas as pd
+    from dataset_io import load_dataset
+
+    os.makedirs(out_dir, exist_ok=True)
+    if data is None:
+        keys = None
+        n = SPACE_SIZE
+    else:
+        rows = load_dataset(data, columns=FEATURE_COLUMNS)[FEATURE_COLUMNS].round().to_numpy()
+        in_domain = ((rows >= _LOW) & (rows < _LOW + _RADIX)).all(axis=1)
+        counts = pd.Series(pack_keys(rows[in_domain])).value_counts()
+        keys = np.sort(counts.index.to_numpy()[:top] if top else counts.index.to_numpy())
+        n = len(keys)
+        np.save(os.path.join(out_dir, 'keys.npy'), keys)
+
+    probs = np.lib.format.open_memmap(os.path.join(out_dir, 'probs.npy'), mode='w+', dtype=np.float32, shape=(n,))
+    for start in range(0, n, chunksize):
+        stop = min(start + chunksize, n)
+        chunk_keys = np.arange(start, stop) if keys is None else keys[start:stop]
+        rows = pd.DataFrame(unpack_keys(chunk_keys), columns=FEATURE_COLUMNS)
+        probs[start:stop] = model.predict_proba(rows)[:, 1]
+        print(f"Scored {stop}/{n} feature combinations")
+    probs.flush()
+
+    meta = {'model_sha256': model_fingerprint(model_path), 'entries': n, 'dense': keys is None,
+            'source': data, 'top': top}
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute the prediction table used by app.py.')
+    parser.add_argument('model', help='model file served by app.py')
+    parser.add_argument('output', help='directory to write the table to')
+    parser.add_argument('--data', help='only precompute feature rows seen in this dataset (e.g. smote.arrow)')
+    parser.add_argument('--top', type=int, help='with --data, keep the N most frequent rows')
+    parser.add_argument('--chunksize', type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    if args.model.endswith('.npz'):
+        from fused_model import FusedEnsemble
+        model = FusedEnsemble.load(args.model)
+    else:
+        import joblib
+        model = joblib.load(args.model)
+
+    meta = build_table(model, args.model, args.output, args.data, args.top, args.chunksize)
+    print(json.dumps(meta, indent=2))
+
+
+if __name__ == '__main__':
+    main()
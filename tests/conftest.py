@@ -0,0 +1,45 @@
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'MINIPROJECT'))
+from schema import FEATURE_COLUMNS, FEATURE_DOMAINS, TARGET_COLUMN  # noqa: E402
+
+
+def make_binned(n, seed=0, classes=(0, 1)):
+    # Random valid binned rows with a label that depends on a few of them
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({col: rng.integers(FEATURE_DOMAINS[col][0], FEATURE_DOMAINS[col][1] + 1, n)
+                      for col in FEATURE_COLUMNS})
+    score = X['GenHlth'] + X['Age_Group'] + 2 * X['HighChol'] + rng.normal(0, 1, n)
+    y = np.asarray(classes)[np.digitize(score, np.quantile(score, np.linspace(0, 1, len(classes) + 1)[1:-1]))]
+    return X, pd.Series(y, name=TARGET_COLUMN)
+
+
+def load_service(name):
+    # Import a root service module by path: MINIPROJECT/ also has an app.py
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='session')
+def binned():
+    return make_binned(2000)
+
+
+@pytest.fixture(scope='session')
+def log_reg_path(tmp_path_factory, binned):
+    from sklearn.linear_model import LogisticRegression
+    import joblib
+    X, y = binned
+    path = str(tmp_path_factory.mktemp('models') / 'log_reg.joblib')
+    joblib.dump(LogisticRegression(max_iter=1000).fit(X, y), path)
+    return path
@@ -0,0 +1,63 @@
+import os
+
+import joblib
+import pytest
+from sklearn.ensemble import VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+
+from conftest import load_service
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory, binned):
+    X, y = binned
+    path = str(tmp_path_factory.mktemp('served') / 'model.joblib')
+    joblib.dump(VotingClassifier([('log_reg', LogisticRegression(max_iter=1000)), ('naive_bayes', GaussianNB())],
+                                 voting='soft').fit(X, y), path)
+    os.environ['MODEL_PATH'] = path
+    try:
+        return load_service('app')
+    finally:
+        del os.environ['MODEL_PATH']
+
+
+def test_broken_model_file_keeps_the_current_model(app_module, binned):
+    X, _ = binned
+    served = app_module.model
+    with open(app_module.MODEL_PATH, 'wb') as f:
+        f.write(b'half a pickle')
+    app_module.next_model_check = 0
+
+    app_module.check_model()
+
+    assert app_module.model is served
+    assert app_module.model_signature == app_module.file_signature(app_module.MODEL_PATH)
+    response = app_module.app.test_client().post('/predict', json=X.iloc[0].to_dict())
+    assert response.status_code == 200
+
+
+def test_batch_reports_invalid_records_one_by_one(app_module, binned):
+    X, _ = binned
+    good = {col: int(value) for col, value in X.iloc[0].items()}
+    client = app_module.app.test_client()
+
+    response = client.post('/predict/batch', json=[good, {**good, 'GenHlth': 9}, 'not a record', good])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['predictions'][1:3] == [None, None]
+    assert body['predictions'][0] == body['predictions'][3] is not None
+    assert body['errors'] == [{'index': 1, 'error': 'out of range GenHlth=9'},
+                              {'index': 2, 'error': 'record must be a JSON object'}]
+
+
+def test_batch_reports_unparsable_ndjson_lines(app_module, binned):
+    X, _ = binned
+    line = X.iloc[:1].to_json(orient='records', lines=True).strip()
+    response = app_module.app.test_client().post('/predict/batch', data=f'{line}\n{{oops\n{line}\n',
+                                                 content_type='application/x-ndjson')
+    body = response.get_json()
+    assert body['predictions'][1] is None and None not in (body['predictions'][0], body['predictions'][2])
+    assert [error['index'] for error in body['errors']] == [1]
+    assert body['errors'][0]['error'].startswith('invalid JSON')
@@ -0,0 +1,25 @@
+import os
+
+import pandas as pd
+
+from conftest import load_service
+from lag_model import save_artifact, train_lag_model
+
+
+def test_missing_artifact_keeps_the_current_one(tmp_path, binned):
+    X, y = binned
+    path = str(tmp_path / 'lag_model.joblib')
+    save_artifact(train_lag_model(pd.concat([X, y], axis=1)), path)
+    os.environ['ARTIFACT_PATH'] = path
+    try:
+        app1 = load_service('app1')
+    finally:
+        del os.environ['ARTIFACT_PATH']
+    served = app1.artifact
+
+    os.remove(path)  # e.g. mid deploy swap
+
+    assert app1.reload_artifact() is False
+    assert app1.artifact is served
+    response = app1.app.test_client().post('/reload')
+    assert response.status_code == 200 and response.get_json()['reloaded'] is False
@@ -0,0 +1,39 @@
+import os
+
+import joblib
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.linear_model import LogisticRegression
+
+from conftest import load_service
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory, binned):
+    X, y = binned
+    path = str(tmp_path_factory.mktemp('served') / 'model.joblib')
+    joblib.dump(LogisticRegression(max_iter=1000).fit(X, y), path)
+    os.environ.update(MODEL_PATH=path, MAX_BATCH_RECORDS='3')
+    try:
+        app_async = load_service('app_async')
+    finally:
+        del os.environ['MODEL_PATH'], os.environ['MAX_BATCH_RECORDS']
+    with TestClient(app_async.app) as client:
+        yield client
+
+
+def test_batch_reports_invalid_records_one_by_one(client, binned):
+    X, _ = binned
+    good = X.iloc[0].to_dict()
+    response = client.post('/predict/batch', json=[good, {**good, 'GenHlth': 9}, 'not a record'])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['predictions'][0] is not None and body['predictions'][1:] == [None, None]
+    assert [error['index'] for error in body['errors']] == [1, 2]
+    assert 'GenHlth' in body['errors'][0]['error']
+
+
+def test_batch_size_is_checked_before_validation(client):
+    response = client.post('/predict/batch', json=[{}] * 4)
+    assert response.status_code == 413
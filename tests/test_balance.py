@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from balance import SmoteSampler, balance_dataset
+from conftest import make_binned
+from dataset_io import load_dataset, save_dataset
+from incremental import train_incremental
+from schema import FEATURE_COLUMNS, FEATURE_DOMAINS, TARGET_COLUMN
+
+
+def make_unbalanced(n=1200, minority=100):
+    # int8 codes as binner.py writes them, with only `minority` rows of class 1
+    X, y = make_binned(n)
+    keep = (y == 0) | (y.cumsum() <= minority)
+    return X[keep].astype(np.int8).reset_index(drop=True), y[keep].astype(np.int8).reset_index(drop=True)
+
+
+def assert_valid_codes(X):
+    assert (X.dtypes == np.int8).all()
+    for col in FEATURE_COLUMNS:
+        low, high = FEATURE_DOMAINS[col]
+        assert X[col].between(low, high).all(), col
+
+
+def test_balance_dataset(tmp_path):
+    X, y = make_unbalanced()
+    source, output = str(tmp_path / 'binned.arrow'), str(tmp_path / 'smote.arrow')
+    save_dataset(pd.concat([X, y], axis=1), source, 'binned')
+
+    counts = balance_dataset(source, output, chunksize=64)
+
+    majority = int((y == 0).sum())
+    assert counts == {'before': {0: majority, 1: 100}, 'after': {0: majority, 1: majority}}
+    df = load_dataset(output)
+    assert df[TARGET_COLUMN].value_counts().to_dict() == {0: majority, 1: majority}
+    assert df[TARGET_COLUMN].dtype == np.int8
+    assert_valid_codes(df.drop(columns=[TARGET_COLUMN]))
+    # The original rows come first, unchanged
+    pd.testing.assert_frame_equal(df.iloc[:len(X)][list(X.columns)], X)
+
+
+def test_batches_are_class_balanced():
+    X, y = make_unbalanced()
+    sampler = SmoteSampler(X, y, chunksize=64)
+
+    batches = list(sampler.batches(200, n_batches=3))
+
+    assert len(batches) == 3
+    for X_batch, y_batch in batches:
+        assert len(X_batch) == len(y_batch) == 200
+        assert np.bincount(y_batch).tolist() == [100, 100]
+        assert_valid_codes(X_batch)
+
+
+def test_train_incremental_on_balanced_chunks(tmp_path):
+    X, y = make_unbalanced()
+    data, output = str(tmp_path / 'binned.arrow'), str(tmp_path / 'model.joblib')
+    save_dataset(pd.concat([X, y], axis=1), data, 'relabelled')
+
+    summary = train_incremental(data, output, chunksize=400, trees_per_chunk=5, rounds_per_chunk=5,
+                                progress=False, balance=True)
+
+    # As many rows as the dataset, in chunks that all hold both classes
+    chunks = -(-len(X) // 400)
+    assert (summary['chunks'], summary['rows'], summary['partial_rows']) == (chunks, chunks * 400, 0)
@@ -0,0 +1,18 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+
+from cascade import CascadeEnsemble, ensemble_members
+
+
+def test_array_weights(binned):
+    X, y = binned
+    model = VotingClassifier([('log_reg', LogisticRegression(max_iter=1000)), ('naive_bayes', GaussianNB()),
+                              ('random_forest', RandomForestClassifier(n_estimators=10, random_state=42))],
+                             voting='soft', weights=np.array([1.0, 2.0, 3.0])).fit(X, y)
+
+    assert [weight for _, weight, _ in ensemble_members(model)] == [1.0, 2.0, 3.0]
+    # A band covering every probability forwards every row: exactly the full ensemble
+    cascade = CascadeEnsemble(model, band=(0.0, 1.0))
+    assert np.allclose(cascade.predict_proba(X), model.predict_proba(X), atol=1e-12)
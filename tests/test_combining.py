@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+import combining
+import convertor
+
+
+def test_failed_year_keeps_the_converted_ones(tmp_path, capsys):
+    columns = list(convertor.columns_to_select)
+    (tmp_path / '2015.csv').write_text(','.join(columns) + '\n' + ','.join(['1'] * len(columns)) + '\n')
+    (tmp_path / '2013.csv').write_text('unknown\n1\n')
+    pattern, out_dir = str(tmp_path / '{year}.csv'), str(tmp_path / 'dataset')
+
+    with pytest.raises(KeyError):
+        combining.build(['2015', '2013'], pattern, out_dir, jobs=2)
+
+    with open(tmp_path / 'dataset' / combining.MANIFEST) as f:
+        assert list(json.load(f)['years']) == ['2015']
+    capsys.readouterr()
+    with pytest.raises(KeyError):
+        combining.build(['2015', '2013'], pattern, out_dir, jobs=2)
+    assert '2015: up to date' in capsys.readouterr().out
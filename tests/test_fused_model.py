@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from lightgbm import LGBMClassifier
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+from sklearn.tree import DecisionTreeClassifier
+from xgboost import XGBClassifier
+
+from conftest import make_binned
+from fused_model import FusedEnsemble, export_ensemble
+
+
+def small_ensemble(members=None):
+    members = members or [
+        ('log_reg', LogisticRegression(max_iter=1000)),
+        ('random_forest', RandomForestClassifier(n_estimators=10, max_depth=6, random_state=42)),
+        ('naive_bayes', GaussianNB()),
+        ('xgboost', XGBClassifier(n_estimators=10, max_depth=3, eval_metric='logloss', random_state=42)),
+        ('lightgbm', LGBMClassifier(n_estimators=10, num_leaves=8, random_state=42, verbose=-1)),
+    ]
+    return VotingClassifier(members, voting='soft')
+
+
+@pytest.mark.parametrize('classes', [(0, 1), (0, 1, 2, 3)])
+def test_fused_matches_predict_proba(tmp_path, classes):
+    X, y = make_binned(1500, classes=classes)
+    voting_clf = small_ensemble().fit(X, y)
+    path = str(tmp_path / 'fused.npz')
+    export_ensemble(voting_clf).save(path)
+    fused = FusedEnsemble.load(path)
+
+    X_test, _ = make_binned(500, seed=1, classes=classes)
+    assert np.allclose(fused.predict_proba(X_test), voting_clf.predict_proba(X_test), atol=1e-6)
+    assert np.array_equal(fused.predict(X_test), voting_clf.predict(X_test))
+
+
+def test_unsupported_member_is_a_type_error(binned):
+    X, y = binned
+    voting_clf = small_ensemble([('log_reg', LogisticRegression(max_iter=1000)),
+                                 ('tree', DecisionTreeClassifier(max_depth=3))]).fit(X, y)
+    with pytest.raises(TypeError, match='tree'):
+        export_ensemble(voting_clf)
@@ -0,0 +1,24 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+from conftest import make_binned
+from fused_model import export_ensemble
+from incremental import train_incremental
+
+
+def test_model_size_is_capped(tmp_path):
+    X, y = make_binned(3000)
+    data, output = tmp_path / 'data.csv', tmp_path / 'model.joblib'
+    pd.concat([X, y], axis=1).to_csv(data, index=False)
+
+    summary = train_incremental(str(data), str(output), chunksize=600, trees_per_chunk=10, rounds_per_chunk=10,
+                                max_trees=25, max_rounds=25, progress=False)
+
+    model = joblib.load(output)
+    members = model.named_estimators_
+    assert summary['chunks'] == 5
+    assert len(members['random_forest'].estimators_) == members['random_forest'].n_estimators == 25
+    assert members['xgboost'].get_booster().num_boosted_rounds() == 25
+    assert members['lightgbm'].booster_.current_iteration() == 25
+    assert np.allclose(export_ensemble(model).predict_proba(X), model.predict_proba(X), atol=1e-6)
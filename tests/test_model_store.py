@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from model_store import load_model, save_store
+
+
+def test_unfusable_ensemble_is_stored_without_fused_form(tmp_path, binned):
+    X, y = binned
+    model = VotingClassifier([('log_reg', LogisticRegression(max_iter=1000)),
+                              ('tree', DecisionTreeClassifier(max_depth=3))], voting='soft').fit(X, y)
+    directory = str(tmp_path / 'store_dt')
+
+    info = save_store(model, directory)
+
+    assert info['fused'] is None
+    assert os.listdir(tmp_path) == ['store_dt']
+    assert np.allclose(load_model(directory).predict_proba(X), model.predict_proba(X))
+
+
+def test_failed_store_leaves_no_temporary_directory(tmp_path, binned):
+    X, y = binned
+    model = LogisticRegression(max_iter=1000).fit(X, y)
+    model.unpicklable = lambda: None
+
+    with pytest.raises(Exception):
+        save_store(model, str(tmp_path / 'store'))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_swap_restores_previous_store(tmp_path, binned, monkeypatch):
+    X, y = binned
+    directory = str(tmp_path / 'store')
+    save_store(LogisticRegression(max_iter=1000).fit(X, y), directory)
+    rename = os.rename
+
+    def failing_rename(src, dst):
+        if '.tmp' in src:
+            raise OSError('rename failed')
+        rename(src, dst)
+
+    monkeypatch.setattr(os, 'rename', failing_rename)
+    with pytest.raises(OSError):
+        save_store(LogisticRegression(C=0.5, max_iter=1000).fit(X, y), directory)
+
+    assert os.listdir(tmp_path) == ['store']
+    assert load_model(directory).C == 1.0
@@ -0,0 +1,32 @@
+import json
+
+import numpy as np
+from lightgbm import LGBMClassifier
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+from parallel_ensemble import ParallelVotingClassifier
+
+
+def xgboost_threads(est):
+    return json.loads(est.get_booster().save_config())['learner']['generic_param']['nthread']
+
+
+def test_members_of_the_wrapped_model_are_not_changed(binned):
+    X, y = binned
+    model = VotingClassifier([
+        ('log_reg', LogisticRegression(max_iter=1000)),
+        ('random_forest', RandomForestClassifier(n_estimators=10, n_jobs=3, random_state=42)),
+        ('xgboost', XGBClassifier(n_estimators=10, n_jobs=3, random_state=42)),
+        ('lightgbm', LGBMClassifier(n_estimators=10, n_jobs=3, random_state=42, verbose=-1)),
+    ], voting='soft').fit(X, y)
+    before = xgboost_threads(model.named_estimators_['xgboost'])
+
+    parallel = ParallelVotingClassifier(model, n_jobs=2, min_parallel_rows=1, inner_threads=1)
+
+    assert np.allclose(parallel.predict_proba(X), model.predict_proba(X), atol=1e-12)
+    assert [est.n_jobs for est in model.estimators_[1:]] == [3, 3, 3]
+    assert model.named_estimators_['lightgbm']._other_params.get('n_jobs', 3) == 3
+    assert xgboost_threads(model.named_estimators_['xgboost']) == before
+    assert [parallel.named_estimators_[name].n_jobs for name in ('random_forest', 'xgboost', 'lightgbm')] == [1, 1, 1]
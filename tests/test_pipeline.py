@@ -0,0 +1,13 @@
+from pipeline import build_pipeline, code_files
+
+
+def test_stage_code_follows_imports():
+    stages = build_pipeline().stages
+    train = code_files(stages['train'].code, stages['train'].func)
+    assert {'ensemble model.py', 'tuning.py', 'balance.py', 'incremental.py', 'parallel_ensemble.py',
+            'dataset_io.py', 'schema.py'} <= set(train)
+    # Found from the imports alone, without being listed
+    assert set(code_files(['ensemble model.py'])) == set(train)
+    assert code_files(['binner.py'], stages['bin'].func) == ['binner.py', 'dataset_io.py']
+    # Editing pipeline.py itself (reports, other stages) must not invalidate smote
+    assert code_files(stages['smote'].code, stages['smote'].func) == ['balance.py', 'dataset_io.py', 'schema.py']
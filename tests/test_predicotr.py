@@ -0,0 +1,30 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from predicotr import score_file
+
+
+def test_score_file_keeps_ids_that_outgrow_the_first_chunk(tmp_path, binned, log_reg_path):
+    X, _ = binned
+    frame = X.copy()
+    # Ids of the first chunk fit int16, a later chunk's do not
+    frame.insert(0, 'id', np.arange(len(frame)))
+    frame.loc[len(frame) - 1, 'id'] = 104000
+    frame.loc[len(frame) - 2, 'GenHlth'] = 9
+    source, output = tmp_path / 'in.csv', tmp_path / 'out.parquet'
+    frame.to_csv(source, index=False)
+
+    totals = score_file(str(source), str(output), log_reg_path, keep=['id'], chunksize=700, workers=0,
+                        progress=False)
+
+    table = pq.read_table(output)
+    assert table.schema.field('id').type == 'int64'
+    scored = table.to_pandas()
+    assert (totals['rows'], totals['scored'], totals['rejected']) == (len(frame), len(frame) - 1, 1)
+    assert scored['id'].tolist() == frame['id'].tolist()
+    assert scored['error'].iloc[-2] != '' and pd.isna(scored['prediction'].iloc[-2])
+    valid = scored['error'] == ''
+    expected = joblib.load(log_reg_path).predict_proba(X[valid.to_numpy()])
+    assert np.allclose(scored.loc[valid, ['proba_0', 'proba_1']].to_numpy(), expected, atol=1e-6)
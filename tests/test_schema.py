@@ -0,0 +1,41 @@
+import numpy as np
+
+from schema import (FEATURE_COLUMNS, RAW_CONTINUOUS_COLUMNS, RAW_FEATURE_COLUMNS, RAW_FEATURE_DOMAINS,
+                    coerce_records)
+
+
+def test_coerce_records_keeps_valid_rows_and_explains_the_rest(binned):
+    X, _ = binned
+    good = {col: int(value) for col, value in X.iloc[0].items()}
+    records = [
+        good,
+        {**good, 'GenHlth': 9},
+        {col: value for col, value in good.items() if col != 'Sex'},
+        {**good, 'BMI': 'heavy'},
+        {**good, 'Age_Group': 2.5},
+        [1, 2, 3],
+        {**good, 'HighChol': '1'},  # numeric strings are accepted
+    ]
+
+    features, valid_index, errors = coerce_records(records)
+
+    assert valid_index.tolist() == [0, 6]
+    assert list(features.columns) == FEATURE_COLUMNS and features.dtypes.unique().tolist() == [np.int8]
+    assert features.iloc[0].to_dict() == good
+    assert errors == {
+        1: 'out of range GenHlth=9',
+        2: 'missing Sex',
+        3: 'non-numeric BMI',
+        4: 'out of range Age_Group=2.5',
+        5: 'record must be a JSON object',
+    }
+
+
+def test_coerce_records_raw_inputs_allow_continuous_bmi():
+    record = {col: RAW_FEATURE_DOMAINS[col][0] for col in RAW_FEATURE_COLUMNS}
+    features, valid_index, errors = coerce_records([{**record, 'BMI': 27.4}, {**record, 'BMI': 270}],
+                                                   RAW_FEATURE_COLUMNS, RAW_FEATURE_DOMAINS,
+                                                   continuous=RAW_CONTINUOUS_COLUMNS)
+    assert valid_index.tolist() == [0]
+    assert features['BMI'].iloc[0] == 27.4
+    assert errors == {1: 'out of range BMI=270'}
@@ -0,0 +1,20 @@
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from tuning import halving_rounds, successive_halving
+
+
+@pytest.mark.parametrize('n, factor, rounds', [(1, 3, 0), (2, 3, 1), (3, 3, 1), (9, 3, 2), (10, 3, 3), (8, 2, 3)])
+def test_halving_rounds(n, factor, rounds):
+    assert halving_rounds(n, factor) == rounds
+
+
+def test_winners_keep_their_own_n_jobs(binned):
+    X, y = binned
+    best, summary = successive_halving({'random_forest': RandomForestClassifier(n_estimators=5, n_jobs=None)},
+                                       {'random_forest': {'max_depth': [2, 3, 4, 5, 6, 7, 8, 9, 10]}}, X, y,
+                                       n_iter=9, cv=2, factor=3, min_resources=100, n_jobs=1, verbose=False)
+    assert best['random_forest'].n_jobs is None
+    # The last round scores the survivors on every row
+    assert len(summary['random_forest']['rounds']) == 2
+    assert summary['random_forest']['rounds'][-1]['rows'] == len(y)